@@ -0,0 +1,51 @@
+"""
+Benchmarks of servicemock, run with pytest-benchmark:
+
+    pytest benchmarks --benchmark-autosave
+    pytest benchmarks --benchmark-compare --benchmark-compare-fail=mean:20%
+
+The first stores a baseline under .benchmarks, the second fails if any benchmark is more than 20% slower
+than the latest stored one. The benchmarks job of .travis.yml runs both, storing the baseline from master.
+Slow benchmarks, like matching among 100k expectations, are skipped unless --slow is given.
+"""
+from typing import Any, Iterator, List
+
+import pytest  # type: ignore
+import requests
+
+import servicemock as sm
+
+
+def pytest_addoption(parser: Any):
+    parser.addoption('--slow', action='store_true', help='run slow servicemock benchmarks')
+
+
+def pytest_configure(config: Any):
+    config.addinivalue_line('markers', 'slow: benchmark skipped unless --slow is given')
+
+
+def pytest_collection_modifyitems(config: Any, items: List[Any]):
+    if config.getoption('--slow'):
+        return
+    skip = pytest.mark.skip(reason='slow benchmark, run with --slow')
+    for item in items:
+        if 'slow' in item.keywords:
+            item.add_marker(skip)
+
+
+@pytest.fixture(scope="function")
+def servicemock() -> Iterator[Any]:
+    sm.start()
+    yield sm
+    sm.stop()
+
+
+@pytest.fixture(scope="function")
+def mocker(servicemock: Any) -> Iterator[sm.Mocker]:
+    with sm.Mocker() as m:
+        yield m
+
+
+@pytest.fixture(scope="function")
+def session() -> requests.Session:
+    return requests.Session()
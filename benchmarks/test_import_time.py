@@ -0,0 +1,31 @@
+"""
+Import time of servicemock measured with -X importtime in a fresh interpreter. The cumulative import time
+reported for the module is stored in extra_info, the benchmarked time includes interpreter startup.
+"""
+from typing import Any, Dict
+import subprocess
+import sys
+
+import pytest  # type: ignore
+
+
+def import_times(module: str) -> Dict[str, int]:
+    """
+    Cumulative import times of the imported modules in microseconds
+    """
+    stderr = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            check=True, capture_output=True, text=True).stderr
+    times = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+@pytest.mark.parametrize('module', ['servicemock', 'servicemock.pytest_plugin', 'servicemock.servicemock'])
+def test_import_time(benchmark: Any, module: str):
+    times = benchmark.pedantic(import_times, args=(module,), rounds=5)
+
+    benchmark.extra_info['import_us'] = times[module]
@@ -0,0 +1,59 @@
+from typing import Any
+
+import pytest  # type: ignore
+import requests
+
+import servicemock as sm
+
+
+@pytest.mark.parametrize('expectation_count', [10, 1_000, 10_000, pytest.param(100_000, marks=pytest.mark.slow)])
+def test_match_latency_by_expectation_count(benchmark: Any, mocker: sm.Mocker, session: requests.Session, expectation_count: int):
+    dsl = sm.expect('http://my-service.com', mocker)
+    for i in range(expectation_count):
+        dsl.to_receive(sm.Request('GET', f'/v1/users/{i}'))
+
+    benchmark(session.get, 'http://my-service.com/v1/users/0')
+
+
+@pytest.mark.parametrize('expectation_count', [10, 100, 1_000])
+def test_match_latency_by_expectations_of_same_url(benchmark: Any, mocker: sm.Mocker, session: requests.Session, expectation_count: int):
+    dsl = sm.expect('http://my-service.com', mocker)
+    for i in range(expectation_count):
+        dsl.to_receive(sm.Request('POST', '/v1/users', body=sm.JSONRequestBody({'id': i})))
+
+    benchmark(session.post, 'http://my-service.com/v1/users', json={'id': 0})
+
+
+@pytest.mark.parametrize('body_size', [100, 10_000, 1_000_000])
+def test_match_latency_by_json_body_size(benchmark: Any, mocker: sm.Mocker, session: requests.Session, body_size: int):
+    body = {'items': ['x' * 90] * (body_size // 100)}
+    sm.expect('http://my-service.com', mocker).to_receive(sm.Request('POST', '/v1/events', body=sm.JSONRequestBody(body)))
+
+    benchmark(session.post, 'http://my-service.com/v1/events', json=body)
+
+
+@pytest.mark.parametrize('body_size', [100, 10_000, 1_000_000])
+def test_match_latency_by_bytes_body_size(benchmark: Any, mocker: sm.Mocker, session: requests.Session, body_size: int):
+    body = b'x' * body_size
+    sm.expect('http://my-service.com', mocker).to_receive(sm.Request('POST', '/v1/files', body=sm.BytesRequestBody(body)))
+
+    benchmark(session.post, 'http://my-service.com/v1/files', data=body)
+
+
+@pytest.mark.parametrize('template_count', [10, 100])
+def test_match_latency_by_path_template_count(benchmark: Any, mocker: sm.Mocker, session: requests.Session, template_count: int):
+    dsl = sm.expect('http://my-service.com', mocker)
+    for i in range(template_count):
+        dsl.to_receive(sm.Request('GET', f'/v1/resource{i}/{{id}}'))
+
+    benchmark(session.get, 'http://my-service.com/v1/resource0/42')
+
+
+@pytest.mark.parametrize('header_count', [1, 10, 50])
+def test_match_latency_by_header_count(benchmark: Any, mocker: sm.Mocker, session: requests.Session, header_count: int):
+    headers = {f'X-Header-{i}': f'value-{i}' for i in range(header_count)}
+    dsl = sm.expect('http://my-service.com', mocker)
+    for token in range(10):
+        dsl.to_receive(sm.Request('GET', '/v1/users', headers=dict(headers, Authorization=f'Bearer {token}'))).at_least(0)
+
+    benchmark(session.get, 'http://my-service.com/v1/users', headers=dict(headers, Authorization='Bearer 9'))
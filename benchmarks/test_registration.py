@@ -0,0 +1,46 @@
+from typing import Any
+
+import pytest  # type: ignore
+
+import servicemock as sm
+
+# Every round registers a batch into a fresh context, so registered expectations do not pile up between rounds
+BATCH = 100
+
+
+@pytest.fixture(scope="function")
+def register(benchmark: Any, servicemock: Any) -> Any:
+    def _register(request: sm.Request):
+        def register_batch():
+            dsl = sm.expect('http://my-service.com')
+            for _ in range(BATCH):
+                dsl.to_receive(request).and_responds(sm.HTTP200Ok(sm.JSON({'status': 'ok'})))
+
+        benchmark.pedantic(register_batch, setup=sm.start, rounds=50)
+    return _register
+
+
+def test_registration(register: Any):
+    register(sm.Request('GET', '/v1/users'))
+
+
+@pytest.mark.parametrize('body_items', [10, 1_000, 10_000])
+def test_registration_with_json_body(register: Any, body_items: int):
+    register(sm.Request('POST', '/v1/events', body=sm.JSONRequestBody({f'key{i}': [i] * 10 for i in range(body_items)})))
+
+
+def register_baseline(expect: Any):
+    dsl = expect('http://my-service.com')
+    for i in range(200):
+        dsl.to_receive(sm.Request('GET', f'/v1/config/{i}')).at_least(0)
+
+
+baseline = sm.ExpectationSet('baseline', register_baseline)
+
+
+def test_registering_baseline_per_test(benchmark: Any, servicemock: Any):
+    benchmark.pedantic(lambda: register_baseline(sm.expect), setup=sm.start, rounds=20)
+
+
+def test_attaching_baseline_set(benchmark: Any, servicemock: Any):
+    benchmark.pedantic(lambda: sm.attach(baseline), setup=sm.start, rounds=20)
@@ -0,0 +1,75 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+import http.client
+import socket
+
+import pytest  # type: ignore
+import requests
+
+import servicemock as sm
+
+THREADS = 8
+REQUESTS_PER_THREAD = 250
+PIPELINED_CONNECTIONS = 4
+PIPELINED_REQUESTS = 5000
+
+
+@pytest.mark.parametrize('threads', [1, THREADS])
+def test_mocked_throughput(benchmark: Any, mocker: sm.Mocker, threads: int):
+    sm.expect('http://my-service.com', mocker).to_receive(sm.Request('GET', '/v1/users')).at_least(0)
+    sessions = [requests.Session() for _ in range(threads)]
+
+    def call(i: int):
+        session = sessions[i]
+        for _ in range(REQUESTS_PER_THREAD):
+            session.get('http://my-service.com/v1/users')
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        benchmark.pedantic(lambda: list(executor.map(call, range(threads))), rounds=5)
+
+
+def test_server_throughput(benchmark: Any, servicemock: Any):
+    (sm.expect('http://my-service.com')
+        .to_receive(sm.Request('GET', '/v1/users'))
+        .and_responds(sm.HTTP200Ok(sm.JSON({'status': 'ok'}))))
+    address = sm.serve('http://my-service.com').url[len('http://'):]
+    connections = [http.client.HTTPConnection(address) for _ in range(THREADS)]
+
+    def call(i: int):
+        connection = connections[i]
+        for _ in range(REQUESTS_PER_THREAD):
+            connection.request('GET', '/v1/users')
+            connection.getresponse().read()
+
+    with ThreadPoolExecutor(max_workers=THREADS) as executor:
+        benchmark.pedantic(lambda: list(executor.map(call, range(THREADS))), rounds=5)
+
+    for connection in connections:
+        connection.close()
+
+
+def test_server_pipelined_throughput(benchmark: Any, servicemock: Any):
+    """
+    PIPELINED_CONNECTIONS keep-alive connections sending PIPELINED_REQUESTS requests each without waiting
+    for the responses
+    """
+    (sm.expect('http://my-service.com')
+        .to_receive(sm.Request('GET', '/v1/users'))
+        .and_responds(sm.HTTP200Ok(sm.JSON({'status': 'ok'})))
+        .at_least(0))
+    server = sm.serve('http://my-service.com')
+    requests_ = b'GET /v1/users HTTP/1.1\r\nHost: my-service.com\r\n\r\n' * PIPELINED_REQUESTS
+
+    def call(_: int):
+        status = b'HTTP/1.1 200 OK'
+        with socket.create_connection((server.host, server.port)) as connection:
+            connection.sendall(requests_)
+            responses, tail = 0, b''
+            while responses < PIPELINED_REQUESTS:
+                received = tail + connection.recv(1024 * 1024)
+                responses += received.count(status)
+                # The status line may be split between reads
+                tail = received[-len(status) + 1:]
+
+    with ThreadPoolExecutor(max_workers=PIPELINED_CONNECTIONS) as executor:
+        benchmark.pedantic(lambda: list(executor.map(call, range(PIPELINED_CONNECTIONS))), rounds=3)
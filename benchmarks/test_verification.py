@@ -0,0 +1,42 @@
+from typing import Any
+
+import pytest  # type: ignore
+import requests
+
+import servicemock as sm
+from servicemock.adapter import UnexpectedRequest
+
+EXPECTATIONS = 1_000
+
+
+def expect_users(m: sm.Mocker):
+    dsl = sm.expect('http://my-service.com', m)
+    for i in range(EXPECTATIONS):
+        dsl.to_receive(sm.Request('GET', f'/v1/users/{i}'))
+
+
+def test_verify_when_satisfied(benchmark: Any, mocker: sm.Mocker, session: requests.Session):
+    expect_users(mocker)
+    for i in range(EXPECTATIONS):
+        session.get(f'http://my-service.com/v1/users/{i}')
+
+    benchmark(sm.verify)
+
+
+def test_verify_when_not_satisfied(benchmark: Any, mocker: sm.Mocker):
+    expect_users(mocker)
+
+    def verify():
+        with pytest.raises(AssertionError):
+            sm.verify()
+
+    benchmark(verify)
+
+
+def test_unexpected_request_message(benchmark: Any, mocker: sm.Mocker, session: requests.Session):
+    expect_users(mocker)
+    with pytest.raises(UnexpectedRequest) as e:
+        session.post('http://my-service.com/v1/items', json={'items': list(range(1_000))})
+
+    # str caches the message, so render it again on every round
+    benchmark(e.value._render)
@@ -1,13 +1,107 @@
-from .servicemock import (  # noqa: F401
-    expect,
-    Request,
-    Response,
-    HTTP200Ok,
-    JSON,
-    verify,
-    start,
-    Cookie,
-    JSONRequestBody,
-)
-from .adapter import Adapter, Mocker  # noqa: F401
-from .unittest import ServiceMockTestCase  # noqa: F401
+"""
+Public names are loaded on first use, so importing servicemock, like pytest does for the plugin in every
+worker, does not import requests, requests_mock or the integrations until they are needed.
+"""
+from importlib import import_module
+from typing import Any, List, TYPE_CHECKING
+
+_ATTRIBUTES = {
+    **dict.fromkeys([
+        'expect',
+        'Request',
+        'Response',
+        'HTTP200Ok',
+        'JSON',
+        'Text',
+        'Bytes',
+        'verify',
+        'start',
+        'stop',
+        'serve',
+        'share',
+        'scenario_state',
+        'STARTED',
+        'configure_journal',
+        'history',
+        'enable_stats',
+        'stats',
+        'dump_stats',
+        'enable_coverage',
+        'coverage',
+        'dump_coverage',
+        'Cookie',
+        'JSONRequestBody',
+        'JSONSubsetRequestBody',
+        'JSONPathRequestBody',
+        'BytesRequestBody',
+    ], '.servicemock'),
+    'PRESENT': '.matchers',
+    'ABSENT': '.matchers',
+    'Adapter': '.adapter',
+    'Mocker': '.adapter',
+    'replay': '.cassette',
+    'Faults': '.faults',
+    'Stream': '.streams',
+    'File': '.streams',
+    'Generated': '.dynamic',
+    'ExpectationSet': '.sets',
+    'attach': '.sets',
+    'load_expectations': '.loader',
+    'ServiceMockTestCase': '.unittest',
+}
+
+__all__ = list(_ATTRIBUTES)
+
+
+def __getattr__(name: str) -> Any:
+    module = _ATTRIBUTES.get(name)
+    if module is None:
+        raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
+    value = getattr(import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> List[str]:
+    return sorted(set(globals()) | set(__all__))
+
+
+if TYPE_CHECKING:
+    from .servicemock import (  # noqa: F401
+        expect,
+        Request,
+        Response,
+        HTTP200Ok,
+        JSON,
+        Text,
+        Bytes,
+        verify,
+        start,
+        stop,
+        serve,
+        share,
+        scenario_state,
+        STARTED,
+        configure_journal,
+        history,
+        enable_stats,
+        stats,
+        dump_stats,
+        enable_coverage,
+        coverage,
+        dump_coverage,
+        Cookie,
+        JSONRequestBody,
+        JSONSubsetRequestBody,
+        JSONPathRequestBody,
+        BytesRequestBody,
+    )
+    from .matchers import PRESENT, ABSENT  # noqa: F401
+    from .adapter import Adapter, Mocker  # noqa: F401
+    from .cassette import replay  # noqa: F401
+    from .faults import Faults  # noqa: F401
+    from .streams import Stream, File  # noqa: F401
+    from .dynamic import Generated  # noqa: F401
+    from .sets import ExpectationSet, attach  # noqa: F401
+    from .loader import load_expectations  # noqa: F401
+    from .unittest import ServiceMockTestCase  # noqa: F401
@@ -1,45 +1,219 @@
-import json
+from collections import deque
+from typing import Any, Callable, Iterator, List, Optional
+import weakref
 
+import requests
 import requests_mock  # type: ignore
+from requests_mock.adapter import _Matcher, _RunRealHTTP  # type: ignore
+from requests_mock.mocker import _set_method  # type: ignore
+from requests_mock.request import _RequestObjectProxy  # type: ignore
 
-from .servicemock import ExpectedRequests
+from .servicemock import EXPECTATION_ATTRIBUTE, ExpectedRequests, ReceivedBody, current_journal
+from .cassette import Cassette
+from .diagnostics import closest, truncate
+from .index import MatcherIndex
+from .profiling import profiler, perf_counter_ns
+
+# Types
+Render = Callable[[Any, Any], Any]
 
 
 class UnexpectedRequest(requests_mock.NoMockAddress):
+    """
+    Raised when the request does not match any expectation.
+
+    Message is rendered once, when it is first needed. It lists at most max_expectations expected requests
+    not made yet, the closest to the request if there are more, and truncates bodies and descriptions to
+    max_length characters.
+    """
+    max_expectations = 10
+    max_length = 500
+
+    _message: Optional[str] = None
 
     def __str__(self) -> str:
+        if self._message is None:
+            self._message = self._render()
+        return self._message
+
+    def _render(self) -> str:
         requests = ExpectedRequests.get_requests_not_made()
 
-        try:
-            text_body = None
-            json_body = self.request.json()
-        except (TypeError, json.JSONDecodeError):
-            text_body = self.request.text
-            json_body = None
+        # Not cached on the request, which may be kept in the request history
+        body = ReceivedBody(self.request)
+        json_body = body.json
+        raw_body = body.raw if json_body is None else None
+        # Body may be binary, which must not make rendering the message fail
+        text_body = raw_body.decode('utf-8', errors='replace') if isinstance(raw_body, (bytes, bytearray)) else None
 
         msg = f"Received unexpected request '{self.request.method} {self.request.url}, headers: {self.request.headers}'"
         if json_body:
-            msg = msg + f', json: {json_body}'
+            msg = msg + f', json: {truncate(str(json_body), self.max_length)}'
 
         if text_body:
-            msg = msg + f', text: {text_body}'
+            msg = msg + f', text: {truncate(text_body, self.max_length)}'
 
-        message = f"{msg}.\nExpected requests are:\n  - "
-        return message + "\n  - ".join([str(r) for r in requests])
+        if len(requests) > self.max_expectations:
+            message = f"{msg}.\nClosest of {len(requests)} expected requests are:\n  - "
+            requests = closest(self.request, requests, self.max_expectations)
+        else:
+            message = f"{msg}.\nExpected requests are:\n  - "
+        return message + "\n  - ".join([truncate(str(r), self.max_length) for r in requests])
 
 
 class Adapter(requests_mock.Adapter):
+    """
+    requests_mock adapter, which looks up matchers from an index instead of scanning all registered matchers.
+
+    With history_size, request_history of the adapter and of its matchers keeps only the latest history_size
+    requests, so call_count counts at most history_size requests too.
+    """
+
+    def __init__(self, *args, history_size: Optional[int] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._index = MatcherIndex(case_sensitive=self._case_sensitive)
+        self._attached: List[MatcherIndex] = []
+        self._history_size = history_size
+
+    def add_matcher(self, matcher):
+        super().add_matcher(matcher)
+        self._index.add(matcher)
+        if self._history_size is not None:
+            history_size = self._history_size
+            matcher._add_to_history = lambda request: _add_to_bounded_history(matcher, request, history_size)
 
-    def send(self, request, **kwargs):
+    def _add_to_history(self, request):
+        if self._history_size is None:
+            super()._add_to_history(request)
+        else:
+            _add_to_bounded_history(self, request, self._history_size)
+
+    def attach(self, index: MatcherIndex):
+        """
+        Consults matchers of the shared index after the matchers of this adapter, before earlier attached indexes
+        """
+        self._attached.insert(0, index)
+
+    def _candidates(self, request: Any) -> Iterator[Any]:
+        yield from self._index.candidates(request)
+        for index in self._attached:
+            yield from index.candidates(request)
+
+    def send(self, request, render: Optional[Render] = None, **kwargs):
+        """
+        With render, the matched requests_mock response (like _MatcherResponse) is given to render together with
+        the request, and its result is returned instead of a requests.Response.
+        """
+        if not profiler.enabled:
+            return self._send(request, render, **kwargs)
+
+        started = perf_counter_ns()
+        matched = False
         try:
-            return super().send(request, **kwargs)
-        except requests_mock.NoMockAddress as e:
-            raise UnexpectedRequest(e.request)
+            response = self._send(request, render, **kwargs)
+            matched = True
+            return response
+        finally:
+            profiler.record_send(perf_counter_ns() - started, matched)
+
+    def _send(self, request, render: Optional[Render] = None, **kwargs):
+        request = _RequestObjectProxy(request, case_sensitive=self._case_sensitive, **kwargs)
+        self._add_to_history(request)
+
+        journal = current_journal()
+        try:
+            return self._dispatch(request, render)
+        finally:
+            ReceivedBody.release(request)
+            if journal is not None:
+                journal.record(request, getattr(request, EXPECTATION_ATTRIBUTE, None))
+
+    def _dispatch(self, request, render: Optional[Render] = None):
+        for matcher in self._candidates(request) if self._attached else self._index.candidates(request):
+            try:
+                resp = matcher(request) if render is None or not isinstance(matcher, _Matcher) else _call(matcher, request, render)
+            except Exception:
+                request._matcher = weakref.ref(matcher)
+                raise
+
+            if resp is not None:
+                request._matcher = weakref.ref(matcher)
+                if render is None:
+                    resp.connection = self
+                elif isinstance(resp, requests.Response):
+                    resp = render(_Rendered(resp), request)
+                return resp
+
+        raise UnexpectedRequest(request)
+
+
+def _call(matcher: _Matcher, request: Any, render: Render) -> Any:
+    """
+    _Matcher.__call__ rendering the matched response instead of getting it
+    """
+    if not matcher._match(request):
+        return None
+    if matcher._real_http:
+        raise _RunRealHTTP()
+
+    responses = matcher._responses
+    response = responses.pop(0) if len(responses) > 1 else responses[0]
+    matcher._add_to_history(request)
+    return render(response, request)
+
+
+class _Rendered:
+    """
+    Response of a custom matcher as a requests_mock response
+    """
+
+    def __init__(self, response: requests.Response):
+        self._response = response
+
+    def get_response(self, request: Any) -> requests.Response:
+        return self._response
+
+
+def _add_to_bounded_history(tracker: Any, request: Any, history_size: int):
+    history = tracker.request_history
+    # reset replaces the history with a list
+    if not isinstance(history, deque):
+        history = tracker.request_history = deque(history, maxlen=history_size)
+    history.append(request)
 
 
 class Mocker(requests_mock.Mocker):
+    """
+    requests_mock.Mocker using servicemock adapter.
+
+    With record, requests not matching any expectation are passed to the real network and recorded to the
+    cassette in the given directory. Recorded cassettes are replayed with servicemock.replay.
+
+    With history_size, request_history keeps only the latest history_size requests.
+    """
 
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, record: Optional[str] = None, history_size: Optional[int] = None, **kwargs):
         # TODO: If somebody is giving adapter, raise not possible
-        kwargs['adapter'] = Adapter()
+        kwargs['adapter'] = Adapter(history_size=history_size)
+        if record is not None:
+            kwargs['real_http'] = True
         super().__init__(*args, **kwargs)
+        self._cassette = Cassette(record) if record is not None else None
+
+    def start(self):
+        super().start()
+        if self._cassette is not None:
+            self._start_recording(self._cassette)
+
+    def _start_recording(self, cassette: Cassette):
+        send = self._mock_target.send
+        adapter = self._adapter
+        target_is_class = isinstance(self._mock_target, type)
+
+        def _recording_send(session, request, **kwargs):
+            response = send(session, request, **kwargs) if target_is_class else send(request, **kwargs)
+            if response.connection is not adapter:
+                cassette.record(request, response)
+            return response
+
+        _set_method(self._mock_target, 'send', _recording_send)
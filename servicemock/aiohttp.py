@@ -0,0 +1,41 @@
+"""
+aiohttp resolver routing plain http requests of mocked services to their stand-in servers.
+
+    connector = aiohttp.TCPConnector(resolver=servicemock.aiohttp.Resolver())
+    session = aiohttp.ClientSession(connector=connector)
+
+aiohttp has no public transport interface, so requests are made over the loopback to a local
+server (see servicemock.serve), which runs in its own thread and does not block the event loop.
+All the services in a host share one server. Hosts of mocked https services are not resolved
+at all, so their requests do not reach the network.
+"""
+from typing import Any, List, Optional
+import socket
+
+import aiohttp  # type: ignore
+from aiohttp.abc import AbstractResolver  # type: ignore
+
+from .servicemock import current_context
+
+
+class Resolver(AbstractResolver):
+
+    def __init__(self, fallback: Optional[AbstractResolver] = None):
+        self._fallback = fallback or aiohttp.DefaultResolver()
+
+    async def resolve(self, host: str, port: int = 0, family: socket.AddressFamily = socket.AF_INET) -> List[Any]:
+        server = current_context().server_for(host, port)
+        if server is None:
+            return await self._fallback.resolve(host, port, family)
+
+        return [{
+            'hostname': host,
+            'host': server.host,
+            'port': server.port,
+            'family': socket.AF_INET,
+            'proto': 0,
+            'flags': socket.AI_NUMERICHOST,
+        }]
+
+    async def close(self):
+        await self._fallback.close()
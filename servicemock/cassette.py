@@ -0,0 +1,121 @@
+"""
+Cassettes of recorded HTTP interactions.
+
+A cassette is a directory with an append-only 'interactions.jsonl' file and a 'bodies' directory, where
+request and response bodies are stored once by their sha256 digest, so repeated bodies take no extra space.
+"""
+from __future__ import annotations
+from typing import Dict, Iterator, Optional, Set, Tuple
+from urllib.parse import urlsplit
+import hashlib
+import json
+import os
+import threading
+
+import requests
+import requests_mock  # type: ignore
+
+from .servicemock import Request, Response, Bytes, BytesRequestBody, expect
+
+# Types
+Record = Tuple[str, Request, Response]
+
+# Recorded body is stored decoded, so these would not describe it anymore
+_DROPPED_RESPONSE_HEADERS = {'content-encoding', 'content-length', 'transfer-encoding'}
+
+
+class Cassette:
+
+    def __init__(self, path: str):
+        self._path = path
+        self._bodies_path = os.path.join(path, 'bodies')
+        self._interactions_path = os.path.join(path, 'interactions.jsonl')
+        self._lock = threading.Lock()
+
+    def record(self, request: requests.PreparedRequest, response: requests.Response):
+        body = request.body.encode('utf-8') if isinstance(request.body, str) else request.body
+        interaction = {
+            'request': {
+                'method': request.method,
+                'url': request.url,
+                'headers': dict(request.headers),
+                'body': self._store(body),
+            },
+            'response': {
+                'status': f'{response.status_code} {response.reason}',
+                'headers': {k: v for k, v in response.headers.items() if k.lower() not in _DROPPED_RESPONSE_HEADERS},
+                'body': self._store(response.content),
+            },
+        }
+        line = json.dumps(interaction, separators=(',', ':')) + '\n'
+        with self._lock:
+            os.makedirs(self._path, exist_ok=True)
+            with open(self._interactions_path, 'a', encoding='utf-8') as f:
+                f.write(line)
+
+    def records(self) -> Iterator[Record]:
+        """
+        Recorded interactions as expectations. Only the first of identical requests is kept.
+        """
+        bodies: Dict[str, bytes] = {}
+        seen: Set[Tuple[str, str, Optional[str]]] = set()
+
+        with open(self._interactions_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                interaction = json.loads(line)
+                request, response = interaction['request'], interaction['response']
+
+                key = (request['method'], request['url'], request['body'])
+                if key in seen:
+                    continue
+                seen.add(key)
+
+                base_url, url = _split_url(request['url'])
+                request_body = self._load(request['body'], bodies)
+                response_body = self._load(response['body'], bodies)
+                yield (
+                    base_url,
+                    Request(request['method'], url, body=BytesRequestBody(request_body) if request_body else None),
+                    Response(response['status'], body=Bytes(response_body) if response_body else None,
+                             headers=response['headers'] or None),
+                )
+
+    def _store(self, body: Optional[bytes]) -> Optional[str]:
+        if not body:
+            return None
+        digest = hashlib.sha256(body).hexdigest()
+        path = os.path.join(self._bodies_path, digest)
+        if not os.path.exists(path):
+            os.makedirs(self._bodies_path, exist_ok=True)
+            tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(body)
+            os.replace(tmp_path, path)
+        return digest
+
+    def _load(self, digest: Optional[str], bodies: Dict[str, bytes]) -> Optional[bytes]:
+        if digest is None:
+            return None
+        if digest not in bodies:
+            with open(os.path.join(self._bodies_path, digest), 'rb') as f:
+                bodies[digest] = f.read()
+        return bodies[digest]
+
+
+def replay(path: str, m: Optional[requests_mock.Mocker] = None) -> int:
+    """
+    Registers interactions recorded to the cassette in path as expectations. Returns the number of expectations.
+    """
+    count = 0
+    for base_url, request, response in Cassette(path).records():
+        expect(base_url, m).to_receive(request).and_responds(response)
+        count += 1
+    return count
+
+
+def _split_url(url: str) -> Tuple[str, str]:
+    parts = urlsplit(url)
+    base_url = f'{parts.scheme}://{parts.netloc}'
+    return base_url, url[len(base_url):] or '/'
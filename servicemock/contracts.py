@@ -0,0 +1,120 @@
+"""
+Opt-in coverage of service contracts over many tests.
+
+When enabled, the expectations of each test are counted per service (base URL) and endpoint (method and
+URL or path template) when the registry is reset for the next test, so matching requests costs nothing
+extra. Reports of several processes, like pytest-xdist workers, are merged by adding up the counters.
+"""
+from __future__ import annotations
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+import json
+import threading
+
+# Types
+Endpoint = Tuple[str, str, str]
+
+
+class EndpointCoverage:
+    __slots__ = ('registrations', 'hits', 'unused')
+
+    def __init__(self):
+        self.registrations = 0
+        self.hits = 0
+        self.unused = 0
+
+
+class ContractCoverage:
+
+    def __init__(self):
+        self.enabled = False
+        self._lock = threading.Lock()
+        self._endpoints: Dict[Endpoint, EndpointCoverage] = {}
+
+    def reset(self):
+        with self._lock:
+            self._endpoints = {}
+
+    def record(self, expected_requests: Iterable[Any], hits: Mapping[int, int]):
+        """
+        Counts the expectations of a test and their hits, keyed by the id of the expectation
+        """
+        with self._lock:
+            self._record(self._endpoints, expected_requests, hits)
+
+    @staticmethod
+    def _record(endpoints: Dict[Endpoint, EndpointCoverage], expected_requests: Iterable[Any], hits: Mapping[int, int]):
+        for request in expected_requests:
+            key = (request.base_url, request.method, request.url)
+            coverage = endpoints.get(key)
+            if coverage is None:
+                coverage = endpoints[key] = EndpointCoverage()
+            count = hits.get(id(request), 0)
+            coverage.registrations += 1
+            coverage.hits += count
+            coverage.unused += count == 0
+
+    def report(self, expected_requests: Iterable[Any] = (), hits: Optional[Mapping[int, int]] = None) -> Dict[str, Any]:
+        """
+        Coverage recorded so far, including the expectations of the current test given as arguments
+        """
+        with self._lock:
+            endpoints = {key: _copy(coverage) for key, coverage in self._endpoints.items()}
+        self._record(endpoints, expected_requests, hits or {})
+
+        services: Dict[str, Dict[str, Any]] = {}
+        for (base_url, method, url), coverage in sorted(endpoints.items()):
+            service = services.setdefault(base_url, {'endpoints': {}})
+            service['endpoints'][f'{method.upper()} {url}'] = {
+                'registrations': coverage.registrations,
+                'hits': coverage.hits,
+                'unused': coverage.unused,
+            }
+        return {'services': services}
+
+    def dump(self, path: str, report: Dict[str, Any], format: str = 'json'):
+        """
+        Writes the report as JSON or as text ('text')
+        """
+        with open(path, 'w', encoding='utf-8') as f:
+            if format == 'json':
+                json.dump(report, f, indent=2)
+            elif format == 'text':
+                f.write(''.join(f'{line}\n' for line in text_report(report)))
+            else:
+                raise ValueError(f"Unknown coverage format '{format}', expected 'json' or 'text'")
+
+
+def _copy(coverage: EndpointCoverage) -> EndpointCoverage:
+    copy = EndpointCoverage()
+    copy.registrations, copy.hits, copy.unused = coverage.registrations, coverage.hits, coverage.unused
+    return copy
+
+
+def merge_reports(reports: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    services: Dict[str, Dict[str, Any]] = {}
+    for report in reports:
+        for base_url, service in report['services'].items():
+            merged = services.setdefault(base_url, {'endpoints': {}})['endpoints']
+            for endpoint, counters in service['endpoints'].items():
+                totals = merged.setdefault(endpoint, {'registrations': 0, 'hits': 0, 'unused': 0})
+                for name, value in counters.items():
+                    totals[name] += value
+    return {'services': {base_url: services[base_url] for base_url in sorted(services)}}
+
+
+def text_report(report: Dict[str, Any]) -> List[str]:
+    services = report['services']
+    endpoints = [(e, c) for s in services.values() for e, c in s['endpoints'].items()]
+    never_hit = sum(1 for _, c in endpoints if c['hits'] == 0)
+    lines = [f'{len(endpoints)} endpoints of {len(services)} services mocked, {never_hit} never requested']
+
+    width = max((len(e) for e, _ in endpoints), default=0)
+    for base_url, service in services.items():
+        lines.append(base_url)
+        for endpoint, c in service['endpoints'].items():
+            line = f"  {endpoint:<{width}}  registered {c['registrations']:>6}  hits {c['hits']:>6}  unused {c['unused']:>6}"
+            lines.append(line + ('  NEVER REQUESTED' if c['hits'] == 0 else ''))
+    return lines
+
+
+contract_coverage = ContractCoverage()
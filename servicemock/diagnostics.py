@@ -0,0 +1,82 @@
+"""
+Ranking of expectations by how close they are to a request, which did not match any of them.
+
+Similarity is cheap to compute: method, host, path segments and top level JSON keys are compared,
+so ranking thousands of expectations takes milliseconds.
+"""
+from __future__ import annotations
+from typing import Any, FrozenSet, List, Sequence, Tuple
+from urllib.parse import urlsplit
+import functools
+import heapq
+
+from .servicemock import ReceivedBody, Request
+
+# Types
+Fingerprint = Tuple[str, str, Tuple[str, ...], FrozenSet[str]]
+
+
+def closest(request: Any, expectations: Sequence[Request], k: int) -> List[Request]:
+    """
+    k expectations closest to the request, the closest first
+    """
+    received = fingerprint(request.method, request.url, ReceivedBody.of(request).json)
+    scored = ((similarity(received, expected_fingerprint(r)), -i, r) for i, r in enumerate(expectations))
+    return [r for _, _, r in heapq.nlargest(k, scored, key=lambda entry: entry[:2])]
+
+
+def fingerprint(method: str, url: str, json_body: Any) -> Fingerprint:
+    parts = urlsplit(url)
+    return (method.upper(), parts.netloc.lower(), _segments(parts.path), _keys(json_body))
+
+
+def expected_fingerprint(request: Request) -> Fingerprint:
+    # JSON bodies keep the expected object in body, the keys of other bodies are empty
+    body = getattr(request.body, 'body', None)
+    host, segments = _host_and_segments(request.full_url)
+    return (request.method.upper(), host, segments, _keys(body))
+
+
+@functools.lru_cache(maxsize=4096)
+def _host_and_segments(url: str) -> Tuple[str, Tuple[str, ...]]:
+    """
+    Host and path segments of the full url, including the path of the base url
+    """
+    parts = urlsplit(url)
+    return parts.netloc.lower(), _segments(parts.path)
+
+
+def _segments(path: str) -> Tuple[str, ...]:
+    return tuple(filter(None, path.lower().split('/')))
+
+
+def _keys(json_body: Any) -> FrozenSet[str]:
+    return frozenset(json_body) if isinstance(json_body, dict) else frozenset()
+
+
+def similarity(received: Fingerprint, expected: Fingerprint) -> float:
+    method, host, segments, keys = received
+    expected_method, expected_host, expected_segments, expected_keys = expected
+
+    score = 0.0
+    if method == expected_method:
+        score += 2
+    if host == expected_host:
+        score += 6
+
+    common = 0
+    for segment, expected_segment in zip(segments, expected_segments):
+        if segment != expected_segment and not expected_segment.startswith('{'):
+            break
+        common += 1
+    score += 3 * common / max(len(segments), len(expected_segments), 1)
+
+    if keys or expected_keys:
+        score += len(keys & expected_keys) / len(keys | expected_keys)
+    return score
+
+
+def truncate(text: str, max_length: int) -> str:
+    if len(text) <= max_length:
+        return text
+    return f'{text[:max_length]}... ({len(text) - max_length} more characters)'
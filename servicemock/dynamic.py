@@ -0,0 +1,131 @@
+"""
+Response bodies computed from the matched request.
+
+One expectation like GET /v1/users/{id} responding with a Generated body simulates a whole collection.
+Rendered bodies can be memoized by the normalized request, so repeated identical requests reuse the bytes.
+"""
+from __future__ import annotations
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+from urllib.parse import parse_qs, parse_qsl, urlsplit
+import json
+import threading
+
+import requests_mock  # type: ignore
+
+from .matchers import PathTemplate
+from .servicemock import Cookie, ReceivedBody, RequestUriBuilder, ResponseBody, cookie_jar, freeze
+
+
+class MatchedRequest:
+    """
+    Request given to the render function of Generated body. Body is decoded lazily.
+    """
+
+    def __init__(self, request: Any, path_params: Dict[str, str]):
+        self._request = request
+        self.method: str = request.method
+        self.url: str = request.url
+        self.headers: Any = request.headers
+        self.path_params = path_params
+
+    @property
+    def query(self) -> Dict[str, List[str]]:
+        return parse_qs(urlsplit(self.url).query, keep_blank_values=True)
+
+    @property
+    def body(self) -> Optional[bytes]:
+        return ReceivedBody.of(self._request).raw
+
+    @property
+    def text(self) -> Optional[str]:
+        return ReceivedBody.of(self._request).text
+
+    @property
+    def json(self) -> Any:
+        return ReceivedBody.of(self._request).json
+
+
+class Generated(ResponseBody):
+    """
+    Body rendered for every response by render, which takes a MatchedRequest and returns bytes, text or
+    a JSON serializable value. Placeholders of a path template are in MatchedRequest.path_params.
+
+    With cache_size, rendered bodies of cache_size most recently used distinct requests are kept. Requests
+    are the same, when their method, URL (query parameters in any order) and body (JSON in any key order)
+    are, so render has to depend only on those.
+    """
+    __slots__ = ('_render', '_cache_size', '_headers', '_cookies')
+
+    _render: Callable[[MatchedRequest], Any]
+    _cache_size: int
+    _headers: Optional[Dict[str, str]]
+    _cookies: Optional[requests_mock.CookieJar]
+
+    def __init__(self, render: Callable[[MatchedRequest], Any], cache_size: int = 0,
+                 headers: Optional[Dict[str, str]] = None, cookies: Optional[Sequence[Cookie]] = None):
+        self._set(_render=render, _cache_size=cache_size, _headers=headers, _cookies=cookie_jar(cookies) if cookies else None)
+
+    def register(self, builder: RequestUriBuilder):
+        template = builder.url if isinstance(builder.url, PathTemplate) else None
+        cache = LRUCache(self._cache_size) if self._cache_size > 0 else None
+
+        def content(request: Any, context: Any) -> bytes:
+            if cache is None:
+                return self._content(request, template)
+            return cache.get_or_set(normalized_request(request), lambda: self._content(request, template))
+
+        builder.set_response(content=content, headers=self._headers, cookies=self._cookies)
+
+    def _content(self, request: Any, template: Optional[PathTemplate]) -> bytes:
+        match = template.search(request.url) if template is not None else None
+        body = self._render(MatchedRequest(request, match.groupdict() if match else {}))
+        if isinstance(body, bytes):
+            return body
+        if isinstance(body, str):
+            return body.encode('utf-8')
+        return json.dumps(body).encode('utf-8')
+
+
+class LRUCache:
+    """
+    Thread-safe cache keeping maxsize most recently used values
+    """
+
+    def __init__(self, maxsize: int):
+        self._maxsize = maxsize
+        self._values: OrderedDict[Hashable, Any] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_set(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        with self._lock:
+            if key in self._values:
+                self._values.move_to_end(key)
+                return self._values[key]
+
+        # Computed outside the lock, so a slow render does not block other requests
+        value = compute()
+        with self._lock:
+            self._values[key] = value
+            self._values.move_to_end(key)
+            if len(self._values) > self._maxsize:
+                self._values.popitem(last=False)
+        return value
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+
+def normalized_request(request: Any) -> Tuple[Hashable, ...]:
+    """
+    Key, which is equal for requests with same method, URL and body, ignoring the order of query parameters
+    and JSON object keys. JSON values of different types, like 1 and true, give different keys.
+    """
+    parts = urlsplit(request.url)
+    query = tuple(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    url = (parts.scheme.lower(), parts.netloc.lower(), parts.path, query)
+
+    body = ReceivedBody.of(request)
+    if body.json is not None:
+        return (request.method.upper(), url, 'json', freeze(body.json, typed=True))
+    return (request.method.upper(), url, 'raw', body.raw)
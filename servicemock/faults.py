@@ -0,0 +1,152 @@
+"""
+Latency, bandwidth and failure injection for mocked responses.
+
+Faults are applied in the thread making the request, so a delayed response does not hold up
+requests made from other threads. Event loops respond inline and defer the sleeps instead (see
+deferred_sleeps), so they can await them without blocking other requests.
+"""
+from __future__ import annotations
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, List, Optional, Tuple, Union
+import io
+import random
+import threading
+import time
+
+import requests
+
+from .servicemock import Frozen
+from .streams import RawStream
+
+# Types
+Delay = Union[float, Tuple[float, float], Callable[[random.Random], float]]
+Body = Union[bytes, io.RawIOBase, None]
+Content = Union[Body, Callable[[Any, Any], Body]]
+
+_deferred = threading.local()
+
+
+def sleep(seconds: float):
+    """
+    Sleeps, unless sleeps are deferred in this thread
+    """
+    sleeps = getattr(_deferred, 'sleeps', None)
+    if sleeps is None:
+        time.sleep(seconds)
+    else:
+        sleeps.append(seconds)
+
+
+@contextmanager
+def deferred_sleeps() -> Iterator[List[float]]:
+    """
+    Collects the sleeps of the faults injected in this thread to the yielded list instead of sleeping
+    """
+    previous = getattr(_deferred, 'sleeps', None)
+    sleeps: List[float] = []
+    _deferred.sleeps = sleeps
+    try:
+        yield sleeps
+    finally:
+        _deferred.sleeps = previous
+
+
+class Faults(Frozen):
+    """
+    Fault profile of responses.
+
+    delay is seconds before responding: a number, a (min, max) tuple for uniform distribution or a
+    function taking the profile's random generator, e.g. lambda rng: rng.expovariate(10).
+    bandwidth limits the body to bytes per second and chunk_size the bytes returned per read.
+    reset_rate and timeout_rate are probabilities of resetting the connection or timing out.
+    A timeout waits for the request's read timeout, if it has one, before raising.
+    Random choices are made with random.Random(seed), so seeded profiles are reproducible.
+    """
+    __slots__ = ('delay', 'bandwidth', 'chunk_size', 'reset_rate', 'timeout_rate', '_random', '_sleep')
+
+    delay: Optional[Delay]
+    bandwidth: Optional[int]
+    chunk_size: Optional[int]
+    reset_rate: float
+    timeout_rate: float
+    _random: random.Random
+    _sleep: Callable[[float], None]
+
+    def __init__(self, delay: Optional[Delay] = None, bandwidth: Optional[int] = None, chunk_size: Optional[int] = None,
+                 reset_rate: float = 0.0, timeout_rate: float = 0.0, seed: Optional[int] = None,
+                 sleep: Callable[[float], None] = sleep):
+        self._set(delay=delay, bandwidth=bandwidth, chunk_size=chunk_size, reset_rate=reset_rate,
+                  timeout_rate=timeout_rate, _random=random.Random(seed), _sleep=sleep)
+
+    def body(self, content: Content) -> Callable[[Any, Any], io.RawIOBase]:
+        """
+        requests_mock body callback injecting the faults before returning content
+        """
+        def _body(request: Any, context: Any) -> io.RawIOBase:
+            self.inject(request)
+            body = content(request, context) if callable(content) else content
+            if body is None or isinstance(body, bytes):
+                body = io.BytesIO(body or b'')  # type: ignore
+            return ThrottledStream(body, self.bandwidth, self.chunk_size, self._sleep)
+        return _body
+
+    def inject(self, request: Any):
+        timeout = _read_timeout(getattr(request, 'timeout', None))
+
+        if self._random.random() < self.timeout_rate:
+            if timeout is not None:
+                self._sleep(timeout)
+            raise requests.exceptions.ReadTimeout(f'Injected timeout for {request.method} {request.url}', request=request)
+
+        if self._random.random() < self.reset_rate:
+            raise requests.exceptions.ConnectionError(ConnectionResetError(f'Injected connection reset for {request.method} {request.url}'),
+                                                      request=request)
+
+        delay = self._delay()
+        if delay <= 0:
+            return
+        if timeout is not None and delay > timeout:
+            self._sleep(timeout)
+            raise requests.exceptions.ReadTimeout(f'Injected delay {delay:.3f}s exceeds timeout {timeout}s', request=request)
+        self._sleep(delay)
+
+    def _delay(self) -> float:
+        if self.delay is None:
+            return 0.0
+        if callable(self.delay):
+            return self.delay(self._random)
+        if isinstance(self.delay, tuple):
+            return self._random.uniform(*self.delay)
+        return self.delay
+
+
+class ThrottledStream(RawStream):
+    """
+    Stream reading the source in chunks of chunk_size bytes at most bandwidth bytes per second
+    """
+
+    def __init__(self, source: Any, bandwidth: Optional[int] = None, chunk_size: Optional[int] = None,
+                 sleep: Callable[[float], None] = sleep):
+        self._source = source
+        self._bandwidth = bandwidth
+        self._chunk_size = chunk_size
+        self._sleep = sleep
+
+    def read_chunk(self, size: int) -> Any:
+        if self._chunk_size:
+            size = min(size, self._chunk_size)
+
+        data = self._source.read(size)
+        if data and self._bandwidth:
+            self._sleep(len(data) / self._bandwidth)
+        return data
+
+    def close(self):
+        self._source.close()
+        super().close()
+
+
+def _read_timeout(timeout: Any) -> Optional[float]:
+    if isinstance(timeout, tuple):
+        timeout = timeout[1]
+    return timeout
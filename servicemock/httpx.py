@@ -0,0 +1,73 @@
+"""
+httpx transports routing requests to servicemock expectations.
+
+    client = httpx.Client(transport=servicemock.httpx.Transport())
+    async_client = httpx.AsyncClient(transport=servicemock.httpx.AsyncTransport())
+"""
+from typing import Optional
+import asyncio
+
+import httpx  # type: ignore
+import requests
+import requests_mock  # type: ignore
+
+from .faults import deferred_sleeps
+from .servicemock import current_context
+from .server import encoded_content, set_cookie_headers
+
+
+class _Transport:
+
+    def __init__(self, m: Optional[requests_mock.Mocker] = None):
+        self._m = m
+
+    def _handle(self, request: httpx.Request, body: bytes) -> httpx.Response:
+        prepared = requests.PreparedRequest()
+        prepared.method = request.method
+        prepared.url = str(request.url)
+        prepared.headers = requests.structures.CaseInsensitiveDict(request.headers.multi_items())
+        prepared.body = body or None
+
+        try:
+            response = current_context().adapter(self._m).send(prepared)
+        except requests.exceptions.Timeout as e:
+            raise httpx.ReadTimeout(str(e), request=request) from e
+        except requests.exceptions.ConnectionError as e:
+            raise httpx.ConnectError(str(e), request=request) from e
+
+        headers = [(k, v) for k, v in response.headers.items() if k.lower() != 'set-cookie']
+        headers += [('Set-Cookie', cookie) for cookie in set_cookie_headers(response)]
+        return httpx.Response(
+            response.status_code,
+            headers=headers,
+            content=encoded_content(response),
+            request=request,
+            extensions={'reason_phrase': (response.reason or '').encode('ascii')},
+        )
+
+
+class Transport(_Transport, httpx.BaseTransport):
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        return self._handle(request, request.read())
+
+
+class AsyncTransport(_Transport, httpx.AsyncBaseTransport):
+    """
+    Requests are handled on the event loop. Delays of injected faults are awaited instead of slept.
+    """
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        body = await request.aread()
+        error: Optional[httpx.TransportError] = None
+        with deferred_sleeps() as sleeps:
+            try:
+                response = self._handle(request, body)
+            except httpx.TransportError as e:
+                error = e
+
+        if sleeps:
+            await asyncio.sleep(sum(sleeps))
+        if error is not None:
+            raise error
+        return response
@@ -0,0 +1,95 @@
+from __future__ import annotations
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import heapq
+import itertools
+import operator
+from urllib.parse import urlparse
+
+from .matchers import PathTemplate
+
+# Types
+Key = Tuple[str, str, str, str]
+HostKey = Tuple[str, str, str]
+Entry = Tuple[int, Any]
+
+_by_sequence = operator.itemgetter(0)
+
+
+class MatcherIndex:
+    """
+    Registered matchers bucketed by method, scheme, netloc and path.
+
+    Path templates are bucketed by method, scheme and netloc. Matchers, which can not be bucketed (regex or
+    ANY url, relative url, ANY method or custom matchers), are kept in a fallback bucket, which is consulted
+    for every request.
+    """
+
+    def __init__(self, case_sensitive: bool = False):
+        self._case_sensitive = case_sensitive
+        self._buckets: Dict[Key, List[Entry]] = {}
+        self._host_buckets: Dict[HostKey, List[Entry]] = {}
+        self._fallback: List[Entry] = []
+        self._sequence = itertools.count()
+
+    def add(self, matcher: Any):
+        entry = (next(self._sequence), matcher)
+        key = self._matcher_key(matcher)
+        if key is not None:
+            self._buckets.setdefault(key, []).append(entry)
+            return
+
+        host_key = self._matcher_host_key(matcher)
+        if host_key is not None:
+            self._host_buckets.setdefault(host_key, []).append(entry)
+        else:
+            self._fallback.append(entry)
+
+    def candidates(self, request: Any) -> Iterator[Any]:
+        """
+        Matchers, which may match the request, the latest registered first
+        """
+        key = self._request_key(request)
+        buckets = [bucket for bucket in (self._buckets.get(key), self._host_buckets.get(key[:3]), self._fallback) if bucket]
+        if not buckets:
+            return
+        if len(buckets) == 1:
+            entries: Iterator[Entry] = reversed(buckets[0])
+        else:
+            entries = heapq.merge(*(reversed(bucket) for bucket in buckets), key=_by_sequence, reverse=True)
+
+        for _, matcher in entries:
+            yield matcher
+
+    def clear(self):
+        self._buckets = {}
+        self._host_buckets = {}
+        self._fallback = []
+
+    def __len__(self) -> int:
+        return (sum(len(bucket) for bucket in self._buckets.values()) + sum(len(bucket) for bucket in self._host_buckets.values())
+                + len(self._fallback))
+
+    def _matcher_key(self, matcher: Any) -> Optional[Key]:
+        method = getattr(matcher, '_method', None)
+        url = getattr(matcher, '_url', None)
+        if not isinstance(method, str) or not isinstance(url, str):
+            return None
+
+        parts = urlparse(url)
+        if not parts.scheme or not parts.netloc:
+            return None
+
+        path = parts.path or '/'
+        if not self._case_sensitive:
+            path = path.lower()
+        return (method.upper(), parts.scheme.lower(), parts.netloc.lower(), path)
+
+    def _matcher_host_key(self, matcher: Any) -> Optional[HostKey]:
+        method = getattr(matcher, '_method', None)
+        url = getattr(matcher, '_url', None)
+        if not isinstance(method, str) or not isinstance(url, PathTemplate):
+            return None
+        return (method.upper(), url.scheme, url.netloc)
+
+    def _request_key(self, request: Any) -> Key:
+        return (request.method.upper(), request.scheme.lower(), request.netloc.lower(), request.path or '/')
@@ -0,0 +1,190 @@
+"""
+Journal of the requests received by servicemock adapters, matched or not.
+
+The journal keeps the latest size requests. Request bodies are dropped by default. They can be kept in
+memory, stored as sha256 digests only or spilled to temporary files of bounded size. Only bytes and text
+bodies are stored, streamed (file and generator) bodies are never read.
+"""
+from __future__ import annotations
+from collections import deque
+from typing import Any, Deque, Dict, IO, List, Optional, Tuple
+import hashlib
+import tempfile
+import threading
+import time
+
+# Body storage modes
+KEEP = 'keep'
+HASH = 'hash'
+SPILL = 'spill'
+DROP = 'drop'
+
+_MODES = (KEEP, HASH, SPILL, DROP)
+
+DEFAULT_SPILL_SIZE = 64 * 1024 * 1024
+
+
+class JournalEntry:
+    """
+    Received request. matched is the expectation, which matched the request, or None.
+    """
+    __slots__ = ('sequence', 'time', 'method', 'url', 'host', 'path', 'headers', 'matched', '_body', '_digest', '_journal')
+
+    def __init__(self, sequence: int, method: str, url: str, host: str, path: str, headers: Dict[str, str],
+                 matched: Any, body: Any, digest: Optional[str], journal: Journal):
+        self.sequence = sequence
+        self.time = time.time()
+        self.method = method
+        self.url = url
+        self.host = host
+        self.path = path
+        self.headers = headers
+        self.matched = matched
+        self._body = body
+        self._digest = digest
+        self._journal = journal
+
+    @property
+    def body(self) -> Optional[bytes]:
+        """
+        Body of the request, None if it had no body, it was streamed, it is not stored or its spill file
+        has been rotated away
+        """
+        if isinstance(self._body, tuple):
+            return self._journal._read_spilled(*self._body)
+        return self._body
+
+    @property
+    def body_sha256(self) -> Optional[str]:
+        """
+        Hex digest of the body, computed when first needed, None when the body is not available
+        """
+        if self._digest is None:
+            body = self.body
+            if body is not None:
+                self._digest = hashlib.sha256(body).hexdigest()
+        return self._digest
+
+    def __repr__(self) -> str:
+        return f'<JournalEntry {self.sequence} {self.method} {self.url}>'
+
+
+class Journal:
+    """
+    Ring buffer of the latest size requests indexed by host and by host and path.
+
+    bodies is one of 'drop', 'keep', 'hash' (only body_sha256 is stored) or 'spill'. Spilled bodies are
+    appended to a temporary file. When it grows over half of spill_size, it is rotated: the previous file is
+    removed, together with the bodies of the older entries in it. Files are removed when the journal is closed.
+    """
+
+    def __init__(self, size: int = 1000, bodies: str = DROP, spill_size: int = DEFAULT_SPILL_SIZE):
+        if bodies not in _MODES:
+            raise ValueError(f"Unknown body storage '{bodies}', expected one of {', '.join(_MODES)}")
+        self._size = size
+        self._bodies = bodies
+        self._spill_size = spill_size
+        self._lock = threading.Lock()
+        self._entries: Deque[JournalEntry] = deque()
+        self._by_host: Dict[str, Deque[JournalEntry]] = {}
+        self._by_path: Dict[Tuple[str, str], Deque[JournalEntry]] = {}
+        self._sequence = 0
+        # Current and previous spill files by their generation
+        self._spills: Dict[int, IO[bytes]] = {}
+        self._generation = 0
+
+    def record(self, request: Any, matched: Any = None):
+        body = request.body
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        elif not isinstance(body, (bytes, bytearray)) or self._bodies == DROP:
+            body = None
+        host = request.netloc.lower()
+        path = request.path or '/'
+        digest = hashlib.sha256(body).hexdigest() if body and self._bodies == HASH else None
+
+        with self._lock:
+            stored = self._store(body)
+            self._sequence += 1
+            entry = JournalEntry(self._sequence, request.method.upper(), request.url, host, path, dict(request.headers),
+                                 matched, stored, digest, self)
+            self._entries.append(entry)
+            self._by_host.setdefault(host, deque()).append(entry)
+            self._by_path.setdefault((host, path), deque()).append(entry)
+            if len(self._entries) > self._size:
+                self._evict()
+
+    def _store(self, body: Optional[bytes]) -> Any:
+        if not body or self._bodies in (HASH, DROP):
+            return None
+        if self._bodies == KEEP:
+            return bytes(body)
+
+        spill = self._spills.get(self._generation)
+        if spill is None or spill.tell() + len(body) > self._spill_size // 2 and spill.tell() > 0:
+            spill = self._rotate()
+        offset = spill.tell()
+        spill.write(body)
+        return (self._generation, offset, len(body))
+
+    def _rotate(self) -> IO[bytes]:
+        previous = self._spills.pop(self._generation - 1, None)
+        if previous is not None:
+            previous.close()
+        self._generation += 1
+        spill = self._spills[self._generation] = tempfile.TemporaryFile()
+        return spill
+
+    def _evict(self):
+        # The oldest entry is the oldest one in its host and path buckets too
+        entry = self._entries.popleft()
+        for index, key in ((self._by_host, entry.host), (self._by_path, (entry.host, entry.path))):
+            bucket = index[key]  # type: ignore
+            bucket.popleft()
+            if not bucket:
+                del index[key]  # type: ignore
+
+    def _read_spilled(self, generation: int, offset: int, length: int) -> Optional[bytes]:
+        with self._lock:
+            spill = self._spills.get(generation)
+            if spill is None:
+                return None
+            end = spill.tell()
+            try:
+                spill.seek(offset)
+                return spill.read(length)
+            finally:
+                spill.seek(end)
+
+    def query(self, method: Optional[str] = None, url: Optional[str] = None, host: Optional[str] = None,
+              path: Optional[str] = None, matched: Optional[bool] = None) -> List[JournalEntry]:
+        """
+        Journaled requests, the oldest first. url is compared to the whole URL, host and path case insensitively.
+        """
+        host = host.lower() if host is not None else None
+        with self._lock:
+            if host is not None and path is not None:
+                entries: Any = self._by_path.get((host, path), ())
+            elif host is not None:
+                entries = self._by_host.get(host, ())
+            else:
+                entries = self._entries
+            entries = list(entries)
+
+        method = method.upper() if method is not None else None
+        return [
+            e for e in entries
+            if (method is None or e.method == method)
+            and (url is None or e.url == url)
+            and (path is None or e.path == path)
+            and (matched is None or (e.matched is not None) == matched)
+        ]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def close(self):
+        with self._lock:
+            for spill in self._spills.values():
+                spill.close()
+            self._spills = {}
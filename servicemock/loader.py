@@ -0,0 +1,205 @@
+"""
+Bulk loading of expectations from JSON, JSONL and YAML contract files.
+
+Each expectation is an object like:
+
+    {
+        "base_url": "http://my-service.com",
+        "request": {"method": "POST", "url": "/v1/users", "headers": {"x-token": "deadbeef"}, "json": {"name": "john"}},
+        "response": {"status": "200 OK", "headers": {"Cf-Ipcountry": "US"}, "json": {"id": 1}}
+    }
+
+Request url may be a path template like "/v1/users/{id}" and "query" an object of expected query parameters.
+
+JSON files hold an array of expectations, JSONL files one expectation per line and YAML files one expectation
+or a list of them per document. Files are read as a stream. Parsed expectations are cached in compiled
+(pickled) form keyed by the file's path, modification time and size, so later runs skip parsing. Corrupted
+caches are removed and the file is parsed again.
+"""
+from __future__ import annotations
+from typing import Any, Dict, IO, Iterator, Optional, Tuple
+import hashlib
+import itertools
+import json
+import os
+import pickle
+
+import requests_mock  # type: ignore
+
+from . import matchers, servicemock
+from .servicemock import Request, Response, JSONRequestBody, JSON, Text, Cookie, ResponseBody, expect
+
+# Types
+Record = Tuple[str, Request, Response]
+
+DEFAULT_CACHE_DIR = '.servicemock_cache'
+
+_CHUNK_SIZE = 64 * 1024
+
+
+def _cache_version(*modules: Any) -> str:
+    """
+    Version of the cache format and of the __slots__ of the pickled classes, so caches pickled with an
+    older layout of the classes are not loaded
+    """
+    layout = sorted(
+        f'{cls.__qualname__}:{",".join(vars(cls)["__slots__"])}'
+        for module in modules for cls in vars(module).values()
+        if isinstance(cls, type) and cls.__module__ == module.__name__ and '__slots__' in vars(cls)
+    )
+    return '3-' + hashlib.sha1('\n'.join(layout).encode('utf-8')).hexdigest()[:12]
+
+
+_CACHE_VERSION = _cache_version(servicemock, matchers)
+
+
+def load_expectations(path: str, m: Optional[requests_mock.Mocker] = None, cache_dir: Optional[str] = DEFAULT_CACHE_DIR) -> int:
+    """
+    Registers expectations from the file. Returns the number of expectations registered.
+
+    Caching is disabled by giving None as cache_dir.
+    """
+    records = _parse(path) if cache_dir is None else _cached(path, cache_dir)
+    count = 0
+    for base_url, request, response in records:
+        expect(base_url, m).to_receive(request).and_responds(response)
+        count += 1
+    return count
+
+
+def _cached(path: str, cache_dir: str) -> Iterator[Record]:
+    stat = os.stat(path)
+    key = f'{_CACHE_VERSION}:{os.path.abspath(path)}:{stat.st_mtime_ns}:{stat.st_size}'
+    cache_path = os.path.join(cache_dir, hashlib.sha1(key.encode('utf-8')).hexdigest() + '.pickle')
+
+    try:
+        f = open(cache_path, 'rb')
+    except FileNotFoundError:
+        yield from _parse_to_cache(path, cache_path)
+        return
+
+    loaded = 0
+    with f:
+        size = os.fstat(f.fileno()).st_size
+        try:
+            while f.tell() < size:
+                record = pickle.load(f)
+                yield record
+                loaded += 1
+            return
+        except (pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            # Truncated or otherwise corrupted cache
+            pass
+
+    os.remove(cache_path)
+    yield from itertools.islice(_parse_to_cache(path, cache_path), loaded, None)
+
+
+def _parse_to_cache(path: str, cache_path: str) -> Iterator[Record]:
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    tmp_path = f'{cache_path}.{os.getpid()}.tmp'
+    try:
+        with open(tmp_path, 'wb') as f:
+            for record in _parse(path):
+                pickle.dump(record, f, protocol=pickle.HIGHEST_PROTOCOL)
+                yield record
+        os.replace(tmp_path, cache_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _parse(path: str) -> Iterator[Record]:
+    extension = os.path.splitext(path)[1].lower()
+    with open(path, 'r', encoding='utf-8') as f:
+        if extension == '.jsonl':
+            documents = _read_jsonl(f)
+        elif extension in ('.yaml', '.yml'):
+            documents = _read_yaml(f)
+        elif extension == '.json':
+            documents = _read_json(f)
+        else:
+            raise ValueError(f"Unsupported expectation file '{path}', expected .json, .jsonl, .yaml or .yml")
+
+        for number, document in enumerate(documents, 1):
+            try:
+                yield _record(document)
+            except (KeyError, TypeError, ValueError) as e:
+                raise ValueError(f"Invalid expectation #{number} in '{path}': {e!r}") from e
+
+
+def _read_jsonl(f: IO[str]) -> Iterator[Any]:
+    for line in f:
+        if line.strip():
+            yield json.loads(line)
+
+
+def _read_yaml(f: IO[str]) -> Iterator[Any]:
+    import yaml  # type: ignore
+
+    for document in yaml.safe_load_all(f):
+        if isinstance(document, list):
+            yield from document
+        elif document is not None:
+            yield document
+
+
+def _read_json(f: IO[str]) -> Iterator[Any]:
+    """
+    Reads the items of a top level array without loading the whole file
+    """
+    decoder = json.JSONDecoder()
+    buffer = f.read(_CHUNK_SIZE).lstrip()
+    if not buffer.startswith('['):
+        document = json.loads(buffer + f.read())
+        yield from document if isinstance(document, list) else [document]
+        return
+
+    pos = 1
+    while True:
+        while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+            pos += 1
+
+        if pos < len(buffer) and buffer[pos] == ']':
+            return
+
+        try:
+            if pos == len(buffer):
+                raise json.JSONDecodeError('Unterminated array', buffer, pos)
+            item, pos = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            more = f.read(max(_CHUNK_SIZE, len(buffer)))
+            if not more:
+                raise
+            buffer = buffer[pos:] + more
+            pos = 0
+            continue
+
+        yield item
+        if pos > _CHUNK_SIZE:
+            buffer = buffer[pos:]
+            pos = 0
+
+
+def _record(document: Dict[str, Any]) -> Record:
+    request = document['request']
+    body = JSONRequestBody(request['json']) if 'json' in request else None
+    expected = Request(request['method'], request['url'], body=body, headers=request.get('headers'), query=request.get('query'))
+
+    response = document.get('response', {})
+    cookies = tuple(Cookie(**cookie) for cookie in response.get('cookies', ()))
+    return (
+        document['base_url'],
+        expected,
+        Response(response.get('status', '200 OK'), body=_response_body(response), headers=response.get('headers'),
+                 cookies=cookies or None),
+    )
+
+
+def _response_body(response: Dict[str, Any]) -> Optional[ResponseBody]:
+    gzip = response.get('gzip', False)
+    if 'json' in response:
+        return JSON(response['json'], gzip=gzip)
+    if 'text' in response:
+        return Text(response['text'], gzip=gzip)
+    return None
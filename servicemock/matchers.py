@@ -0,0 +1,252 @@
+"""
+Structured matchers compiled once, when the expectation is created.
+
+Path templates like '/v1/users/{id}' match any single path segment in place of '{id}'. Query parameters,
+headers and JSONPath values are matched with expected values, which are compared for equality, matched fully
+by compiled regular expressions or given to predicate functions.
+"""
+from __future__ import annotations
+from typing import Any, Callable, Dict, FrozenSet, Iterator, List, Mapping, Optional, Tuple, Union
+from urllib.parse import parse_qs, urlsplit
+import re
+
+# Types
+Step = Union[str, int, None]
+
+_PLACEHOLDER = re.compile(r'{([A-Za-z_][A-Za-z0-9_]*)}')
+_JSONPATH_STEP = re.compile(r"\.([A-Za-z_][A-Za-z0-9_-]*)|\[(\d+)\]|\[\*\]|\.\*|\['([^']*)'\]|\[\"([^\"]*)\"\]")
+_WILDCARD = None
+
+
+def is_template(url: str) -> bool:
+    return _PLACEHOLDER.search(url) is not None
+
+
+class PathTemplate:
+    """
+    URL, which path has placeholders matching a single path segment each.
+
+    Used as URL of requests_mock matcher, which calls search with the requested URL.
+    """
+
+    def __init__(self, url: str):
+        parts = urlsplit(url)
+        self.url = url
+        self.scheme = parts.scheme.lower()
+        self.netloc = parts.netloc.lower()
+
+        pattern = []
+        position = 0
+        for placeholder in _PLACEHOLDER.finditer(parts.path):
+            pattern.append(re.escape(parts.path[position:placeholder.start()]))
+            pattern.append(f'(?P<{placeholder.group(1)}>[^/?#]+)')
+            position = placeholder.end()
+        pattern.append(re.escape(parts.path[position:]))
+        self._regex = re.compile(f"^{re.escape(f'{self.scheme}://{self.netloc}')}{''.join(pattern)}(?:[?#]|$)", re.IGNORECASE)
+
+    def search(self, url: str) -> Any:
+        return self._regex.search(url)
+
+    def __str__(self) -> str:
+        return self.url
+
+
+def compile_value(expected: Any) -> Callable[[Any], bool]:
+    """
+    Function telling whether the value is the expected one
+    """
+    if isinstance(expected, re.Pattern):
+        return _FullMatch(expected)
+    if callable(expected):
+        return expected
+    return _Equals(expected)
+
+
+class _Equals:
+
+    def __init__(self, expected: Any):
+        self._expected = expected
+
+    def __call__(self, value: Any) -> bool:
+        return value == self._expected
+
+
+class _FullMatch:
+
+    def __init__(self, pattern: re.Pattern):
+        self._pattern = pattern
+
+    def __call__(self, value: Any) -> bool:
+        return isinstance(value, str) and self._pattern.fullmatch(value) is not None
+
+
+def describe_value(expected: Any) -> str:
+    if isinstance(expected, re.Pattern):
+        return f're:{expected.pattern}'
+    if callable(expected):
+        return getattr(expected, '__name__', repr(expected))
+    return repr(expected)
+
+
+class QueryMatcher:
+    """
+    Query parameters, which have to be present in the request. Other parameters are allowed.
+
+    A parameter matches if any of its values in the request is the expected one. Expected values are strings,
+    compiled regular expressions or predicates of the string value.
+    """
+
+    def __init__(self, params: Mapping[str, Any]):
+        for name, expected in params.items():
+            if not isinstance(expected, (str, re.Pattern)) and not callable(expected):
+                raise TypeError(f"Query parameter '{name}' expected {expected!r}, which is not a string, "
+                                f"a regular expression or a predicate. Query parameters are strings.")
+        self._params = dict(params)
+        self._compiled: List[Tuple[str, Callable[[Any], bool]]] = [(name, compile_value(v)) for name, v in params.items()]
+
+    def match(self, url: str) -> bool:
+        received = parse_qs(urlsplit(url).query, keep_blank_values=True)
+        for name, matches in self._compiled:
+            if not any(matches(value) for value in received.get(name, ())):
+                return False
+        return True
+
+    def __str__(self) -> str:
+        return '{' + ', '.join(f'{name!r}: {describe_value(v)}' for name, v in self._params.items()) + '}'
+
+
+class _Presence:
+
+    def __init__(self, present: bool):
+        self.present = present
+
+    def __repr__(self) -> str:
+        return 'PRESENT' if self.present else 'ABSENT'
+
+
+# Expected header values, which only require the header to be in the request or not to be
+PRESENT = _Presence(True)
+ABSENT = _Presence(False)
+
+
+class _ContainsAll:
+
+    def __init__(self, expected: FrozenSet[str]):
+        self._expected = expected
+
+    def __call__(self, value: str) -> bool:
+        return self._expected.issubset(v.strip() for v in value.split(','))
+
+
+class HeaderMatcher:
+    """
+    Request headers, which have to be present in the request, or absent for ABSENT. Other headers are allowed.
+
+    Names are compared case insensitively. A list or tuple of values matches, when they all are among
+    the comma separated values of the header.
+    """
+
+    def __init__(self, headers: Mapping[str, Any]):
+        self._headers = dict(headers)
+        self._compiled: Tuple[Tuple[str, bool, Optional[Callable[[Any], bool]]], ...] = tuple(
+            (name.lower(),) + _compile_header_value(v) for name, v in headers.items())
+
+    def match(self, headers: Mapping[str, Any]) -> bool:
+        for name, present, matches in self._compiled:
+            value = headers.get(name)
+            if value is None:
+                if present:
+                    return False
+            elif not present or (matches is not None and not matches(value)):
+                return False
+        return True
+
+    def __str__(self) -> str:
+        return '{' + ', '.join(f'{name!r}: {describe_value(v)}' for name, v in self._headers.items()) + '}'
+
+
+def _compile_header_value(expected: Any) -> Tuple[bool, Optional[Callable[[Any], bool]]]:
+    if isinstance(expected, _Presence):
+        return (expected.present, None)
+    if isinstance(expected, (list, tuple)):
+        return (True, _ContainsAll(frozenset(expected)))
+    return (True, compile_value(expected))
+
+
+class JSONPath:
+    """
+    Compiled JSONPath supporting child keys ($.a.b, $['a']), array indexes ($.a[0]) and wildcards ($.a[*], $.a.*)
+    """
+
+    def __init__(self, path: str):
+        if not path.startswith('$'):
+            raise ValueError(f"JSONPath '{path}' does not start with '$'")
+
+        steps: List[Step] = []
+        position = 1
+        while position < len(path):
+            match = _JSONPATH_STEP.match(path, position)
+            if match is None:
+                raise ValueError(f"Unsupported JSONPath '{path}' at position {position}")
+            key, index, quoted, double_quoted = match.groups()
+            if key is not None:
+                steps.append(key)
+            elif index is not None:
+                steps.append(int(index))
+            elif quoted is not None or double_quoted is not None:
+                steps.append(quoted if quoted is not None else double_quoted)
+            else:
+                steps.append(_WILDCARD)
+            position = match.end()
+
+        self.path = path
+        self._steps: Tuple[Step, ...] = tuple(steps)
+
+    def values(self, document: Any) -> Iterator[Any]:
+        """
+        Values found from the document
+        """
+        return self._values(document, 0)
+
+    def _values(self, value: Any, position: int) -> Iterator[Any]:
+        if position == len(self._steps):
+            yield value
+            return
+
+        step = self._steps[position]
+        if step is _WILDCARD:
+            children = value.values() if isinstance(value, dict) else value if isinstance(value, list) else ()
+            for child in children:
+                yield from self._values(child, position + 1)
+        elif isinstance(step, int):
+            if isinstance(value, list) and step < len(value):
+                yield from self._values(value[step], position + 1)
+        elif isinstance(value, dict) and step in value:
+            yield from self._values(value[step], position + 1)
+
+    def __str__(self) -> str:
+        return self.path
+
+
+def is_subset(expected: Any, value: Any) -> bool:
+    """
+    Whether expected is contained in value: objects may have extra keys, other values have to be equal
+    """
+    if isinstance(expected, dict):
+        if not isinstance(value, dict):
+            return False
+        for key, expected_value in expected.items():
+            if key not in value or not is_subset(expected_value, value[key]):
+                return False
+        return True
+    if isinstance(expected, list):
+        return isinstance(value, list) and len(expected) == len(value) and all(is_subset(e, v) for e, v in zip(expected, value))
+    return expected == value
+
+
+def compile_paths(paths: Mapping[str, Any]) -> Tuple[Tuple[JSONPath, Callable[[Any], bool]], ...]:
+    return tuple((JSONPath(path), compile_value(expected)) for path, expected in paths.items())
+
+
+def describe_paths(paths: Dict[str, Any]) -> str:
+    return '{' + ', '.join(f'{path!r}: {describe_value(v)}' for path, v in paths.items()) + '}'
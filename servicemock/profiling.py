@@ -0,0 +1,136 @@
+"""
+Opt-in instrumentation of servicemock's hot paths.
+
+When enabled, request dispatching, matching of each expectation and registering of expectations are
+timed. Statistics of expectations are aggregated by their description, so the same expectation
+registered by many tests shows up once, including when it was never hit.
+"""
+from __future__ import annotations
+from typing import Any, Dict, List, Tuple
+import json
+import threading
+import time
+
+
+class ExpectationStats:
+    __slots__ = ('registrations', 'attempts', 'hits', 'match_ns', 'body_ns')
+
+    def __init__(self):
+        self.registrations = 0
+        self.attempts = 0
+        self.hits = 0
+        self.match_ns = 0
+        self.body_ns = 0
+
+
+class Profiler:
+
+    def __init__(self):
+        self.enabled = False
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._requests = 0
+        self._unmatched = 0
+        self._send_ns = 0
+        self._registrations = 0
+        self._register_ns = 0
+        self._expectations: Dict[str, ExpectationStats] = {}
+        self._keys: Dict[int, Tuple[Any, str]] = {}
+
+    def reset(self):
+        with self._lock:
+            self._reset()
+
+    def forget_expectations(self):
+        """
+        Drops references to the registered expectations, aggregated statistics are kept
+        """
+        with self._lock:
+            self._keys = {}
+
+    def record_send(self, elapsed_ns: int, matched: bool):
+        with self._lock:
+            self._requests += 1
+            self._send_ns += elapsed_ns
+            if not matched:
+                self._unmatched += 1
+
+    def record_register(self, expectation: Any, elapsed_ns: int, new: bool = True):
+        """
+        Adds the time spent registering the expectation, counting a registration if it is new and not
+        a change of the responses of a registered one
+        """
+        with self._lock:
+            self._registrations += new
+            self._register_ns += elapsed_ns
+            self._expectation(expectation).registrations += new
+
+    def record_match(self, expectation: Any, matched: bool, match_ns: int, body_ns: int):
+        with self._lock:
+            stats = self._expectation(expectation)
+            stats.attempts += 1
+            stats.hits += matched
+            stats.match_ns += match_ns
+            stats.body_ns += body_ns
+
+    def _expectation(self, expectation: Any) -> ExpectationStats:
+        entry = self._keys.get(id(expectation))
+        if entry is None:
+            # Expectation is kept referenced, so its id is not reused while it is in the map
+            entry = (expectation, str(expectation))
+            self._keys[id(expectation)] = entry
+        key = entry[1]
+        if key not in self._expectations:
+            self._expectations[key] = ExpectationStats()
+        return self._expectations[key]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            expectations: List[Dict[str, Any]] = [
+                {
+                    'expectation': key,
+                    'registrations': s.registrations,
+                    'attempts': s.attempts,
+                    'hits': s.hits,
+                    'match_ns': s.match_ns,
+                    'body_ns': s.body_ns,
+                }
+                for key, s in self._expectations.items()
+            ]
+            return {
+                'requests': {'count': self._requests, 'unmatched': self._unmatched, 'total_ns': self._send_ns},
+                'registrations': {'count': self._registrations, 'total_ns': self._register_ns},
+                'expectations': sorted(expectations, key=lambda e: e['match_ns'], reverse=True),
+            }
+
+    def dump(self, path: str, format: str = 'json'):
+        """
+        Writes the statistics as JSON or as folded stacks ('folded') for flamegraph tools
+        """
+        stats = self.stats()
+        with open(path, 'w', encoding='utf-8') as f:
+            if format == 'json':
+                json.dump(stats, f, indent=2)
+            elif format == 'folded':
+                f.write(''.join(f'{line}\n' for line in folded_stacks(stats)))
+            else:
+                raise ValueError(f"Unknown stats format '{format}', expected 'json' or 'folded'")
+
+
+def folded_stacks(stats: Dict[str, Any]) -> List[str]:
+    lines = []
+    matching_ns = 0
+    for e in stats['expectations']:
+        name = e['expectation'].replace(';', ',').replace(' ', '_')
+        lines.append(f"servicemock;send;match;{name};body {e['body_ns']}")
+        lines.append(f"servicemock;send;match;{name} {e['match_ns'] - e['body_ns']}")
+        matching_ns += e['match_ns']
+    lines.append(f"servicemock;send {max(stats['requests']['total_ns'] - matching_ns, 0)}")
+    lines.append(f"servicemock;register {stats['registrations']['total_ns']}")
+    return lines
+
+
+profiler = Profiler()
+perf_counter_ns = time.perf_counter_ns
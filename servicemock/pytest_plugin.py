@@ -0,0 +1,130 @@
+"""
+pytest plugin, registered with the 'pytest11' entry point.
+
+Provides 'servicemock' fixture, which calls servicemock.start() before and servicemock.verify() after the test.
+State is kept per interpreter, so pytest-xdist workers are isolated from each other and the fixture isolates
+tests run by the same worker.
+
+With --servicemock-stats=PATH, matching statistics are collected and written to PATH at the end of the session,
+as folded stacks for flamegraph tools if PATH ends with '.folded' and as JSON otherwise.
+
+With --servicemock-coverage=PATH, contract coverage of the session is written to PATH as JSON and shown in the
+terminal summary. pytest-xdist workers write their coverage to PATH.<worker id>.part files, which the
+controller merges.
+"""
+from typing import Any, Callable, Dict, Iterator, Optional, Sequence, Union, TYPE_CHECKING
+import glob
+import json
+import os
+
+import pytest  # type: ignore
+
+import servicemock as sm
+from .contracts import contract_coverage, merge_reports, text_report
+from .profiling import profiler
+
+if TYPE_CHECKING:
+    from .sets import ExpectationSet
+
+# servicemock is loaded when the fixture is used, so registering the plugin is cheap for tests not using it
+Expectations = Union[Callable[[], None], 'ExpectationSet']
+
+
+def pytest_addoption(parser: Any):
+    parser.getgroup('servicemock').addoption(
+        '--servicemock-stats', metavar='PATH', default=None,
+        help='collect matching statistics and write them to PATH at the end of the session')
+    parser.getgroup('servicemock').addoption(
+        '--servicemock-coverage', metavar='PATH', default=None,
+        help='collect contract coverage and write it to PATH as JSON at the end of the session')
+
+
+# Merged coverage report of the session, shown in the terminal summary
+_coverage_report: Optional[Dict[str, Any]] = None
+
+
+def pytest_configure(config: Any):
+    if config.getoption('servicemock_stats', None):
+        profiler.reset()
+        sm.enable_stats()
+
+    path = config.getoption('servicemock_coverage', None)
+    if path:
+        contract_coverage.reset()
+        sm.enable_coverage()
+        if not _is_worker(config):
+            for part in _coverage_parts(path):
+                os.remove(part)
+
+
+def pytest_sessionfinish(session: Any):
+    global _coverage_report
+    config = session.config
+    path = config.getoption('servicemock_stats', None)
+    if path:
+        sm.dump_stats(path, 'folded' if path.endswith('.folded') else 'json')
+
+    path = config.getoption('servicemock_coverage', None)
+    if path:
+        report = sm.coverage()
+        if _is_worker(config):
+            contract_coverage.dump(f"{path}.{config.workerinput['workerid']}.part", report)
+            return
+
+        reports = [report]
+        for part in _coverage_parts(path):
+            with open(part, encoding='utf-8') as f:
+                reports.append(json.load(f))
+            os.remove(part)
+        _coverage_report = merge_reports(reports)
+        contract_coverage.dump(path, _coverage_report)
+
+
+def pytest_terminal_summary(terminalreporter: Any):
+    if _coverage_report is not None:
+        terminalreporter.write_sep('-', 'servicemock contract coverage')
+        for line in text_report(_coverage_report):
+            terminalreporter.write_line(line)
+
+
+def pytest_unconfigure(config: Any):
+    global _coverage_report
+    if config.getoption('servicemock_stats', None):
+        sm.enable_stats(False)
+    if config.getoption('servicemock_coverage', None):
+        sm.enable_coverage(False)
+        _coverage_report = None
+
+
+def _is_worker(config: Any) -> bool:
+    return hasattr(config, 'workerinput')
+
+
+def _coverage_parts(path: str) -> Sequence[str]:
+    return sorted(glob.glob(f'{glob.escape(path)}.*.part'))
+
+
+@pytest.fixture(scope="session")
+def servicemock_expectations() -> Sequence[Expectations]:
+    """
+    Expectations registered for every test using 'servicemock' fixture: functions registering them or
+    servicemock.ExpectationSet instances, which are registered once and attached to every test.
+
+    Override in conftest.py to share common expectations, like authentication, across the session.
+    """
+    return ()
+
+
+@pytest.fixture(scope="function")
+def servicemock(servicemock_expectations: Sequence[Expectations]) -> Iterator:
+    sm.start()
+    try:
+        for expectations in servicemock_expectations:
+            if isinstance(expectations, sm.ExpectationSet):
+                sm.attach(expectations)
+            else:
+                expectations()
+        yield sm
+        sm.verify()
+    finally:
+        sm.stop()
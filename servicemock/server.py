@@ -0,0 +1,340 @@
+"""
+Local HTTP/1.1 stand-in server serving servicemock expectations.
+
+Requests received by the server are rewritten to the mocked service's base url and matched with the
+same requests_mock adapter, which 'expect' registers the expectations to. This makes the expectations
+available to subprocesses, clients not using requests and load testing tools.
+"""
+from __future__ import annotations
+from typing import Any, Callable, List, Optional, Set, Tuple
+from email.utils import formatdate
+import asyncio
+import functools
+import threading
+
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests_mock.response import _MatcherResponse  # type: ignore
+
+from .faults import deferred_sleeps
+from .servicemock import SequencedResponse
+
+_MAX_HEADER_SIZE = 64 * 1024
+_RENDERED_ATTRIBUTE = '_servicemock_rendered'
+
+_REASONS = {
+    400: 'Bad Request',
+    500: 'Internal Server Error',
+    501: 'Not Implemented',
+}
+
+
+class Server:
+    """
+    HTTP server running an asyncio event loop in a daemon thread
+    """
+
+    def __init__(self, base_url: str, adapter: Any, host: str = '127.0.0.1', port: int = 0):
+        self._base_url = base_url.rstrip('/')
+        self._adapter = adapter
+        self._host = host
+        self._port = port
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._thread: Optional[threading.Thread] = None
+        self._connections: Set[asyncio.BaseTransport] = set()
+
+    @property
+    def host(self) -> str:
+        return self._host
+
+    @property
+    def port(self) -> int:
+        return self._port
+
+    @property
+    def url(self) -> str:
+        """
+        Url to use instead of the mocked base url
+        """
+        return f'http://{self._host}:{self._port}'
+
+    def start(self) -> Server:
+        started = threading.Event()
+        errors: List[BaseException] = []
+        self._thread = threading.Thread(target=self._run, args=(started, errors), name=f'servicemock {self._base_url}',
+                                        daemon=True)
+        self._thread.start()
+        started.wait()
+        if errors:
+            raise errors[0]
+        return self
+
+    def stop(self):
+        loop, thread = self._loop, self._thread
+        if loop is None or thread is None:
+            return
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        self._loop = None
+        self._thread = None
+
+    def __enter__(self) -> Server:
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def _run(self, started: threading.Event, errors: List[BaseException]):
+        loop = asyncio.new_event_loop()
+        try:
+            self._server = loop.run_until_complete(
+                loop.create_server(lambda: _HTTPProtocol(self), self._host, self._port, reuse_address=True))
+            self._port = self._server.sockets[0].getsockname()[1]
+        except BaseException as e:
+            errors.append(e)
+            loop.close()
+            started.set()
+            return
+
+        self._loop = loop
+        started.set()
+        try:
+            loop.run_forever()
+        finally:
+            for transport in list(self._connections):
+                transport.close()
+            # Responses still being made are not written
+            tasks = asyncio.all_tasks(loop)
+            for task in tasks:
+                task.cancel()
+            if tasks:
+                loop.run_until_complete(asyncio.wait(tasks))
+            self._server.close()
+            loop.run_until_complete(self._server.wait_closed())
+            loop.close()
+
+    def respond(self, method: str, target: str, headers: CaseInsensitiveDict, body: bytes) -> bytes:
+        request = requests.PreparedRequest()
+        request.method = method
+        request.url = f'{self._base_url}{target}'
+        request.headers = headers
+        request.body = body or None
+
+        try:
+            head, body = self._adapter.send(request, render=_render_response)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            # Injected faults close the connection without a response
+            raise ConnectionAbortedError(str(e)) from e
+        except Exception as e:
+            return render(500, _REASONS[500], {'Content-Type': 'text/plain; charset=utf-8'}, str(e).encode('utf-8'),
+                          send_body=method != 'HEAD')
+
+        return head + body if method != 'HEAD' else head
+
+
+def _render_response(response: Any, request: Any) -> Tuple[bytes, bytes]:
+    """
+    Head and body of the matched requests_mock response. Static responses, which have no callbacks, are
+    rendered once.
+    """
+    if isinstance(response, SequencedResponse):
+        response = response.select(request)
+
+    rendered = getattr(response, _RENDERED_ATTRIBUTE, None)
+    if rendered is not None:
+        return rendered
+
+    r = response.get_response(request)
+    body = encoded_content(r)
+    rendered = (render(r.status_code, r.reason or '', r.headers, body, set_cookie_headers(r), send_body=False), body)
+    if isinstance(response, _MatcherResponse) and _is_static(response):
+        setattr(response, _RENDERED_ATTRIBUTE, rendered)
+    return rendered
+
+
+def _is_static(response: _MatcherResponse) -> bool:
+    params = response._params
+    return (response._exc is None and params.get('raw') is None
+            and not any(callable(params.get(name)) for name in ('json', 'text', 'content', 'body')))
+
+
+class _HTTPProtocol(asyncio.Protocol):
+    """
+    Minimal HTTP/1.1 server protocol with keep-alive and pipelining support.
+
+    Responses are made on the event loop. Delays of injected faults are awaited instead of slept, so they do
+    not hold up other connections. Requests of a connection are responded in the order they were received.
+    """
+
+    def __init__(self, server: Server):
+        self._server = server
+        self._buffer = bytearray()
+        self._transport: Optional[asyncio.Transport] = None
+        self._last_response: Optional[asyncio.Future] = None
+        self._closing = False
+
+    def connection_made(self, transport):
+        self._transport = transport
+        self._server._connections.add(transport)
+
+    def connection_lost(self, exc):
+        self._server._connections.discard(self._transport)
+
+    def data_received(self, data: bytes):
+        self._buffer += data
+        while self._transport is not None and not self._transport.is_closing() and not self._closing:
+            if not self._handle_request():
+                break
+
+    def _handle_request(self) -> bool:
+        """
+        Handles one complete request from the buffer. Returns False, if more data is needed.
+        """
+        assert self._transport is not None
+        header_end = self._buffer.find(b'\r\n\r\n')
+        if header_end < 0:
+            if len(self._buffer) > _MAX_HEADER_SIZE:
+                self._error(400)
+            return False
+
+        try:
+            method, target, version, headers = _parse_head(bytes(self._buffer[:header_end]))
+        except ValueError:
+            self._error(400)
+            return False
+
+        if 'chunked' in headers.get('Transfer-Encoding', '').lower():
+            self._error(501)
+            return False
+
+        content_length = headers.get('Content-Length', '0')
+        if not (content_length.isascii() and content_length.isdigit()):
+            self._error(400)
+            return False
+
+        body_start = header_end + 4
+        body_end = body_start + int(content_length)
+        if len(self._buffer) < body_end:
+            return False
+
+        body = bytes(self._buffer[body_start:body_end])
+        del self._buffer[:body_end]
+
+        keep_alive = _keep_alive(version, headers)
+        self._respond(functools.partial(self._server.respond, method, target, headers, body), keep_alive)
+        return keep_alive
+
+    def _error(self, code: int):
+        self._respond(functools.partial(render, code, _REASONS[code], {'Connection': 'close'}, b''), keep_alive=False)
+
+    def _respond(self, respond: Callable[[], bytes], keep_alive: bool):
+        if not keep_alive:
+            self._closing = True
+
+        previous = self._last_response
+        if previous is not None and not previous.done():
+            self._last_response = asyncio.get_running_loop().create_task(self._respond_after(previous, respond, keep_alive))
+            return
+
+        delay, response = _respond_deferring_sleeps(respond)
+        if delay > 0:
+            self._last_response = asyncio.get_running_loop().create_task(self._write_later(delay, response, keep_alive))
+        else:
+            self._last_response = None
+            self._write(response, keep_alive)
+
+    async def _respond_after(self, previous: asyncio.Future, respond: Callable[[], bytes], keep_alive: bool):
+        await previous
+        delay, response = _respond_deferring_sleeps(respond)
+        await self._write_later(delay, response, keep_alive)
+
+    async def _write_later(self, delay: float, response: Optional[bytes], keep_alive: bool):
+        if delay > 0:
+            await asyncio.sleep(delay)
+        self._write(response, keep_alive)
+
+    def _write(self, response: Optional[bytes], keep_alive: bool):
+        """
+        Writes the response or resets the connection, if there is no response
+        """
+        assert self._transport is not None
+        if self._transport.is_closing():
+            return
+        if response is None:
+            self._transport.abort()
+            return
+        self._transport.write(response)
+        if not keep_alive:
+            self._transport.close()
+
+
+def _respond_deferring_sleeps(respond: Callable[[], bytes]) -> Tuple[float, Optional[bytes]]:
+    """
+    Response and the seconds injected faults delay it, which the event loop has to wait instead of sleeping.
+    Response is None, if the connection has to be reset.
+    """
+    with deferred_sleeps() as sleeps:
+        try:
+            response: Optional[bytes] = respond()
+        except ConnectionAbortedError:
+            response = None
+    return sum(sleeps), response
+
+
+def _parse_head(head: bytes) -> Tuple[str, str, str, CaseInsensitiveDict]:
+    lines = head.decode('latin-1').split('\r\n')
+    method, target, version = lines[0].split(' ')
+    headers: CaseInsensitiveDict = CaseInsensitiveDict()
+    for line in lines[1:]:
+        name, value = line.split(':', 1)
+        headers[name.strip()] = value.strip()
+    return method, target, version, headers
+
+
+def _keep_alive(version: str, headers: CaseInsensitiveDict) -> bool:
+    connection = headers.get('Connection', '').lower()
+    if version == 'HTTP/1.0':
+        return connection == 'keep-alive'
+    return connection != 'close'
+
+
+def encoded_content(response: requests.Response) -> bytes:
+    """
+    Response body as it would be on the wire, not decoded according to Content-Encoding
+    """
+    if response.raw is None:
+        return b''
+    return response.raw.read(decode_content=False) or b''
+
+
+def set_cookie_headers(response: requests.Response) -> List[str]:
+    cookies = []
+    for cookie in response.cookies:
+        value = f'{cookie.name}={cookie.value}'
+        if cookie.domain_specified:
+            value += f'; Domain={cookie.domain}'
+        if cookie.path_specified:
+            value += f'; Path={cookie.path}'
+        if cookie.expires is not None:
+            value += f'; Expires={formatdate(cookie.expires, usegmt=True)}'
+        if cookie.secure:
+            value += '; Secure'
+        cookies.append(value)
+    return cookies
+
+
+def render(status_code: int, reason: str, headers: Any, body: bytes, cookies: Optional[List[str]] = None,
+           send_body: bool = True) -> bytes:
+    """
+    Response as it is written to the connection. Responses to HEAD requests have the Content-Length of the
+    body, but not the body itself.
+    """
+    lines = [f'HTTP/1.1 {status_code} {reason}']
+    for name, value in headers.items():
+        if name.lower() not in ('content-length', 'transfer-encoding', 'set-cookie'):
+            lines.append(f'{name}: {value}')
+    for cookie in cookies or ():
+        lines.append(f'Set-Cookie: {cookie}')
+    lines.append(f'Content-Length: {len(body)}')
+    return ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + (body if send_body else b'')
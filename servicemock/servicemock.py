@@ -1,34 +1,128 @@
 from __future__ import annotations
-from typing import List, Sequence, Optional, Mapping, Any, Dict
+from typing import List, Sequence, Optional, Mapping, Any, Dict, Hashable, Set, Tuple, Type, TypeVar, TYPE_CHECKING
 from abc import ABC, abstractmethod
+from gzip import compress as gzip_compress
+from urllib.parse import parse_qs, urlparse
+import bisect
 import copy
+import itertools
 import json
+import re
+import threading
 
 import requests
 import requests_mock  # type: ignore
+from requests_mock.response import _MatcherResponse  # type: ignore
+
+from .contracts import contract_coverage
+from .journal import DEFAULT_SPILL_SIZE, Journal, JournalEntry
+from .matchers import HeaderMatcher, PathTemplate, QueryMatcher, compile_paths, describe_paths, is_subset, is_template
+from .profiling import profiler, perf_counter_ns
+
+if TYPE_CHECKING:
+    from .faults import Faults
+    from .sets import CompiledExpectations
+    from .server import Server
+    from .shared import Coordinator
 
 # Types
-Headers = Dict[str, str]
+Limits = Tuple[int, Optional[int]]
+
+DEFAULT_LIMITS: Limits = (1, None)
+
+# Initial state of scenarios
+STARTED = 'started'
+
+# Attribute of the matched request holding the number of times its expectation has been matched
+HITS_ATTRIBUTE = '_servicemock_hits'
+
+# Attribute of the matched request holding its expectation
+EXPECTATION_ATTRIBUTE = '_servicemock_expectation'
+
+_DEFAULT_PORTS = {'http': 80, 'https': 443}
 
 _ctx: Optional[Context] = None
+_journal_options: Dict[str, Any] = {}
+
+F = TypeVar('F', bound='Frozen')
+
+
+class Frozen:
+    """
+    Base for immutable value objects with __slots__.
+
+    Instances are shared instead of copied, so copying returns the instance itself.
+    """
+    __slots__: Tuple[str, ...] = ()
+
+    def _set(self, **values: Any):
+        for name, value in values.items():
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name: str, value: Any):
+        raise AttributeError(f"'{type(self).__name__}' object is immutable")
+
+    def __delattr__(self, name: str):
+        raise AttributeError(f"'{type(self).__name__}' object is immutable")
+
+    def __copy__(self: F) -> F:
+        return self
+
+    def __deepcopy__(self: F, memo: Dict[int, Any]) -> F:
+        return self
+
+    def __reduce__(self):
+        return (_restore, (type(self), self._state()))
+
+    def _state(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for cls in type(self).__mro__ for name in getattr(cls, '__slots__', ())}
+
+
+def _restore(cls: Type[F], state: Dict[str, Any]) -> F:
+    instance = object.__new__(cls)
+    instance._set(**state)
+    return instance
 
 
 class Context:
     def __init__(self):
+        self._lock = threading.RLock()
+        self._servers: Dict[str, Server] = {}
+        self._base_urls: Set[str] = set()
+        self._attached: Set[str] = set()
+        self.journal = Journal(**_journal_options)
+        self.coordinator: Optional[Coordinator] = None
         self._nullify_requests_mocks()
 
     def start(self):
+        self.stop()
+        ExpectedRequests.reset()
+        profiler.forget_expectations()
+
+    def stop(self):
+        for server in self._servers.values():
+            server.stop()
+        self._servers = {}
+        self._base_urls = set()
+        self._attached = set()
+        if self.coordinator is not None:
+            self.coordinator.close()
+            self.coordinator = None
+
         if self._implicit_requests_mock:
             self._implicit_requests_mock.stop()
 
         self._nullify_requests_mocks()
-        ExpectedRequests.reset()
 
     def _nullify_requests_mocks(self):
         self._explicit_requests_mock: Optional[requests_mock.Mocker] = None
         self._implicit_requests_mock: Optional[requests_mock.Mocker] = None
 
     def init_request_mock(self, m: Optional[requests_mock.Mocker] = None) -> requests_mock.Mocker:
+        with self._lock:
+            return self._init_request_mock(m)
+
+    def _init_request_mock(self, m: Optional[requests_mock.Mocker]) -> requests_mock.Mocker:
         if not self.requests_mock_initialized:
             implicit_requests_mock_usage = m is None
             if implicit_requests_mock_usage:
@@ -43,6 +137,73 @@ class Context:
             raise AssertionError("Explicit requests_mock usage started. Add or remove requests_mock.Mocker from/to all 'expect' calls")
         return self.requests_mock
 
+    def adapter(self, m: Optional[requests_mock.Mocker] = None) -> requests_mock.Adapter:
+        """
+        Adapter, which the expectations are registered to
+        """
+        return self.init_request_mock(m)._adapter
+
+    def add_base_url(self, base_url: str):
+        with self._lock:
+            self._base_urls.add(base_url)
+
+    def attach(self, expectations: CompiledExpectations, m: Optional[requests_mock.Mocker] = None):
+        """
+        Makes compiled expectations part of this context. Attaching the same set again does nothing.
+        """
+        with self._lock:
+            if expectations.name in self._attached:
+                return
+            adapter = self.adapter(m)
+            if not hasattr(adapter, 'attach'):
+                raise TypeError("Expectation sets can be attached only to servicemock.Adapter")
+            self._attached.add(expectations.name)
+            self._base_urls.update(expectations.base_urls)
+        adapter.attach(expectations.index)
+        ExpectedRequests.attach(expectations)
+
+    def serve(self, base_url: str, m: Optional[requests_mock.Mocker] = None, host: str = '127.0.0.1', port: int = 0) -> Server:
+        from .server import Server
+
+        with self._lock:
+            if base_url in self._servers:
+                return self._servers[base_url]
+
+            mocker = self.init_request_mock(m)
+            server = Server(base_url, mocker._adapter, host, port).start()
+            self._servers[base_url] = server
+            self._base_urls.add(base_url)
+        # Requests made to the server from this process have to pass through requests_mock
+        mocker.register_uri(requests_mock.ANY, re.compile(f'^{re.escape(server.url)}([/?#]|$)'), real_http=True)
+        return server
+
+    def share(self) -> Coordinator:
+        from .shared import Coordinator
+
+        with self._lock:
+            if self.coordinator is None:
+                self.coordinator = Coordinator()
+            return self.coordinator
+
+    def server_for(self, host: str, port: int) -> Optional[Server]:
+        """
+        Stand-in server for the plain http services in host and port, started on first use. The server is
+        for the whole host, so requests to all the services in it are matched with their full path.
+
+        Raises ValueError for https services, which can not be served.
+        """
+        with self._lock:
+            base_urls = list(self._base_urls)
+
+        for base_url in base_urls:
+            url = urlparse(base_url)
+            if url.hostname != host.lower() or (url.port or _DEFAULT_PORTS.get(url.scheme)) != (port or 80):
+                continue
+            if url.scheme != 'http':
+                raise ValueError(f"Mocked service '{base_url}' can not be served, stand-in servers serve plain http only")
+            return self.serve(f'http://{url.netloc}', self._explicit_requests_mock)
+        return None
+
     @property
     def requests_mock_initialized(self) -> bool:
         return self._explicit_requests_mock is not None or self._implicit_requests_mock is not None
@@ -60,133 +221,561 @@ class Context:
         return self._implicit_requests_mock or self._explicit_requests_mock
 
     def _init_implicit_request_mock(self):
-        self._implicit_requests_mock = requests_mock.Mocker()
+        from .adapter import Mocker
+        self._implicit_requests_mock = Mocker()
         self._implicit_requests_mock.start()
 
 
 class ExpectedRequests:
+    """
+    Registry of expected requests, their hit counts and call count and ordering constraints.
+
+    Requests may be matched from several threads at the same time, so all access goes through the lock.
+    Counters of unsatisfied expectations and violations are maintained when requests are matched,
+    so verifying does not need to go through all the expected requests.
+
+    In a child process forked after 'share', _remote forwards hits and scenario states to the registry of
+    the sharing process.
+    """
+    _lock = threading.Lock()
+    _remote: Any = None
+    # Whether coverage was enabled, when the expectations since the last reset started to be registered
+    _covered = False
     _expected_requests: List[Request] = []
+    _hits: Dict[int, int] = {}
+    _limits: Dict[int, Limits] = {}
+    _unsatisfied = 0
+    _exceeded: Dict[int, Request] = {}
+    _ordered: Dict[int, int] = {}
+    _ordered_requests: List[Request] = []
+    _next_ordered = 0
+    _order_violations: List[Tuple[Request, Request]] = []
+    _states: Dict[str, str] = {}
+    _required_states: Dict[int, Tuple[str, str]] = {}
+    _transitions: Dict[int, Tuple[str, str]] = {}
 
     @classmethod
     def add(cls, request: Request):
-        cls._expected_requests.append(request)
+        with cls._lock:
+            cls._expected_requests.append(request)
+            cls._unsatisfied += 1
+
+    @classmethod
+    def set_limits(cls, request: Request, at_least: Optional[int] = None, at_most: Optional[int] = None):
+        key = id(request)
+        with cls._lock:
+            hits = cls._hits.get(key, 0)
+            old_at_least, old_at_most = cls._limits.get(key, DEFAULT_LIMITS)
+            new_limits = (old_at_least if at_least is None else at_least, old_at_most if at_most is None else at_most)
+            cls._limits[key] = new_limits
+
+            cls._unsatisfied += (hits < new_limits[0]) - (hits < old_at_least)
+            if new_limits[1] is not None and hits > new_limits[1]:
+                cls._exceeded[key] = request
+            else:
+                cls._exceeded.pop(key, None)
+
+    @classmethod
+    def limits(cls, request: Request) -> Limits:
+        return cls._limits.get(id(request), DEFAULT_LIMITS)
+
+    @classmethod
+    def add_ordered(cls, request: Request):
+        with cls._lock:
+            cls._ordered[id(request)] = len(cls._ordered_requests)
+            cls._ordered_requests.append(request)
+
+    @classmethod
+    def attach(cls, expectations: CompiledExpectations):
+        """
+        Adds expectations of a compiled expectation set. The requests and their limits are shared with the set,
+        only the hit counts are kept here.
+        """
+        with cls._lock:
+            cls._expected_requests.extend(expectations.requests)
+            cls._limits.update(expectations.limits)
+            cls._unsatisfied += expectations.required
+            for request in expectations.ordered:
+                cls._ordered[id(request)] = len(cls._ordered_requests)
+                cls._ordered_requests.append(request)
+            cls._required_states.update(expectations.required_states)
+            cls._transitions.update(expectations.transitions)
+
+    @classmethod
+    def require_state(cls, request: Request, scenario: str, state: str):
+        with cls._lock:
+            cls._required_states[id(request)] = (scenario, state)
+
+    @classmethod
+    def set_transition(cls, request: Request, scenario: str, state: str):
+        with cls._lock:
+            cls._transitions[id(request)] = (scenario, state)
+
+    @classmethod
+    def state(cls, scenario: str) -> str:
+        if cls._remote is not None:
+            return cls._remote.call('state', scenario)
+        with cls._lock:
+            return cls._states.get(scenario, STARTED)
+
+    @classmethod
+    def mark_requested(cls, request: Request) -> Optional[int]:
+        """
+        Marks the request made, if its scenario is in the required state, and moves its scenario to the next state.
+        Returns the number of times the request has been made or None, if the scenario is in another state.
+        """
+        if cls._remote is not None:
+            return cls._remote.call('mark', id(request))
+
+        key = id(request)
+        with cls._lock:
+            required = cls._required_states.get(key)
+            if required is not None and cls._states.get(required[0], STARTED) != required[1]:
+                return None
+            transition = cls._transitions.get(key)
+            if transition is not None:
+                cls._states[transition[0]] = transition[1]
+
+            hits = cls._hits.get(key, 0) + 1
+            cls._hits[key] = hits
+
+            at_least, at_most = cls._limits.get(key, DEFAULT_LIMITS)
+            if hits == at_least:
+                cls._unsatisfied -= 1
+            if at_most is not None and hits > at_most:
+                cls._exceeded[key] = request
+
+            if hits == 1 and key in cls._ordered:
+                cls._check_order(request, cls._ordered[key])
+            return hits
+
+    @classmethod
+    def _check_order(cls, request: Request, position: int):
+        if position > cls._next_ordered:
+            cls._order_violations.append((request, cls._ordered_requests[cls._next_ordered]))
+        cls._next_ordered = max(cls._next_ordered, position + 1)
+
+    @classmethod
+    def hits(cls, request: Request) -> int:
+        return cls._hits.get(id(request), 0)
+
+    @classmethod
+    def is_requested(cls, request: Request) -> bool:
+        return id(request) in cls._hits
+
+    @classmethod
+    def all_satisfied(cls) -> bool:
+        return cls._unsatisfied == 0 and not cls._exceeded and not cls._order_violations
+
+    @classmethod
+    def exclude_from_coverage(cls):
+        """
+        Expectations registered since the last reset are not counted in contract coverage
+        """
+        with cls._lock:
+            cls._covered = False
+
+    @classmethod
+    def get_covered_hits(cls) -> Tuple[List[Request], Dict[int, int]]:
+        """
+        Expected requests counted in contract coverage and their hit counts keyed by the id of the request
+        """
+        with cls._lock:
+            if not cls._covered:
+                return [], {}
+            return list(cls._expected_requests), dict(cls._hits)
+
+    @classmethod
+    def get_requests(cls) -> List[Request]:
+        with cls._lock:
+            return list(cls._expected_requests)
 
     @classmethod
     def get_requests_not_made(cls) -> List[Request]:
-        return [r for r in cls._expected_requests if r.requested is False]
+        """
+        Requests, which were not made as many times as expected
+        """
+        with cls._lock:
+            if cls._unsatisfied == 0:
+                return []
+            return [r for r in cls._expected_requests if cls._hits.get(id(r), 0) < cls._limits.get(id(r), DEFAULT_LIMITS)[0]]
+
+    @classmethod
+    def get_requests_made_too_many_times(cls) -> List[Request]:
+        with cls._lock:
+            return list(cls._exceeded.values())
+
+    @classmethod
+    def get_order_violations(cls) -> List[Tuple[Request, Request]]:
+        """
+        Pairs of request made out of order and the request expected to be made before it
+        """
+        with cls._lock:
+            return list(cls._order_violations)
 
     @classmethod
     def reset(cls):
-        cls._expected_requests = []
+        with cls._lock:
+            if cls._covered and contract_coverage.enabled:
+                contract_coverage.record(cls._expected_requests, cls._hits)
+            cls._covered = contract_coverage.enabled
+            cls._remote = None
+            cls._expected_requests = []
+            cls._hits = {}
+            cls._limits = {}
+            cls._unsatisfied = 0
+            cls._exceeded = {}
+            cls._ordered = {}
+            cls._ordered_requests = []
+            cls._next_ordered = 0
+            cls._order_violations = []
+            cls._states = {}
+            cls._required_states = {}
+            cls._transitions = {}
 
 
 class RequestUriBuilder:
 
-    def __init__(self, m: requests_mock.Mocker):
+    def __init__(self, m: requests_mock.Mocker, faults: Optional[Faults] = None):
         self._m = m
-        self._headers: Dict[str, str] = {}
-        self._cookiejar = requests_mock.CookieJar()
+        self._faults = faults
 
     def match_request(self, method: str, url: Any, **kwargs):
         self._method = method
         self._url = url
-        self._kwargs = kwargs
+        self._match_kwargs = kwargs
+        self._responses: List[Dict[str, Any]] = []
+        self._matcher: Any = None
+        self._times: List[int] = []
+        self._start_response()
+
+    def _start_response(self):
+        self._kwargs: Dict[str, Any] = {}
+        self._headers: Dict[str, str] = {}
+        self._cookiejar: Optional[requests_mock.CookieJar] = None
+        self._response_faults: Optional[Faults] = None
 
-    def set_response(self, headers: Optional[Dict[str, str]] = None, cookies: Optional[Sequence[Cookie]] = None,
+    def set_response(self, headers: Optional[Dict[str, str]] = None, cookies: Optional[requests_mock.CookieJar] = None,
                      **kwargs):
+        """
+        cookies is a jar built by cookie_jar, which is shared by all the responses using it
+        """
         if headers:
             self._headers.update(**headers)
         if cookies:
-            for cookie in cookies:
-                cookie.add_to(self._cookiejar)
+            if self._cookiejar is None:
+                self._cookiejar = cookies
+            else:
+                merged = requests_mock.CookieJar()
+                merged.update(self._cookiejar)
+                merged.update(cookies)
+                self._cookiejar = merged
         self._kwargs.update(**kwargs)
 
-    def register(self):
-        self._m.register_uri(self._method, self._url, headers=self._headers, cookies=self._cookiejar, **self._kwargs)
+    @property
+    def url(self) -> Any:
+        """
+        URL of the request being registered, a string or a PathTemplate
+        """
+        return self._url
+
+    def set_faults(self, faults: Optional[Faults]):
+        self._response_faults = faults
+
+    def add_response(self):
+        """
+        Adds the response set so far to the responses of the request and starts a new one
+        """
+        kwargs = dict(self._kwargs, headers=self._headers)
+        if self._cookiejar is not None:
+            kwargs['cookies'] = self._cookiejar
+        faults = self._response_faults or self._faults
+        if faults is not None:
+            kwargs['body'] = faults.body(kwargs.pop('content', None) if 'content' in kwargs else kwargs.pop('body', None))
+        self._responses.append(kwargs)
+        self._start_response()
+
+    def register(self, times: Sequence[int] = ()):
+        """
+        Registers the added responses. Response i is used times[i] times in turn and the last one after them.
+
+        The request is registered once. Registering again replaces the responses of its matcher.
+        """
+        if not self._responses:
+            self.add_response()
+        if self._matcher is None:
+            self._matcher = self._m.register_uri(self._method, self._url, response_list=self._responses, **self._match_kwargs)
+            responses = self._matcher._responses
+        else:
+            responses = [_MatcherResponse(**kwargs) for kwargs in self._responses]
+        self._times = list(times)
+        self._matcher._responses = [SequencedResponse(responses, self._times)] if len(responses) > 1 else responses
+        self._responses = []
+
+    def append(self, times: int):
+        """
+        Adds the added response after the registered responses, to be used times times
+        """
+        response = _MatcherResponse(**self._responses.pop())
+        self._times.append(times)
+        current = self._matcher._responses[0]
+        if isinstance(current, SequencedResponse):
+            current.append(response, times)
+        else:
+            self._matcher._responses = [SequencedResponse([current, response], self._times)]
+
+
+class SequencedResponse:
+    """
+    requests_mock response, which selects the response by the number of times the expectation has been matched.
+
+    Matching is counted in the registry, so the selection is exact when requests are made from several threads.
+    """
+
+    def __init__(self, responses: Sequence[Any], times: Sequence[int]):
+        self._responses = list(responses)
+        self._ends = list(itertools.accumulate(times))
 
+    def append(self, response: Any, times: int):
+        self._responses.append(response)
+        self._ends.append(self._ends[-1] + times)
 
-class Response:
+    def select(self, request: Any) -> Any:
+        """
+        Response of the step the request is in
+        """
+        hits = getattr(request, HITS_ATTRIBUTE, 1)
+        step = bisect.bisect_left(self._ends, hits)
+        return self._responses[min(step, len(self._responses) - 1)]
+
+    def get_response(self, request: Any) -> requests.Response:
+        return self.select(request).get_response(request)
+
+
+class Response(Frozen):
+    __slots__ = ('http_code', 'http_reason', 'body', 'headers', 'cookies', 'faults', '_cookiejar')
+
+    http_code: int
+    http_reason: str
+    body: Optional[ResponseBody]
+    headers: Optional[Dict[str, str]]
+    cookies: Optional[Sequence[Cookie]]
+    faults: Optional[Faults]
+    _cookiejar: Optional[requests_mock.CookieJar]
 
     def __init__(self, http_status: str,
                  body: Optional[ResponseBody] = None, headers: Optional[Dict[str, str]] = None,
-                 cookies: Optional[Sequence[Cookie]] = None):
-        code, self.http_reason = http_status.split(' ', 1)
-        self.http_code = int(code)
-        self.body = body
-        self.headers = headers
-        self.cookies = cookies
+                 cookies: Optional[Sequence[Cookie]] = None, faults: Optional[Faults] = None):
+        code, http_reason = http_status.split(' ', 1)
+        self._set(http_code=int(code), http_reason=http_reason, body=body, headers=headers, cookies=cookies, faults=faults,
+                  _cookiejar=cookie_jar(cookies) if cookies else None)
 
     def register(self, builder: RequestUriBuilder):
         builder.set_response(
             status_code=self.http_code,
             reason=self.http_reason,
             headers=self.headers,
-            cookies=self.cookies,
+            cookies=self._cookiejar,
         )
+        builder.set_faults(self.faults)
         if self.body:
             self.body.register(builder)
 
 
 class HTTP200Ok(Response):
+    __slots__ = ()
 
     def __init__(self, *args, **kwargs):
         super().__init__('200 OK', *args, **kwargs)
 
 
-class ResponseBody(ABC):
+class ResponseBody(Frozen, ABC):
+    __slots__ = ()
 
     @abstractmethod
     def register(self, builder: RequestUriBuilder):
         pass
 
 
-class JSON(ResponseBody):
+class Bytes(ResponseBody):
+    """
+    Response body serialized once. Every response reads the same immutable buffer.
 
-    def __init__(self, body: Mapping[str, Any], headers: Optional[Dict[str, str]] = None,
-                 cookies: Optional[Sequence[Cookie]] = None):
-        self._body = body
-        self._headers = headers
-        self._cookies = cookies
+    If gzip is set, the body is compressed once too and served compressed to requests accepting gzip encoding.
+    """
+    __slots__ = ('_content', '_gzipped', '_headers', '_cookies')
+
+    _content: bytes
+    _gzipped: Optional[bytes]
+    _headers: Optional[Dict[str, str]]
+    _cookies: Optional[requests_mock.CookieJar]
+
+    def __init__(self, content: bytes, headers: Optional[Dict[str, str]] = None,
+                 cookies: Optional[Sequence[Cookie]] = None, gzip: bool = False):
+        self._set(_content=bytes(content), _gzipped=gzip_compress(content, mtime=0) if gzip else None,
+                  _headers=headers, _cookies=cookie_jar(cookies) if cookies else None)
 
     def register(self, builder: RequestUriBuilder):
-        builder.set_response(json=self._body, headers=self._headers, cookies=self._cookies)
+        content = self._content if self._gzipped is None else self._negotiate_content
+        builder.set_response(content=content, headers=self._headers, cookies=self._cookies)
+
+    def _negotiate_content(self, request: requests.Request, context: Any) -> bytes:
+        if self._gzipped is not None and accepts_gzip(request.headers.get('Accept-Encoding', '')):
+            context.headers['Content-Encoding'] = 'gzip'
+            return self._gzipped
+        return self._content
+
+
+class Text(Bytes):
+    __slots__ = ()
+
+    def __init__(self, text: str, headers: Optional[Dict[str, str]] = None,
+                 cookies: Optional[Sequence[Cookie]] = None, gzip: bool = False, encoding: str = 'utf-8'):
+        super().__init__(text.encode(encoding), headers=headers, cookies=cookies, gzip=gzip)
+
+
+class JSON(Bytes):
+    __slots__ = ('_body',)
 
+    _body: Mapping[str, Any]
 
-class Cookie:
+    def __init__(self, body: Mapping[str, Any], headers: Optional[Dict[str, str]] = None,
+                 cookies: Optional[Sequence[Cookie]] = None, gzip: bool = False):
+        super().__init__(json.dumps(body).encode('utf-8'), headers=headers, cookies=cookies, gzip=gzip)
+        self._set(_body=body)
+
+
+def accepts_gzip(accept_encoding: str) -> bool:
+    for coding in accept_encoding.split(','):
+        name, _, params = coding.partition(';')
+        if name.strip().lower() not in ('gzip', '*'):
+            continue
+        quality = params.strip()
+        if not quality.startswith('q='):
+            return True
+        try:
+            return float(quality[2:]) > 0
+        except ValueError:
+            return False
+    return False
+
+
+class Cookie(Frozen):
+    __slots__ = ('_name', '_value', '_kwargs')
+
+    _name: str
+    _value: str
+    _kwargs: Dict[str, Any]
 
     def __init__(self, name: str, value: str, **kwargs):
-        self._name = name
-        self._value = value
-        self._kwargs = kwargs
+        self._set(_name=name, _value=value, _kwargs=kwargs)
 
     def add_to(self, cookiejar: requests_mock.CookieJar):
         cookiejar.set(self._name, self._value, **self._kwargs)
 
 
-class Request:
+def cookie_jar(cookies: Sequence[Cookie]) -> requests_mock.CookieJar:
+    """
+    Jar of the cookies. Built once per response and shared by its registrations, so it must not be changed.
+    """
+    jar = requests_mock.CookieJar()
+    for cookie in cookies:
+        cookie.add_to(jar)
+    return jar
+
+
+class Request(Frozen):
     """
     Request, which is expected to receive
     """
+    __slots__ = ('method', 'url', 'body', 'headers', 'base_url', 'query', '_url_matcher', '_query_matcher', '_header_matcher')
+
+    method: str
+    url: str
+    body: RequestBody
+    headers: Mapping[str, Any]
+    base_url: str
+    query: Optional[Mapping[str, Any]]
+    _url_matcher: Any
+    _query_matcher: Optional[QueryMatcher]
+    _header_matcher: Optional[HeaderMatcher]
+
+    def __init__(self, method: str, url: str, body: Optional[RequestBody] = None, headers: Optional[Mapping[str, Any]] = None,
+                 base_url: str = '', query: Optional[Mapping[str, Any]] = None):
+        """
+        url may be a path template like '/v1/users/{id}', where each placeholder matches a single path segment.
+
+        query has parameters and headers has headers, which have to be in the request. Expected values are
+        strings, compiled regular expressions matching the whole value or predicate functions. Header values
+        may also be lists of comma separated values, which all have to be in the header, or PRESENT or ABSENT.
+        """
+        full_url = f'{base_url}{url}'
+        self._set(method=method, url=url, body=body or NullRequestBody(), headers=headers or {}, base_url=base_url,
+                  query=query, _url_matcher=PathTemplate(full_url) if is_template(url) else full_url,
+                  _query_matcher=QueryMatcher(query) if query else None,
+                  _header_matcher=HeaderMatcher(headers) if headers else None)
+
+    def bind(self, base_url: str) -> Request:
+        """
+        Expectation of this request against the service in base_url. Body, headers and their compiled matchers
+        are shared, not copied.
+        """
+        full_url = f'{base_url}{self.url}'
+        url_matcher = PathTemplate(full_url) if is_template(self.url) else full_url
+        return _restore(Request, dict(self._state(), base_url=base_url, _url_matcher=url_matcher))
+
+    @property
+    def full_url(self) -> str:
+        return f'{self.base_url}{self.url}'
+
+    @property
+    def requested(self) -> bool:
+        return ExpectedRequests.is_requested(self)
 
-    def __init__(self, method: str, url: str, body: Optional[RequestBody] = None, headers: Optional[Headers] = None):
-        self.method = method
-        self.url = url
-        self.requested = False
-        self.headers = headers or {}
-        self.body = body or NullRequestBody()
+    @property
+    def hits(self) -> int:
+        return ExpectedRequests.hits(self)
 
     def register(self, builder: RequestUriBuilder):
-        builder.match_request(self.method, self.url, request_headers=self.headers, additional_matcher=self._match_request)
+        builder.match_request(self.method, self._url_matcher, additional_matcher=self._match_request)
 
     def _match_request(self, request: requests.Request):
-        self.requested = self.body.match(request)
-        return self.requested
+        if profiler.enabled:
+            return self._profiled_match_request(request)
+
+        return self._match_fields(request) and self._mark_requested(request)
+
+    def _mark_requested(self, request: requests.Request) -> bool:
+        hits = ExpectedRequests.mark_requested(self)
+        if hits is None:
+            return False
+        setattr(request, HITS_ATTRIBUTE, hits)
+        setattr(request, EXPECTATION_ATTRIBUTE, self)
+        return True
+
+    def _match_fields(self, request: requests.Request) -> bool:
+        if self._header_matcher is not None and not self._header_matcher.match(request.headers):
+            return False
+        if self._query_matcher is not None and not self._query_matcher.match(request.url):
+            return False
+        return self.body.match(request)
+
+    def _profiled_match_request(self, request: requests.Request):
+        started = perf_counter_ns()
+        matched = self._match_fields(request)
+        body_ns = perf_counter_ns() - started
+        matched = matched and self._mark_requested(request)
+        profiler.record_match(self, matched, perf_counter_ns() - started, body_ns)
+        return matched
 
     def __str__(self) -> str:
-        description = f'{self.method} {self.url}'
+        description = f'{self.method} {self.full_url}'
 
-        if self.headers:
-            description = description + f', headers: {self.headers}'
+        if self._query_matcher is not None:
+            description = description + f', query: {self._query_matcher}'
+
+        if self._header_matcher is not None:
+            description = description + f', headers: {self._header_matcher}'
 
         body_description = str(self.body)
         if body_description:
@@ -195,7 +784,119 @@ class Request:
         return description
 
 
-class RequestBody(ABC):
+class ReceivedBody:
+    """
+    Body of the received request. Decoded lazily and only once, shared by all body matchers.
+    """
+
+    _ATTRIBUTE = '_servicemock_body'
+    _NOT_DECODED: Any = object()
+
+    def __init__(self, request: Any):
+        self._request = request
+        self._raw: Any = self._NOT_DECODED
+        self._text: Any = self._NOT_DECODED
+        self._json: Any = self._NOT_DECODED
+        self._frozen_json: Any = self._NOT_DECODED
+        self._json_hash: Any = self._NOT_DECODED
+        self._form: Any = self._NOT_DECODED
+
+    @classmethod
+    def of(cls, request: Any) -> ReceivedBody:
+        body = getattr(request, cls._ATTRIBUTE, None)
+        if body is None:
+            body = cls(request)
+            setattr(request, cls._ATTRIBUTE, body)
+        return body
+
+    @classmethod
+    def release(cls, request: Any):
+        """
+        Drops the decoded body of the request, which may be kept in the request history
+        """
+        try:
+            delattr(request, cls._ATTRIBUTE)
+        except AttributeError:
+            pass
+
+    @property
+    def raw(self) -> Optional[bytes]:
+        if self._raw is self._NOT_DECODED:
+            body = self._request.body
+            self._raw = body.encode('utf-8') if isinstance(body, str) else body
+        return self._raw
+
+    @property
+    def text(self) -> Optional[str]:
+        if self._text is self._NOT_DECODED:
+            body = self._request.body
+            self._text = body.decode('utf-8') if isinstance(body, bytes) else body
+        return self._text
+
+    @property
+    def json(self) -> Any:
+        """
+        Decoded JSON or None, if body is not JSON
+        """
+        if self._json is self._NOT_DECODED:
+            try:
+                self._json = json.loads(self.text)  # type: ignore
+            except (TypeError, ValueError):
+                self._json = None
+        return self._json
+
+    @property
+    def frozen_json(self) -> Hashable:
+        """
+        Decoded JSON in hashable form, see freeze
+        """
+        if self._frozen_json is self._NOT_DECODED:
+            self._frozen_json = freeze(self.json)
+        return self._frozen_json
+
+    @property
+    def json_hash(self) -> Optional[int]:
+        if self._json_hash is self._NOT_DECODED:
+            try:
+                self._json_hash = hash(self.frozen_json)
+            except TypeError:
+                self._json_hash = None
+        return self._json_hash
+
+    @property
+    def form(self) -> Dict[str, List[str]]:
+        if self._form is self._NOT_DECODED:
+            try:
+                self._form = parse_qs(self.text or '', keep_blank_values=True)
+            except (TypeError, ValueError):
+                self._form = {}
+        return self._form
+
+
+def canonical_hash(value: Any) -> Optional[int]:
+    """
+    Hash, which is equal for equal JSON like values or None, if value can not be hashed
+    """
+    try:
+        return hash(freeze(value))
+    except TypeError:
+        return None
+
+
+def freeze(value: Any, typed: bool = False) -> Hashable:
+    """
+    Hashable form of JSON like value, which is equal for equal values. When typed, scalars of different
+    types, like 1, 1.0 and True, are not equal.
+    """
+    if isinstance(value, dict):
+        return frozenset((k, freeze(v, typed)) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(v, typed) for v in value)
+    return (type(value).__name__, value) if typed else value
+
+
+class RequestBody(Frozen, ABC):
+    __slots__ = ()
 
     @abstractmethod
     def match(self, request: requests.Request) -> bool:
@@ -207,6 +908,7 @@ class RequestBody(ABC):
 
 
 class NullRequestBody(RequestBody):
+    __slots__ = ()
 
     def match(self, *args, **kwargs) -> bool:
         return True
@@ -216,79 +918,375 @@ class NullRequestBody(RequestBody):
 
 
 class JSONRequestBody(RequestBody):
+    """
+    JSON body equal to the expected body. The body is copied, so changing it afterwards, like when building
+    bodies in a loop, does not change the expectation.
+    """
+    __slots__ = ('body', '_frozen', '_hash')
+
+    body: Dict[str, Any]
+    _frozen: Hashable
+    _hash: Optional[int]
 
     def __init__(self, body: Dict[str, Any]):
-        self.body = body
+        try:
+            frozen: Hashable = freeze(body)
+            body_hash: Optional[int] = hash(frozen)
+        except TypeError:
+            frozen, body_hash = None, None
+        self._set(body=copy.deepcopy(body), _frozen=frozen, _hash=body_hash)
 
     def match(self, request: requests.Request) -> bool:
-        try:
-            received_json = request.json()
-        except json.JSONDecodeError:
-            received_json = None
-        return received_json == self.body
+        received = ReceivedBody.of(request)
+        if self._hash is None or received.json_hash is None:
+            return received.json == self.body
+        return self._hash == received.json_hash and self._frozen == received.frozen_json
 
     def __str__(self):
         return f'json: {self.body}'
 
 
+class JSONSubsetRequestBody(RequestBody):
+    """
+    JSON body, which contains the expected body. Objects may have keys, which are not expected.
+    """
+    __slots__ = ('body',)
+
+    body: Dict[str, Any]
+
+    def __init__(self, body: Dict[str, Any]):
+        self._set(body=body)
+
+    def match(self, request: requests.Request) -> bool:
+        return is_subset(self.body, ReceivedBody.of(request).json)
+
+    def __str__(self):
+        return f'json containing: {self.body}'
+
+
+class JSONPathRequestBody(RequestBody):
+    """
+    JSON body, where values found by JSONPaths like '$.user.id' or '$.items[*].sku' are the expected ones.
+
+    Expected values are compared for equality, matched fully by compiled regular expressions or given to
+    predicate functions. A path matches if any of the values it finds matches.
+    """
+    __slots__ = ('paths', '_compiled')
+
+    paths: Dict[str, Any]
+    _compiled: Any
+
+    def __init__(self, paths: Dict[str, Any]):
+        self._set(paths=paths, _compiled=compile_paths(paths))
+
+    def match(self, request: requests.Request) -> bool:
+        document = ReceivedBody.of(request).json
+        if document is None:
+            return False
+        for path, matches in self._compiled:
+            if not any(matches(value) for value in path.values(document)):
+                return False
+        return True
+
+    def __str__(self):
+        return f'jsonpath: {describe_paths(self.paths)}'
+
+
+class BytesRequestBody(RequestBody):
+    """
+    Body, which has to match byte by byte
+    """
+    __slots__ = ('body',)
+
+    body: bytes
+
+    def __init__(self, body: bytes):
+        self._set(body=body)
+
+    def match(self, request: requests.Request) -> bool:
+        return (ReceivedBody.of(request).raw or b'') == self.body
+
+    def __str__(self):
+        return f'body: {self.body!r}'
+
+
 class VerifyErrorMessage:
 
-    def __init__(self, requests: Sequence[Request]):
+    def __init__(self, requests: Sequence[Request], exceeded: Sequence[Request] = (),
+                 order_violations: Sequence[Tuple[Request, Request]] = ()):
         self._requests = requests
+        self._exceeded = exceeded
+        self._order_violations = order_violations
 
     def __str__(self) -> str:
+        messages = []
         if len(self._requests) == 1:
-            return f"Expected request '{self._requests[0]}' was not made."
-        else:
+            messages.append(f"Expected request '{self._describe(self._requests[0])}' was not made.")
+        elif self._requests:
             msg = "Following expected requests were not made:\n  - "
-            msg += "\n  - ".join([str(r) for r in self._requests])
-            return msg
+            msg += "\n  - ".join([self._describe(r) for r in self._requests])
+            messages.append(msg)
+
+        for r in self._exceeded:
+            messages.append(f"Expected request '{self._describe(r)}' was made too many times.")
+
+        for r, expected_before in self._order_violations:
+            messages.append(f"Expected request '{r}' was made before '{expected_before}', which was expected first.")
+        return "\n".join(messages)
+
+    def _describe(self, request: Request) -> str:
+        limits = ExpectedRequests.limits(request)
+        if limits == DEFAULT_LIMITS:
+            return str(request)
+        return f'{request} ({describe_limits(limits)}, made {request.hits} times)'
+
+
+def describe_limits(limits: Limits) -> str:
+    at_least, at_most = limits
+    if at_least == at_most:
+        return f'expected {at_least} times'
+    if at_most is None:
+        return f'expected at least {at_least} times'
+    return f'expected {at_least} to {at_most} times'
 
 
 class ResponseDSL:
     default_response: Response = HTTP200Ok()
 
-    def __init__(self, builder: RequestUriBuilder):
+    def __init__(self, builder: RequestUriBuilder, request: Request, registry: Any = ExpectedRequests):
         self._builder = builder
-        self._response = self.default_response
-        self._register()
-
-    def and_responds(self, response: Response):
-        self._response = response
+        self._request = request
+        self._registry = registry
+        self._steps: List[Tuple[Response, int]] = [(self.default_response, 1)]
+        self._register(new=True)
+
+    def and_responds(self, response: Response) -> ResponseDSL:
+        """
+        Replaces the responses of the request with response
+        """
+        self._steps = [(response, 1)]
         self._register()
-
-    def _register(self):
-        self._response.register(self._builder)
-        self._builder.register()
+        return self
+
+    def then(self, response: Response, times: int = 1) -> ResponseDSL:
+        """
+        After the earlier responses have been used, the request is responded with response times times.
+        The last response is used for all the requests after that.
+        """
+        self._steps.append((response, times))
+        started = perf_counter_ns() if profiler.enabled else None
+        response.register(self._builder)
+        self._builder.add_response()
+        self._builder.append(times)
+        if started is not None:
+            profiler.record_register(self._request, perf_counter_ns() - started, new=False)
+        return self
+
+    def in_state(self, scenario: str, state: str) -> ResponseDSL:
+        """
+        Request is matched only when the scenario is in the state. Scenarios start in state STARTED.
+        """
+        self._registry.require_state(self._request, scenario, state)
+        return self
+
+    def will_set_state(self, scenario: str, state: str) -> ResponseDSL:
+        """
+        When the request is matched, the scenario moves to the state
+        """
+        self._registry.set_transition(self._request, scenario, state)
+        return self
+
+    def times(self, n: int) -> ResponseDSL:
+        """
+        Request is expected to be made exactly n times
+        """
+        self._registry.set_limits(self._request, at_least=n, at_most=n)
+        return self
+
+    def at_least(self, n: int) -> ResponseDSL:
+        self._registry.set_limits(self._request, at_least=n)
+        return self
+
+    def at_most(self, n: int) -> ResponseDSL:
+        """
+        Request is expected to be made at most n times. Combine with at_least(0) to make the request optional.
+        """
+        self._registry.set_limits(self._request, at_most=n)
+        return self
+
+    def in_order(self) -> ResponseDSL:
+        """
+        Request is expected to be made for the first time after the requests marked in order before it
+        """
+        self._registry.add_ordered(self._request)
+        return self
+
+    def _register(self, new: bool = False):
+        started = perf_counter_ns() if profiler.enabled else None
+        for response, _ in self._steps:
+            response.register(self._builder)
+            self._builder.add_response()
+        self._builder.register([times for _, times in self._steps])
+        if started is not None:
+            profiler.record_register(self._request, perf_counter_ns() - started, new)
 
 
 class RequestDSL:
 
-    def __init__(self, base_url: str, builder: RequestUriBuilder):
+    def __init__(self, base_url: str, builder: RequestUriBuilder, registry: Any = ExpectedRequests):
+        """
+        Expectations are added to the registry, which is ExpectedRequests or a registry of an expectation set
+        """
         self._base_url = base_url
         self._builder = builder
+        self._registry = registry
+        self._in_order = False
+
+    def in_order(self) -> RequestDSL:
+        """
+        Requests expected after this are expected to be made in order
+        """
+        self._in_order = True
+        return self
 
     def to_receive(self, request: Request) -> ResponseDSL:
-        r = copy.deepcopy(request)
-        r.url = f'{self._base_url}{request.url}'
+        r = request.bind(self._base_url)
         r.register(self._builder)
-        ExpectedRequests.add(r)
-        return ResponseDSL(self._builder)
+        self._registry.add(r)
+        if self._in_order:
+            self._registry.add_ordered(r)
+        return ResponseDSL(self._builder, r, self._registry)
 
 
-def expect(base_url: str, m: Optional[requests_mock.Mocker] = None) -> RequestDSL:
+def expect(base_url: str, m: Optional[requests_mock.Mocker] = None, faults: Optional[Faults] = None) -> RequestDSL:
+    """
+    Starts setting expectations for the service in base_url. Faults are injected to all of its responses,
+    which do not have their own.
+    """
     global _ctx
     assert _ctx is not None, "Before setting expectations, 'start' needs to be called"
     mocker = _ctx.init_request_mock(m)
-    return RequestDSL(base_url, RequestUriBuilder(mocker))
+    _ctx.add_base_url(base_url)
+    return RequestDSL(base_url, RequestUriBuilder(mocker, faults))
+
+
+def serve(base_url: str, m: Optional[requests_mock.Mocker] = None, host: str = '127.0.0.1', port: int = 0) -> Server:
+    """
+    Serves expectations of base_url from a local HTTP server, which is stopped by 'start' or 'stop'.
+
+    Clients use the returned server's url instead of base_url.
+    """
+    assert _ctx is not None, "Before serving expectations, 'start' needs to be called"
+    return _ctx.serve(base_url, m, host, port)
+
+
+def share() -> Coordinator:
+    """
+    Shares the registry with child processes forked after this, until 'start' or 'stop'. Requests made by
+    the children, like process pool workers, count in 'verify' of this process.
+    """
+    assert _ctx is not None, "Before sharing expectations, 'start' needs to be called"
+    return _ctx.share()
+
+
+def current_context() -> Context:
+    assert _ctx is not None, "Before using servicemock, 'start' needs to be called"
+    return _ctx
+
+
+def current_journal() -> Optional[Journal]:
+    return _ctx.journal if _ctx is not None else None
 
 
 def verify():
     """
     Verify all expected requests were made.
     """
-    requests = ExpectedRequests.get_requests_not_made()
-    assert requests == [], str(VerifyErrorMessage(requests))
+    if ExpectedRequests.all_satisfied():
+        return
+
+    message = VerifyErrorMessage(
+        ExpectedRequests.get_requests_not_made(),
+        ExpectedRequests.get_requests_made_too_many_times(),
+        ExpectedRequests.get_order_violations(),
+    )
+    raise AssertionError(str(message))
+
+
+def scenario_state(scenario: str) -> str:
+    """
+    Current state of the scenario
+    """
+    return ExpectedRequests.state(scenario)
+
+
+def configure_journal(size: int = 1000, bodies: str = 'drop', spill_size: int = DEFAULT_SPILL_SIZE):
+    """
+    Journal keeps the latest size requests. Their bodies are not kept by default ('drop'). They can be kept
+    in memory ('keep'), only as sha256 digests ('hash') or in temporary files taking at most spill_size
+    bytes ('spill'). Applies to the current and later 'start' calls, clearing the current journal.
+    """
+    global _journal_options
+    journal = Journal(size, bodies, spill_size)
+    _journal_options = {'size': size, 'bodies': bodies, 'spill_size': spill_size}
+    if _ctx is not None:
+        _ctx.journal.close()
+        _ctx.journal = journal
+
+
+def history(method: Optional[str] = None, url: Optional[str] = None, host: Optional[str] = None,
+            path: Optional[str] = None, matched: Optional[bool] = None) -> List[JournalEntry]:
+    """
+    Requests received since 'start', matched or not, the oldest first. Filtered by method, whole url,
+    host, path and whether the request matched an expectation.
+    """
+    return current_context().journal.query(method, url, host, path, matched)
+
+
+def enable_stats(enabled: bool = True):
+    """
+    Starts (or stops) collecting statistics of matching requests, see 'stats'
+    """
+    profiler.enabled = enabled
+
+
+def stats() -> Dict[str, Any]:
+    """
+    Statistics collected since enabling them: requests dispatched, registrations and per expectation
+    registrations, match attempts, hits and cumulative nanoseconds spent matching and matching the body.
+    """
+    return profiler.stats()
+
+
+def dump_stats(path: str, format: str = 'json'):
+    """
+    Writes statistics to path as JSON or as folded stacks ('folded') for flamegraph tools
+    """
+    profiler.dump(path, format)
+
+
+def enable_coverage(enabled: bool = True):
+    """
+    Starts (or stops) counting registered expectations and their hits per service and endpoint, see 'coverage'.
+    Counting starts from the next 'start'.
+    """
+    contract_coverage.enabled = enabled
+    ExpectedRequests.exclude_from_coverage()
+
+
+def coverage() -> Dict[str, Any]:
+    """
+    Contract coverage since enabling it: per service and endpoint, the number of times expectations were
+    registered, requested and registered but not requested in a test.
+    """
+    return contract_coverage.report(*ExpectedRequests.get_covered_hits())
+
+
+def dump_coverage(path: str, format: str = 'json'):
+    """
+    Writes contract coverage to path as JSON or as text ('text')
+    """
+    contract_coverage.dump(path, coverage(), format)
 
 
 def start():
@@ -296,5 +1294,16 @@ def start():
     Inits service mock, can be called between tests
     """
     global _ctx
+    if _ctx is not None:
+        _ctx.stop()
+        _ctx.journal.close()
     _ctx = Context()
     _ctx.start()
+
+
+def stop():
+    """
+    Stops mocking requests, which were mocked implicitly by 'expect'
+    """
+    if _ctx is not None:
+        _ctx.stop()
@@ -0,0 +1,104 @@
+"""
+Expectation sets registered once per process and attached to tests by reference.
+
+Common expectations, like authentication and health checks, are shared by many tests. An expectation set
+registers them once to its own matcher index and registry. Attaching the set to a test adds the index to
+the test's adapter and the expectations to ExpectedRequests, where only the hit counts are per test.
+"""
+from __future__ import annotations
+from typing import Callable, Dict, List, Optional, Set, Tuple, TYPE_CHECKING
+import threading
+
+import requests_mock  # type: ignore
+
+from .adapter import Adapter
+from .index import MatcherIndex
+from .servicemock import DEFAULT_LIMITS, Limits, Request, RequestDSL, RequestUriBuilder, current_context
+
+if TYPE_CHECKING:
+    from .faults import Faults
+
+
+class CompiledExpectations:
+    """
+    Registered expectations of a set. Works as the registry of the expectations while they are registered
+    and is not changed after that.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.requests: List[Request] = []
+        self.limits: Dict[int, Limits] = {}
+        self.ordered: List[Request] = []
+        self.required_states: Dict[int, Tuple[str, str]] = {}
+        self.transitions: Dict[int, Tuple[str, str]] = {}
+        self.base_urls: Set[str] = set()
+        self.required = 0
+        self._adapter = Adapter()
+
+    @property
+    def index(self) -> MatcherIndex:
+        return self._adapter._index
+
+    def expect(self, base_url: str, faults: Optional[Faults] = None) -> RequestDSL:
+        self.base_urls.add(base_url)
+        return RequestDSL(base_url, RequestUriBuilder(self._adapter, faults), registry=self)
+
+    def add(self, request: Request):
+        self.requests.append(request)
+
+    def set_limits(self, request: Request, at_least: Optional[int] = None, at_most: Optional[int] = None):
+        old_at_least, old_at_most = self.limits.get(id(request), DEFAULT_LIMITS)
+        self.limits[id(request)] = (old_at_least if at_least is None else at_least, old_at_most if at_most is None else at_most)
+
+    def add_ordered(self, request: Request):
+        self.ordered.append(request)
+
+    def require_state(self, request: Request, scenario: str, state: str):
+        self.required_states[id(request)] = (scenario, state)
+
+    def set_transition(self, request: Request, scenario: str, state: str):
+        self.transitions[id(request)] = (scenario, state)
+
+    def seal(self):
+        self.required = sum(1 for r in self.requests if self.limits.get(id(r), DEFAULT_LIMITS)[0] > 0)
+        # Matchers are shared by all tests, so they must not collect request history
+        for matcher in self._adapter._matchers:
+            matcher._add_to_history = _ignore
+
+
+def _ignore(request: object):
+    pass
+
+
+class ExpectationSet:
+    """
+    Named set of expectations registered by calling register with an expect function once per process.
+
+        auth = ExpectationSet('auth', lambda expect: (
+            expect('http://auth.com').to_receive(Request('POST', '/token')).and_responds(HTTP200Ok(JSON({'token': 't'}))).at_least(0)))
+
+    Expectations of the set are verified in every test, which it is attached to.
+    """
+
+    def __init__(self, name: str, register: Callable[[Callable[..., RequestDSL]], None]):
+        self.name = name
+        self._register = register
+        self._compiled: Optional[CompiledExpectations] = None
+        self._lock = threading.Lock()
+
+    def compile(self) -> CompiledExpectations:
+        with self._lock:
+            if self._compiled is None:
+                compiled = CompiledExpectations(self.name)
+                self._register(compiled.expect)
+                compiled.seal()
+                self._compiled = compiled
+            return self._compiled
+
+
+def attach(expectations: ExpectationSet, m: Optional[requests_mock.Mocker] = None):
+    """
+    Attaches the expectation set to the current test. The set is compiled on first use.
+    """
+    current_context().attach(expectations.compile(), m)
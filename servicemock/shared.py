@@ -0,0 +1,135 @@
+"""
+Registry shared with child processes forked from the test process.
+
+Forked children inherit the expectations and the mocked requests, but they would count their hits in their
+own copy of ExpectedRequests, which 'verify' never sees. A coordinator thread of the sharing process listens
+on a Unix socket. Children forked after 'share' send hits and scenario state queries to it, so hit counts,
+sequenced responses and scenario states are the same as if the requests were made in the sharing process.
+"""
+from __future__ import annotations
+from multiprocessing.connection import Client, Connection, Listener
+from typing import Any, Dict, Optional
+import os
+import shutil
+import tempfile
+import threading
+
+from .servicemock import ExpectedRequests, Request
+
+_FAMILY = 'AF_UNIX'
+
+# Coordinator of this process, which children forked from it connect to
+_coordinator: Optional[Coordinator] = None
+
+
+class Coordinator:
+    """
+    Applies hits and answers scenario state queries sent by child processes to ExpectedRequests.
+    Children identify expectations by their id, which is the same in the forked copy.
+    """
+
+    def __init__(self):
+        global _coordinator
+        self._directory = tempfile.mkdtemp(prefix='servicemock-')
+        self.address = os.path.join(self._directory, 'registry.sock')
+        self.authkey = os.urandom(32)
+        self._pid = os.getpid()
+        self._requests: Dict[int, Request] = {}
+        self._closed = False
+        self._listener = Listener(self.address, family=_FAMILY, authkey=self.authkey)
+        self._thread = threading.Thread(target=self._accept, name='servicemock-coordinator', daemon=True)
+        self._thread.start()
+        _coordinator = self
+
+    def _accept(self):
+        while True:
+            try:
+                connection = self._listener.accept()
+            except Exception:
+                if self._closed:
+                    return
+                continue
+            if self._closed:
+                connection.close()
+                return
+            threading.Thread(target=self._serve, args=(connection,), name='servicemock-coordinator-client', daemon=True).start()
+
+    def _serve(self, connection: Connection):
+        with connection:
+            while True:
+                try:
+                    command, argument = connection.recv()
+                except (EOFError, OSError):
+                    return
+                connection.send(self._handle(command, argument))
+
+    def _handle(self, command: str, argument: Any) -> Any:
+        if command == 'mark':
+            request = self._request(argument)
+            return ExpectedRequests.mark_requested(request) if request is not None else None
+        if command == 'state':
+            return ExpectedRequests.state(argument)
+        raise ValueError(f"Unknown command '{command}'")
+
+    def _request(self, key: int) -> Optional[Request]:
+        request = self._requests.get(key)
+        if request is None:
+            # Expectations registered after the last lookup
+            self._requests = {id(r): r for r in ExpectedRequests.get_requests()}
+            request = self._requests.get(key)
+        return request
+
+    def close(self):
+        global _coordinator
+        # Forked children have a copy of the coordinator, which is not theirs to close
+        if os.getpid() != self._pid or self._closed:
+            return
+        self._closed = True
+        if _coordinator is self:
+            _coordinator = None
+        try:
+            # Wakes the thread blocked in accept
+            Client(self.address, family=_FAMILY, authkey=self.authkey).close()
+        except Exception:
+            pass
+        self._thread.join()
+        self._listener.close()
+        shutil.rmtree(self._directory, ignore_errors=True)
+
+
+class RemoteRegistry:
+    """
+    Connection of a forked child to the coordinator, opened on first use
+    """
+
+    def __init__(self, address: str, authkey: bytes):
+        self._address = address
+        self._authkey = authkey
+        self._connection: Optional[Connection] = None
+        self._lock = threading.Lock()
+
+    def call(self, command: str, argument: Any) -> Any:
+        with self._lock:
+            if self._connection is None:
+                self._connection = Client(self._address, family=_FAMILY, authkey=self._authkey)
+            self._connection.send((command, argument))
+            return self._connection.recv()
+
+
+def _after_fork_in_child():
+    global _coordinator
+    if _coordinator is not None:
+        remote = RemoteRegistry(_coordinator.address, _coordinator.authkey)
+        _coordinator = None
+    elif ExpectedRequests._remote is not None:
+        # Grandchildren open their own connection
+        remote = RemoteRegistry(ExpectedRequests._remote._address, ExpectedRequests._remote._authkey)
+    else:
+        return
+
+    # The coordinator thread of the parent may have held the lock at the time of fork
+    ExpectedRequests._lock = threading.Lock()
+    ExpectedRequests._remote = remote
+
+
+os.register_at_fork(after_in_child=_after_fork_in_child)
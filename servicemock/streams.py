@@ -0,0 +1,185 @@
+"""
+Response bodies served lazily from generators and memory-mapped files.
+
+The body is read only as the client reads the response, so large bodies are served in constant memory.
+"""
+from __future__ import annotations
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Sequence, Tuple
+import io
+import mmap
+import os
+import re
+
+import requests_mock  # type: ignore
+
+from .servicemock import Cookie, RequestUriBuilder, ResponseBody, cookie_jar
+
+_RANGE = re.compile(r'^bytes=([0-9]*)-([0-9]*)$')
+
+
+class Stream(ResponseBody):
+    """
+    Body generated for every response by calling chunks, which returns an iterable of bytes.
+
+    Without size, the response is sent with chunked transfer encoding.
+    """
+    __slots__ = ('_chunks', '_size', '_headers', '_cookies')
+
+    _chunks: Callable[[], Iterable[bytes]]
+    _size: Optional[int]
+    _headers: Optional[Dict[str, str]]
+    _cookies: Optional[requests_mock.CookieJar]
+
+    def __init__(self, chunks: Callable[[], Iterable[bytes]], size: Optional[int] = None,
+                 headers: Optional[Dict[str, str]] = None, cookies: Optional[Sequence[Cookie]] = None):
+        self._set(_chunks=chunks, _size=size, _headers=headers, _cookies=cookie_jar(cookies) if cookies else None)
+
+    def register(self, builder: RequestUriBuilder):
+        builder.set_response(body=self._body, headers=self._headers, cookies=self._cookies)
+
+    def _body(self, request: Any, context: Any) -> io.RawIOBase:
+        if self._size is None:
+            context.headers['Transfer-Encoding'] = 'chunked'
+        else:
+            context.headers['Content-Length'] = str(self._size)
+        return IterStream(self._chunks())
+
+
+class File(ResponseBody):
+    """
+    Body read from a memory-mapped file. Range requests of a single byte range are responded with 206 Partial Content.
+    """
+    __slots__ = ('_path', '_headers', '_cookies')
+
+    _path: str
+    _headers: Optional[Dict[str, str]]
+    _cookies: Optional[requests_mock.CookieJar]
+
+    def __init__(self, path: str, headers: Optional[Dict[str, str]] = None, cookies: Optional[Sequence[Cookie]] = None):
+        self._set(_path=path, _headers=headers, _cookies=cookie_jar(cookies) if cookies else None)
+
+    def register(self, builder: RequestUriBuilder):
+        builder.set_response(body=self._body, headers=self._headers, cookies=self._cookies)
+
+    def _body(self, request: Any, context: Any) -> io.RawIOBase:
+        size = os.path.getsize(self._path)
+        context.headers['Accept-Ranges'] = 'bytes'
+
+        start, end = 0, size
+        byte_range = parse_range(request.headers.get('Range'), size)
+        if byte_range is not None:
+            start, end = byte_range
+            if start >= end:
+                context.status_code = 416
+                context.reason = 'Range Not Satisfiable'
+                context.headers['Content-Range'] = f'bytes */{size}'
+                context.headers['Content-Length'] = '0'
+                return io.BytesIO(b'')  # type: ignore
+            context.status_code = 206
+            context.reason = 'Partial Content'
+            context.headers['Content-Range'] = f'bytes {start}-{end - 1}/{size}'
+
+        context.headers['Content-Length'] = str(end - start)
+        return MappedStream(self._path, start, end)
+
+
+def parse_range(value: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Single byte range of Range header value as (start, end) with exclusive end, None if the header
+    is missing, invalid or not supported, so the whole body is responded. Valid, but unsatisfiable range
+    has start equal to end.
+    """
+    if not value:
+        return None
+    match = _RANGE.match(value.strip())
+    if match is None or match.group(1) == match.group(2) == '':
+        return None
+
+    first, last = match.groups()
+    if first == '':
+        suffix = int(last)
+        return (max(size - suffix, 0), size) if suffix else (size, size)
+
+    start = int(first)
+    if last and int(last) < start:
+        return None
+    end = min(int(last) + 1, size) if last else size
+    if start >= size:
+        return (size, size)
+    return (start, end)
+
+
+class RawStream(io.RawIOBase):
+    """
+    Readable raw stream filled by read_chunk, closed once it returns no data
+    """
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b: Any) -> int:
+        data = self.read_chunk(len(b))
+        if not data:
+            # urllib3 checks whether the stream is closed instead of the returned value in some paths
+            self.close()
+            return 0
+
+        n = len(data)
+        b[:n] = data
+        return n
+
+    def read_chunk(self, size: int) -> Any:
+        """
+        Returns at most size bytes, empty at the end of the stream
+        """
+        raise NotImplementedError
+
+
+class IterStream(RawStream):
+    """
+    Stream reading chunks from an iterable as they are needed
+    """
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks: Iterator[bytes] = iter(chunks)
+        self._pending = memoryview(b'')
+
+    def read_chunk(self, size: int) -> Any:
+        while not self._pending:
+            try:
+                self._pending = memoryview(next(self._chunks))
+            except StopIteration:
+                return b''
+
+        chunk = self._pending[:size]
+        self._pending = self._pending[size:]
+        return chunk
+
+
+class MappedStream(RawStream):
+    """
+    Stream reading bytes from start to end of a memory-mapped file
+    """
+
+    def __init__(self, path: str, start: int, end: int):
+        self._position = start
+        self._end = end
+        self._mmap: Optional[mmap.mmap] = None
+        if end > start:
+            with open(path, 'rb') as f:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def read_chunk(self, size: int) -> Any:
+        if self._position >= self._end or self._mmap is None:
+            return b''
+
+        n = min(size, self._end - self._position)
+        chunk = self._mmap[self._position:self._position + n]
+        self._position += n
+        return chunk
+
+    def close(self):
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        super().close()
@@ -16,6 +16,14 @@ setuptools.setup(
     url="https://github.com/mlackman/urban-lamp",
     packages=setuptools.find_packages(),
     install_requires=open('requirements.txt').readlines(),
+    extras_require={
+        'httpx': ['httpx'],
+        'aiohttp': ['aiohttp'],
+        'yaml': ['PyYAML'],
+    },
+    entry_points={
+        'pytest11': ['servicemock = servicemock.pytest_plugin'],
+    },
     classifiers=[
         "Development Status :: 3 - Alpha",
         "Programming Language :: Python :: 3",
@@ -0,0 +1,15 @@
+from typing import Any, Iterator
+
+import pytest  # type: ignore
+
+import servicemock as sm
+
+
+@pytest.fixture(scope="function")
+def servicemock() -> Iterator[Any]:
+    """
+    Fresh servicemock state for the test. Unlike the fixture of the pytest plugin, expectations are not verified.
+    """
+    sm.start()
+    yield sm
+    sm.stop()
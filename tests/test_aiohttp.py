@@ -0,0 +1,55 @@
+from typing import Any
+import asyncio
+import json
+
+import pytest  # type: ignore
+
+import servicemock as sm
+
+aiohttp = pytest.importorskip('aiohttp')
+from servicemock.aiohttp import Resolver  # noqa: E402
+
+
+def test_concurrent_requests_are_routed_to_expectations(servicemock: Any):
+    sm.expect('http://my-service.com').to_receive(sm.Request('GET', '/v1/users')).and_responds(sm.HTTP200Ok(sm.JSON({'status': 'ok'})))
+
+    async def call_service():
+        async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(resolver=Resolver())) as session:
+            async def get():
+                async with session.get('http://my-service.com/v1/users') as res:
+                    return res.status, json.loads(await res.read())
+            return await asyncio.gather(*[get() for _ in range(200)])
+
+    responses = asyncio.run(call_service())
+
+    assert responses == [(200, {'status': 'ok'})] * 200
+    sm.verify()
+
+
+def test_services_with_paths_in_same_host_are_routed_to_expectations(servicemock: Any):
+    sm.expect('http://my-service.com/api').to_receive(sm.Request('GET', '/users')).and_responds(sm.HTTP200Ok(sm.JSON({'users': []})))
+    sm.expect('http://my-service.com/admin').to_receive(sm.Request('GET', '/users')).and_responds(sm.HTTP200Ok(sm.JSON({'admins': []})))
+
+    async def call_service():
+        async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(resolver=Resolver())) as session:
+            async def get(url):
+                async with session.get(url) as res:
+                    return res.status, json.loads(await res.read())
+            return await asyncio.gather(get('http://my-service.com/api/users'), get('http://my-service.com/admin/users'))
+
+    assert asyncio.run(call_service()) == [(200, {'users': []}), (200, {'admins': []})]
+    sm.verify()
+
+
+def test_mocked_https_service_is_not_resolved(servicemock: Any):
+    sm.expect('https://my-service.com').to_receive(sm.Request('GET', '/v1/users'))
+
+    async def call_service():
+        async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(resolver=Resolver())) as session:
+            async with session.get('https://my-service.com/v1/users'):
+                pass
+
+    with pytest.raises(ValueError) as e:
+        asyncio.run(call_service())
+
+    assert "Mocked service 'https://my-service.com' can not be served" in str(e.value)
@@ -0,0 +1,65 @@
+from typing import Any
+import os
+
+import requests
+import pytest  # type: ignore
+
+import servicemock as sm
+
+
+def record(cassette_path: str) -> str:
+    """
+    Records traffic to a stand-in server acting as the real service. Returns the url of the service.
+    """
+    (sm.expect('http://my-service.com')
+        .to_receive(sm.Request('GET', '/v1/users'))
+        .and_responds(sm.HTTP200Ok(sm.JSON({'users': ['john']}), headers={'Content-Type': 'application/json'})))
+    (sm.expect('http://my-service.com')
+        .to_receive(sm.Request('POST', '/v1/users', body=sm.JSONRequestBody({'name': 'mike'})))
+        .and_responds(sm.Response('201 Created', sm.JSON({'users': ['john']}))))
+    url = sm.serve('http://my-service.com').url
+
+    with sm.Mocker(record=cassette_path):
+        requests.get(f'{url}/v1/users')
+        requests.get(f'{url}/v1/users')
+        requests.post(f'{url}/v1/users', json={'name': 'mike'})
+    return url
+
+
+def test_recorded_interactions_are_replayed(servicemock: Any, tmp_path):
+    cassette_path = str(tmp_path / 'cassette')
+    url = record(cassette_path)
+
+    sm.start()
+    assert sm.replay(cassette_path) == 2
+
+    res = requests.get(f'{url}/v1/users')
+    assert res.json() == {'users': ['john']}
+    assert res.headers['Content-Type'] == 'application/json'
+
+    res = requests.post(f'{url}/v1/users', json={'name': 'mike'})
+    assert res.status_code == 201
+    assert res.reason == 'Created'
+    sm.verify()
+
+
+def test_cassette_stores_identical_bodies_once(servicemock: Any, tmp_path):
+    cassette_path = str(tmp_path / 'cassette')
+    record(cassette_path)
+
+    with open(os.path.join(cassette_path, 'interactions.jsonl')) as f:
+        assert len(f.readlines()) == 3
+    # Request body of the POST and the one response body shared by all responses
+    assert len(os.listdir(os.path.join(cassette_path, 'bodies'))) == 2
+
+
+def test_replayed_request_body_has_to_match(servicemock: Any, tmp_path):
+    cassette_path = str(tmp_path / 'cassette')
+    url = record(cassette_path)
+
+    sm.start()
+    sm.replay(cassette_path)
+
+    with pytest.raises(Exception) as e:
+        requests.post(f'{url}/v1/users', json={'name': 'john'})
+    assert 'Received unexpected request' in str(e.value)
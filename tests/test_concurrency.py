@@ -0,0 +1,29 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+import requests
+
+import servicemock as sm
+from servicemock.servicemock import ExpectedRequests
+
+THREADS = 64
+REQUESTS_PER_THREAD = 20
+
+
+def test_hits_from_many_threads_are_counted_exactly(servicemock: Any):
+    with sm.Mocker() as m:
+        sm.expect('http://my-service.com', m).to_receive(sm.Request('GET', '/v1/status-check'))
+        sm.expect('http://my-service.com', m).to_receive(sm.Request('GET', '/v1/users'))
+
+        def call_service(_):
+            session = requests.Session()
+            for _ in range(REQUESTS_PER_THREAD):
+                session.get('http://my-service.com/v1/status-check')
+                session.get('http://my-service.com/v1/users')
+
+        with ThreadPoolExecutor(max_workers=THREADS) as executor:
+            list(executor.map(call_service, range(THREADS)))
+
+        sm.verify()
+        hits = [r.hits for r in ExpectedRequests.get_requests()]
+        assert hits == [THREADS * REQUESTS_PER_THREAD] * 2
@@ -0,0 +1,73 @@
+from typing import Any, Iterator
+
+import requests
+import pytest  # type: ignore
+
+import servicemock as sm
+from servicemock.contracts import contract_coverage, merge_reports, text_report
+
+
+@pytest.fixture(scope="function")
+def servicemock(servicemock: Any) -> Iterator[Any]:
+    contract_coverage.reset()
+    sm.enable_coverage()
+    sm.start()  # counting starts from the next start
+    yield servicemock
+    sm.enable_coverage(False)
+    contract_coverage.reset()
+
+
+def _run_test(hit_users: bool):
+    with sm.Mocker() as m:
+        sm.expect('http://users.com', m).to_receive(sm.Request('GET', '/v1/users/{id}')).at_least(0)
+        sm.expect('http://users.com', m).to_receive(sm.Request('DELETE', '/v1/users/{id}')).at_least(0)
+        sm.expect('http://auth.com', m).to_receive(sm.Request('POST', '/token'))
+
+        requests.post('http://auth.com/token')
+        if hit_users:
+            requests.get('http://users.com/v1/users/1')
+            requests.get('http://users.com/v1/users/2')
+
+
+def test_expectations_are_counted_per_service_and_endpoint_across_tests(servicemock: Any):
+    _run_test(hit_users=True)
+    sm.start()
+    _run_test(hit_users=False)
+
+    assert sm.coverage() == {
+        'services': {
+            'http://auth.com': {
+                'endpoints': {'POST /token': {'registrations': 2, 'hits': 2, 'unused': 0}},
+            },
+            'http://users.com': {
+                'endpoints': {
+                    'DELETE /v1/users/{id}': {'registrations': 2, 'hits': 0, 'unused': 2},
+                    'GET /v1/users/{id}': {'registrations': 2, 'hits': 2, 'unused': 1},
+                },
+            },
+        },
+    }
+
+
+def test_nothing_is_counted_when_disabled(servicemock: Any):
+    sm.enable_coverage(False)
+    _run_test(hit_users=True)
+    sm.start()
+
+    assert sm.coverage() == {'services': {}}
+
+
+def test_reports_are_merged_and_rendered_as_text(servicemock: Any, tmp_path: Any):
+    _run_test(hit_users=False)
+    report = merge_reports([sm.coverage(), sm.coverage()])
+
+    assert report['services']['http://auth.com']['endpoints']['POST /token'] == {'registrations': 2, 'hits': 2, 'unused': 0}
+    lines = text_report(report)
+    assert lines[0] == '3 endpoints of 2 services mocked, 2 never requested'
+    assert lines[1] == 'http://auth.com'
+    assert lines[-1].strip().startswith('GET /v1/users/{id}') and lines[-1].endswith('NEVER REQUESTED')
+
+    sm.dump_coverage(str(tmp_path / 'coverage.txt'), 'text')
+    assert (tmp_path / 'coverage.txt').read_text().startswith('3 endpoints of 2 services mocked')
+    with pytest.raises(ValueError, match='Unknown coverage format'):
+        sm.dump_coverage(str(tmp_path / 'coverage.xml'), 'xml')
@@ -0,0 +1,84 @@
+from typing import Any
+
+import requests
+import pytest  # type: ignore
+
+import servicemock as sm
+from servicemock.adapter import UnexpectedRequest
+from servicemock.diagnostics import expected_fingerprint, fingerprint, similarity, truncate
+
+
+def test_only_closest_expectations_are_listed_when_there_are_many(servicemock: Any):
+    with sm.Mocker() as m:
+        dsl = sm.expect('http://my-service.com', m)
+        for i in range(1_000):
+            dsl.to_receive(sm.Request('GET', f'/v1/items/{i}'))
+        dsl.to_receive(sm.Request('POST', '/v1/users/{id}/orders', body=sm.JSONRequestBody({'sku': 'abc', 'count': 1})))
+
+        with pytest.raises(UnexpectedRequest) as e:
+            requests.post('http://my-service.com/v1/users/1/orders', json={'sku': 'abc', 'count': 2})
+
+    lines = str(e.value).splitlines()
+    assert lines[1] == 'Closest of 1001 expected requests are:'
+    assert lines[2] == "  - POST http://my-service.com/v1/users/{id}/orders, json: {'sku': 'abc', 'count': 1}"
+    assert lines[3] == '  - GET http://my-service.com/v1/items/0'
+    assert len(lines) == 2 + UnexpectedRequest.max_expectations
+
+
+def test_long_bodies_are_truncated(servicemock: Any):
+    with sm.Mocker() as m:
+        sm.expect('http://my-service.com', m).to_receive(sm.Request('POST', '/v1/users', body=sm.BytesRequestBody(b'x' * 10_000)))
+
+        with pytest.raises(UnexpectedRequest) as e:
+            requests.post('http://my-service.com/v1/users', data='y' * 10_000)
+
+    message = str(e.value)
+    assert len(message) < 2_000
+    assert 'more characters)' in message
+
+
+def test_message_is_rendered_once(servicemock: Any):
+    with sm.Mocker() as m:
+        sm.expect('http://my-service.com', m).to_receive(sm.Request('GET', '/v1/users'))
+
+        with pytest.raises(UnexpectedRequest) as e:
+            requests.get('http://my-service.com/v1/items')
+
+        message = str(e.value)
+        requests.get('http://my-service.com/v1/users')
+
+    assert str(e.value) is message
+
+
+def test_binary_body_is_shown_in_message(servicemock: Any):
+    with sm.Mocker() as m:
+        sm.expect('http://my-service.com', m).to_receive(sm.Request('GET', '/v1/users'))
+
+        with pytest.raises(UnexpectedRequest) as e:
+            requests.post('http://my-service.com/v1/files', data=b'\xff\xfe\x00binary')
+
+    assert "text: \ufffd\ufffd\x00binary" in str(e.value)
+
+
+def test_expected_path_includes_base_url_path():
+    received = fingerprint('GET', 'http://my-service.com/api/v1/users/1', None)
+    expected = sm.Request('GET', '/v1/users/{id}').bind('http://my-service.com/api')
+
+    assert expected_fingerprint(expected) == fingerprint('GET', 'http://my-service.com/api/v1/users/{id}', None)
+    assert similarity(received, expected_fingerprint(expected)) == similarity(received, received)
+
+
+def test_similarity_prefers_host_then_method_and_path():
+    received = fingerprint('GET', 'http://my-service.com/v1/users/1', None)
+
+    same_host = similarity(received, fingerprint('POST', 'http://my-service.com/v2/items', None))
+    same_method_and_path = similarity(received, fingerprint('GET', 'http://other-service.com/v1/users/1', None))
+    template = similarity(received, fingerprint('GET', 'http://my-service.com/v1/users/{id}', None))
+    exact = similarity(received, received)
+
+    assert same_method_and_path < same_host < template == exact
+
+
+def test_truncate():
+    assert truncate('abc', 3) == 'abc'
+    assert truncate('abcdef', 3) == 'abc... (3 more characters)'
@@ -0,0 +1,100 @@
+from typing import Any, List
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+import servicemock as sm
+from servicemock.dynamic import LRUCache, MatchedRequest
+
+
+def test_body_is_rendered_from_path_params_and_query(servicemock: Any):
+    def render(request: MatchedRequest) -> Any:
+        return {'id': request.path_params['id'], 'fields': request.query.get('fields', [])}
+
+    with sm.Mocker() as m:
+        (sm.expect('http://my-service.com', m)
+            .to_receive(sm.Request('GET', '/v1/users/{id}'))
+            .and_responds(sm.HTTP200Ok(sm.Generated(render)))
+            .at_least(0))
+
+        assert requests.get('http://my-service.com/v1/users/1').json() == {'id': '1', 'fields': []}
+        assert requests.get('http://my-service.com/v1/users/2?fields=name').json() == {'id': '2', 'fields': ['name']}
+
+
+def test_body_is_rendered_from_json_body(servicemock: Any):
+    with sm.Mocker() as m:
+        (sm.expect('http://my-service.com', m)
+            .to_receive(sm.Request('POST', '/v1/users'))
+            .and_responds(sm.Response('201 Created', sm.Generated(lambda request: f"created {request.json['name']}",
+                                                                  headers={'Content-Type': 'text/plain'}))))
+
+        response = requests.post('http://my-service.com/v1/users', json={'name': 'john'})
+
+        assert response.status_code == 201
+        assert response.text == 'created john'
+        assert response.headers['Content-Type'] == 'text/plain'
+
+
+def test_rendered_bytes_are_returned_as_is(servicemock: Any):
+    with sm.Mocker() as m:
+        sm.expect('http://my-service.com', m).to_receive(sm.Request('GET', '/v1/file')).and_responds(sm.HTTP200Ok(sm.Generated(lambda r: b'\x00\x01')))
+
+        assert requests.get('http://my-service.com/v1/file').content == b'\x00\x01'
+
+
+def test_rendered_bodies_are_memoized_by_normalized_request(servicemock: Any):
+    rendered: List[str] = []
+
+    def render(request: MatchedRequest) -> Any:
+        rendered.append(request.url)
+        return {'id': request.path_params['id']}
+
+    with sm.Mocker() as m:
+        (sm.expect('http://my-service.com', m)
+            .to_receive(sm.Request('POST', '/v1/users/{id}'))
+            .and_responds(sm.HTTP200Ok(sm.Generated(render, cache_size=10)))
+            .at_least(0))
+
+        requests.post('http://my-service.com/v1/users/1?a=1&b=2', json={'x': 1, 'y': 2})
+        requests.post('http://my-service.com/v1/users/1?b=2&a=1', data='{"y": 2, "x": 1}')
+        assert requests.post('http://my-service.com/v1/users/1?b=2&a=1', json={'x': 2}).json() == {'id': '1'}
+        requests.post('http://my-service.com/v1/users/2?a=1&b=2', json={'x': 1, 'y': 2})
+
+    assert len(rendered) == 3
+
+
+def test_json_values_of_different_types_are_rendered_separately(servicemock: Any):
+    with sm.Mocker() as m:
+        (sm.expect('http://my-service.com', m)
+            .to_receive(sm.Request('POST', '/v1/echo'))
+            .and_responds(sm.HTTP200Ok(sm.Generated(lambda r: r.json, cache_size=10)))
+            .at_least(0))
+
+        responses = [requests.post('http://my-service.com/v1/echo', data=data).text for data in ('[1]', '[true]', '[1.0]')]
+
+    assert responses == ['[1]', '[true]', '[1.0]']
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(2)
+    cache.get_or_set('a', lambda: 1)
+    cache.get_or_set('b', lambda: 2)
+    cache.get_or_set('a', lambda: 0)
+    cache.get_or_set('c', lambda: 3)
+
+    assert len(cache) == 2
+    assert cache.get_or_set('a', lambda: 0) == 1
+    assert cache.get_or_set('b', lambda: 0) == 0
+
+
+def test_memoized_body_is_shared_between_threads(servicemock: Any):
+    with sm.Mocker() as m:
+        (sm.expect('http://my-service.com', m)
+            .to_receive(sm.Request('GET', '/v1/users/{id}'))
+            .and_responds(sm.HTTP200Ok(sm.Generated(lambda r: {'id': r.path_params['id']}, cache_size=4)))
+            .at_least(0))
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            bodies = list(executor.map(lambda i: requests.get(f'http://my-service.com/v1/users/{i % 8}').json(), range(200)))
+
+    assert bodies == [{'id': str(i % 8)} for i in range(200)]
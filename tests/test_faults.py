@@ -0,0 +1,97 @@
+from typing import Any, List
+from concurrent.futures import ThreadPoolExecutor
+import time
+
+import requests
+import pytest  # type: ignore
+
+import servicemock as sm
+
+
+class FakeSleep:
+
+    def __init__(self):
+        self.sleeps: List[float] = []
+
+    def __call__(self, seconds: float):
+        self.sleeps.append(seconds)
+
+
+def test_response_is_delayed(servicemock: Any):
+    sleep = FakeSleep()
+    with sm.Mocker() as m:
+        (sm.expect('http://my-service.com', m)
+            .to_receive(sm.Request('GET', '/v1/users'))
+            .and_responds(sm.HTTP200Ok(sm.JSON({'users': []}), faults=sm.Faults(delay=0.25, sleep=sleep))))
+
+        assert requests.get('http://my-service.com/v1/users').json() == {'users': []}
+        assert sleep.sleeps == [0.25]
+
+
+def test_delay_longer_than_timeout_raises_timeout(servicemock: Any):
+    sleep = FakeSleep()
+    with sm.Mocker() as m:
+        sm.expect('http://my-service.com', m, faults=sm.Faults(delay=(2, 3), sleep=sleep)).to_receive(sm.Request('GET', '/v1/users'))
+
+        with pytest.raises(requests.exceptions.ReadTimeout):
+            requests.get('http://my-service.com/v1/users', timeout=(1, 0.5))
+        assert sleep.sleeps == [0.5]
+
+
+def test_seeded_faults_are_reproducible(servicemock: Any):
+    def outcomes(seed: int) -> List[str]:
+        sm.start()
+        with sm.Mocker() as m:
+            faults = sm.Faults(reset_rate=0.3, timeout_rate=0.2, seed=seed, sleep=FakeSleep())
+            sm.expect('http://my-service.com', m, faults=faults).to_receive(sm.Request('GET', '/v1/users'))
+
+            results = []
+            for _ in range(50):
+                try:
+                    requests.get('http://my-service.com/v1/users')
+                    results.append('ok')
+                except requests.exceptions.ReadTimeout:
+                    results.append('timeout')
+                except requests.exceptions.ConnectionError:
+                    results.append('reset')
+            return results
+
+    first = outcomes(seed=7)
+    assert first == outcomes(seed=7)
+    assert {'ok', 'timeout', 'reset'} == set(first)
+
+
+def test_body_is_streamed_in_throttled_chunks(servicemock: Any):
+    sleep = FakeSleep()
+    with sm.Mocker() as m:
+        (sm.expect('http://my-service.com', m)
+            .to_receive(sm.Request('GET', '/v1/download'))
+            .and_responds(sm.HTTP200Ok(sm.Bytes(b'x' * 1000), faults=sm.Faults(bandwidth=1000, chunk_size=100, sleep=sleep))))
+
+        res = requests.get('http://my-service.com/v1/download', stream=True)
+        chunks = list(res.iter_content(chunk_size=1000))
+
+        assert b''.join(chunks) == b'x' * 1000
+        assert sleep.sleeps == [0.1] * 10
+
+
+def test_faults_apply_only_to_the_response_having_them(servicemock: Any):
+    with sm.Mocker() as m:
+        dsl = sm.expect('http://my-service.com', m)
+        dsl.to_receive(sm.Request('GET', '/v1/broken')).and_responds(sm.Response('200 OK', faults=sm.Faults(reset_rate=1)))
+        dsl.to_receive(sm.Request('GET', '/v1/users'))
+
+        with pytest.raises(requests.exceptions.ConnectionError):
+            requests.get('http://my-service.com/v1/broken')
+        assert requests.get('http://my-service.com/v1/users').status_code == 200
+
+
+def test_delays_do_not_block_other_threads(servicemock: Any):
+    with sm.Mocker() as m:
+        sm.expect('http://my-service.com', m, faults=sm.Faults(delay=0.2)).to_receive(sm.Request('GET', '/v1/users'))
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=10) as executor:
+            list(executor.map(lambda _: requests.get('http://my-service.com/v1/users'), range(10)))
+
+        assert time.perf_counter() - started < 1.0
@@ -0,0 +1,70 @@
+from typing import Any
+import asyncio
+import time
+
+import pytest  # type: ignore
+
+import servicemock as sm
+
+httpx = pytest.importorskip('httpx')
+from servicemock.httpx import Transport, AsyncTransport  # noqa: E402
+
+
+def test_expected_request_is_matched_with_sync_transport(servicemock: Any):
+    (sm.expect('http://my-service.com')
+        .to_receive(sm.Request('POST', '/v1/users', body=sm.JSONRequestBody({'name': 'john'})))
+        .and_responds(sm.HTTP200Ok(sm.JSON({'id': 1}), cookies=(sm.Cookie('session', 'deadbeef'),))))
+
+    with httpx.Client(transport=Transport()) as client:
+        res = client.post('http://my-service.com/v1/users', json={'name': 'john'})
+
+    assert res.status_code == 200
+    assert res.reason_phrase == 'OK'
+    assert res.json() == {'id': 1}
+    assert res.cookies['session'] == 'deadbeef'
+    sm.verify()
+
+
+def test_unexpected_request_raises_exception(servicemock: Any):
+    sm.expect('http://my-service.com').to_receive(sm.Request('GET', '/v1/status-check'))
+
+    with httpx.Client(transport=Transport()) as client:
+        with pytest.raises(Exception) as e:
+            client.get('http://my-service.com/v1/users')
+
+    assert "Received unexpected request 'GET http://my-service.com/v1/users" in str(e.value)
+
+
+def test_concurrent_requests_with_async_transport(servicemock: Any):
+    sm.expect('http://my-service.com').to_receive(sm.Request('GET', '/v1/users')).and_responds(sm.HTTP200Ok(sm.JSON({'status': 'ok'})))
+
+    async def call_service():
+        async with httpx.AsyncClient(transport=AsyncTransport()) as client:
+            return await asyncio.gather(*[client.get('http://my-service.com/v1/users') for _ in range(1000)])
+
+    responses = asyncio.run(call_service())
+
+    assert {r.status_code for r in responses} == {200}
+    assert sm.servicemock.ExpectedRequests.get_requests()[0].hits == 1000
+
+
+def test_injected_delays_do_not_block_the_event_loop(servicemock: Any):
+    sm.expect('http://my-service.com', faults=sm.Faults(delay=0.2)).to_receive(sm.Request('GET', '/v1/users'))
+
+    async def call_service():
+        async with httpx.AsyncClient(transport=AsyncTransport()) as client:
+            return await asyncio.gather(*[client.get('http://my-service.com/v1/users') for _ in range(5)])
+
+    started = time.monotonic()
+    responses = asyncio.run(call_service())
+
+    assert {r.status_code for r in responses} == {200}
+    assert time.monotonic() - started < 0.6
+
+
+def test_injected_faults_are_raised_as_httpx_exceptions(servicemock: Any):
+    sm.expect('http://my-service.com', faults=sm.Faults(reset_rate=1)).to_receive(sm.Request('GET', '/v1/users'))
+
+    with httpx.Client(transport=Transport()) as client:
+        with pytest.raises(httpx.ConnectError):
+            client.get('http://my-service.com/v1/users')
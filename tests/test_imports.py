@@ -0,0 +1,38 @@
+from typing import List
+import subprocess
+import sys
+
+import pytest  # type: ignore
+
+import servicemock as sm
+
+
+def imported_modules(statement: str) -> List[str]:
+    code = f'{statement}; import sys; print(" ".join(sys.modules))'
+    return subprocess.run([sys.executable, '-c', code], check=True, capture_output=True, text=True).stdout.split()
+
+
+@pytest.mark.parametrize('statement', ['import servicemock', 'import servicemock.pytest_plugin'])
+def test_import_does_not_load_requests_or_integrations(statement: str):
+    modules = imported_modules(statement)
+
+    for module in ['requests', 'requests_mock', 'unittest', 'servicemock.servicemock', 'servicemock.adapter']:
+        assert module not in modules
+
+
+def test_public_names_are_loaded_on_first_use():
+    modules = imported_modules('import servicemock; servicemock.Faults')
+
+    assert 'servicemock.faults' in modules
+    assert 'servicemock.loader' not in modules
+
+
+@pytest.mark.parametrize('name', sm.__all__)
+def test_public_names_resolve(name: str):
+    assert getattr(sm, name) is not None
+    assert name in dir(sm)
+
+
+def test_unknown_name_raises_attribute_error():
+    with pytest.raises(AttributeError):
+        sm.does_not_exist  # type: ignore
@@ -0,0 +1,72 @@
+import re
+
+import requests
+import requests_mock  # type: ignore
+
+import servicemock as sm
+from servicemock.matchers import PathTemplate
+
+
+def test_latest_registered_matcher_wins():
+    with sm.Mocker() as m:
+        m.get('http://my-service.com/v1/users', text='first')
+        m.get('http://my-service.com/v1/users', text='second')
+
+        assert requests.get('http://my-service.com/v1/users').text == 'second'
+
+
+def test_regex_matcher_registered_later_wins_over_indexed_matcher():
+    with sm.Mocker() as m:
+        m.get('http://my-service.com/v1/users', text='exact')
+        m.get(re.compile('/v1/users'), text='regex')
+
+        assert requests.get('http://my-service.com/v1/users').text == 'regex'
+
+
+def test_indexed_matcher_registered_later_wins_over_regex_matcher():
+    with sm.Mocker() as m:
+        m.get(re.compile('/v1/users'), text='regex')
+        m.get('http://my-service.com/v1/users', text='exact')
+
+        assert requests.get('http://my-service.com/v1/users').text == 'exact'
+
+
+def test_matching_is_case_insensitive_like_requests_mock():
+    with sm.Mocker() as m:
+        m.get('HTTP://My-Service.com/V1/Users', text='ok')
+
+        assert requests.get('http://my-service.com/v1/users').text == 'ok'
+
+
+def test_relative_and_any_urls_are_matched():
+    with sm.Mocker() as m:
+        m.get('/v1/users', text='relative')
+        m.post(requests_mock.ANY, text='any')
+
+        assert requests.get('http://my-service.com/v1/users').text == 'relative'
+        assert requests.post('http://other-service.com/v2').text == 'any'
+
+
+def test_query_is_not_part_of_the_index_key():
+    with sm.Mocker() as m:
+        m.get('http://my-service.com/v1/users?page=2', text='page 2')
+
+        assert requests.get('http://my-service.com/v1/users?page=2&size=10').text == 'page 2'
+
+
+def test_empty_path_is_matched_as_root():
+    with sm.Mocker() as m:
+        m.get('http://my-service.com', text='root')
+
+        assert requests.get('http://my-service.com/').text == 'root'
+
+
+def test_path_templates_are_bucketed_by_host_and_merged_in_registration_order():
+    with sm.Mocker() as m:
+        m.get(PathTemplate('http://my-service.com/v1/users/{id}'), text='template')
+        m.get('http://my-service.com/v1/users/1', text='exact')
+        m.get(PathTemplate('http://other-service.com/v1/users/{id}'), text='other')
+
+        assert requests.get('http://my-service.com/v1/users/1').text == 'exact'
+        assert requests.get('http://my-service.com/v1/users/2').text == 'template'
+        assert requests.get('http://other-service.com/v1/users/1').text == 'other'
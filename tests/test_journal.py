@@ -0,0 +1,176 @@
+from typing import Any, Iterator
+import hashlib
+
+import requests
+import pytest  # type: ignore
+from requests_mock.request import _RequestObjectProxy  # type: ignore
+
+import servicemock as sm
+from servicemock.adapter import UnexpectedRequest
+from servicemock.journal import Journal
+from servicemock.servicemock import ReceivedBody
+
+
+@pytest.fixture(scope="function")
+def servicemock(servicemock: Any) -> Iterator[Any]:
+    yield servicemock
+    sm.configure_journal()
+
+
+def test_matched_and_unexpected_requests_are_journaled(servicemock: Any):
+    sm.configure_journal(bodies='keep')
+    with sm.Mocker() as m:
+        sm.expect('http://my-service.com', m).to_receive(sm.Request('POST', '/v1/users', body=sm.JSONRequestBody({'name': 'john'})))
+
+        requests.post('http://my-service.com/v1/users', json={'name': 'john'})
+        with pytest.raises(UnexpectedRequest):
+            requests.get('http://my-service.com/v1/users/1')
+
+    first, second = sm.history()
+    assert (first.method, first.url) == ('POST', 'http://my-service.com/v1/users')
+    assert first.matched.full_url == 'http://my-service.com/v1/users'
+    assert first.body == b'{"name": "john"}'
+    assert first.body_sha256 == hashlib.sha256(b'{"name": "john"}').hexdigest()
+    assert (second.method, second.path, second.matched) == ('GET', '/v1/users/1', None)
+    assert first.sequence < second.sequence
+
+
+def test_history_is_filtered(servicemock: Any):
+    with sm.Mocker() as m:
+        sm.expect('http://my-service.com', m).to_receive(sm.Request('GET', '/v1/users'))
+        sm.expect('http://other-service.com', m).to_receive(sm.Request('GET', '/v1/users'))
+        sm.expect('http://other-service.com', m).to_receive(sm.Request('DELETE', '/v1/users/1'))
+
+        requests.get('http://my-service.com/v1/users')
+        requests.get('http://other-service.com/v1/users')
+        requests.delete('http://other-service.com/v1/users/1')
+        with pytest.raises(UnexpectedRequest):
+            requests.get('http://other-service.com/v1/orders')
+
+    assert len(sm.history(host='OTHER-service.com')) == 3
+    assert len(sm.history(host='other-service.com', path='/v1/users')) == 1
+    assert len(sm.history(path='/v1/users')) == 2
+    assert [e.method for e in sm.history(method='delete')] == ['DELETE']
+    assert [e.url for e in sm.history(url='http://my-service.com/v1/users')] == ['http://my-service.com/v1/users']
+    assert [e.path for e in sm.history(matched=False)] == ['/v1/orders']
+    assert len(sm.history(host='other-service.com', matched=True)) == 2
+
+
+def test_journal_keeps_the_latest_requests(servicemock: Any):
+    sm.configure_journal(size=3)
+    with sm.Mocker() as m:
+        for i in range(5):
+            sm.expect('http://my-service.com', m).to_receive(sm.Request('GET', f'/v1/users/{i % 2}')).and_responds(
+                sm.HTTP200Ok(sm.Text('ok')))
+        for i in range(5):
+            requests.get(f'http://my-service.com/v1/users/{i % 2}')
+
+    assert [e.path for e in sm.history()] == ['/v1/users/0', '/v1/users/1', '/v1/users/0']
+    assert len(sm.history(host='my-service.com', path='/v1/users/0')) == 2
+    assert len(sm.history(host='my-service.com')) == 3
+
+
+def test_journal_is_cleared_by_start(servicemock: Any):
+    with sm.Mocker() as m:
+        sm.expect('http://my-service.com', m).to_receive(sm.Request('GET', '/v1/users'))
+        requests.get('http://my-service.com/v1/users')
+
+    sm.start()
+    assert sm.history() == []
+
+
+@pytest.mark.parametrize('bodies, expected', [('hash', None), ('spill', b'payload'), ('keep', b'payload'), ('drop', None)])
+def test_bodies_are_stored_as_configured(servicemock: Any, bodies: str, expected: Any):
+    sm.configure_journal(bodies=bodies)
+    with sm.Mocker():
+        with pytest.raises(UnexpectedRequest):
+            requests.post('http://my-service.com/v1/upload', data=b'payload')
+
+    entry, = sm.history()
+    assert entry.body == expected
+    assert (entry.body_sha256 is not None) == (bodies != 'drop')
+
+
+def test_bodies_are_not_kept_by_default(servicemock: Any):
+    with sm.Mocker():
+        with pytest.raises(UnexpectedRequest):
+            requests.post('http://my-service.com/v1/upload', data=b'payload')
+
+    entry, = sm.history()
+    assert (entry.body, entry.body_sha256) == (None, None)
+
+
+@pytest.mark.parametrize('bodies', ['drop', 'keep', 'hash', 'spill'])
+def test_streamed_uploads_are_not_read(servicemock: Any, bodies: str, tmp_path: Any):
+    sm.configure_journal(bodies=bodies)
+    path = tmp_path / 'upload.bin'
+    path.write_bytes(b'x' * 1000)
+
+    with sm.Mocker() as m:
+        sm.expect('http://my-service.com', m).to_receive(sm.Request('POST', '/v1/upload')).times(2)
+
+        with open(path, 'rb') as f:
+            assert requests.post('http://my-service.com/v1/upload', data=f).status_code == 200
+        assert requests.post('http://my-service.com/v1/upload', data=(chunk for chunk in [b'a', b'b'])).status_code == 200
+
+    assert [(e.body, e.body_sha256) for e in sm.history()] == [(None, None), (None, None)]
+    sm.verify()
+
+
+def test_digest_is_computed_when_needed():
+    journal = Journal(bodies='keep')
+    journal.record(_request(b'payload'))
+
+    entry, = journal.query()
+    assert entry._digest is None
+    assert entry.body_sha256 == hashlib.sha256(b'payload').hexdigest()
+
+
+def test_spill_files_are_rotated():
+    journal = Journal(size=10, bodies='spill', spill_size=24)
+    for body in (b'first', b'second', b'third', b'fourth', b'fifth'):
+        journal.record(_request(body))
+
+    # Files of at most 12 bytes: first and second are in the rotated away file
+    assert [e.body for e in journal.query()] == [None, None, b'third', b'fourth', b'fifth']
+    assert len(journal._spills) == 2
+    journal.close()
+
+
+def test_request_history_can_be_bounded(servicemock: Any):
+    with sm.Mocker(history_size=2) as m:
+        sm.expect('http://my-service.com', m).to_receive(sm.Request('GET', '/v1/users')).times(3)
+        for i in range(3):
+            requests.get(f'http://my-service.com/v1/users?page={i}')
+
+        assert [r.qs['page'] for r in m.request_history] == [['1'], ['2']]
+        assert all(len(matcher.request_history) <= 2 for matcher in m._adapter._matchers)
+        assert m.last_request.qs['page'] == ['2']
+
+
+def test_decoded_bodies_are_not_kept_in_request_history(servicemock: Any):
+    with sm.Mocker() as m:
+        sm.expect('http://my-service.com', m).to_receive(sm.Request('POST', '/v1/users', body=sm.JSONRequestBody({'name': 'john'})))
+        requests.post('http://my-service.com/v1/users', json={'name': 'john'})
+
+        assert not hasattr(m.last_request, ReceivedBody._ATTRIBUTE)
+        assert m.last_request.json() == {'name': 'john'}
+
+
+def test_spilled_bodies_are_read_back_per_entry():
+    journal = Journal(size=2, bodies='spill')
+    for body in (b'first', b'second', b'third'):
+        journal.record(_request(body))
+
+    assert [e.body for e in journal.query()] == [b'second', b'third']
+    journal.close()
+    assert journal.query()[0].body is None
+
+
+def test_unknown_body_storage_is_rejected():
+    with pytest.raises(ValueError, match='Unknown body storage'):
+        Journal(bodies='zip')
+
+
+def _request(body: bytes) -> Any:
+    return _RequestObjectProxy(requests.Request('POST', 'http://my-service.com/v1/upload', data=body).prepare())
@@ -0,0 +1,142 @@
+from typing import Any
+import json
+import types
+
+import requests
+import pytest  # type: ignore
+
+import servicemock as sm
+from servicemock import loader
+
+EXPECTATIONS = [
+    {
+        'base_url': 'http://my-service.com',
+        'request': {'method': 'POST', 'url': '/v1/users', 'headers': {'x-token': 'deadbeef'}, 'json': {'name': 'john'}},
+        'response': {'status': '201 Created', 'headers': {'Cf-Ipcountry': 'US'}, 'json': {'id': 1},
+                     'cookies': [{'name': 'session', 'value': 'cafebabe'}]},
+    },
+    {
+        'base_url': 'http://my-service.com',
+        'request': {'method': 'GET', 'url': '/v1/status-check'},
+        'response': {'text': 'ok'},
+    },
+]
+
+
+def write_json(path, expectations):
+    path.write_text(json.dumps(expectations, indent=2))
+    return str(path)
+
+
+def write_jsonl(path, expectations):
+    path.write_text('\n'.join(json.dumps(e) for e in expectations) + '\n')
+    return str(path)
+
+
+def write_yaml(path, expectations):
+    yaml = pytest.importorskip('yaml')
+    path.write_text(yaml.safe_dump(expectations[0]) + '---\n' + yaml.safe_dump(expectations[1:]))
+    return str(path)
+
+
+def assert_expectations_are_registered():
+    res = requests.post('http://my-service.com/v1/users', json={'name': 'john'}, headers={'x-token': 'deadbeef'})
+    assert res.status_code == 201
+    assert res.reason == 'Created'
+    assert res.json() == {'id': 1}
+    assert res.headers['Cf-Ipcountry'] == 'US'
+    assert res.cookies.get_dict() == {'session': 'cafebabe'}
+
+    assert requests.get('http://my-service.com/v1/status-check').text == 'ok'
+    sm.verify()
+
+
+@pytest.mark.parametrize('filename, write', [
+    ('expectations.json', write_json),
+    ('expectations.jsonl', write_jsonl),
+    ('expectations.yaml', write_yaml),
+])
+def test_expectations_are_loaded_from_file(servicemock: Any, tmp_path, filename, write):
+    path = write(tmp_path / filename, EXPECTATIONS)
+
+    assert sm.load_expectations(path, cache_dir=None) == 2
+
+    assert_expectations_are_registered()
+
+
+def test_compiled_expectations_are_used_on_later_loads(servicemock: Any, tmp_path, monkeypatch):
+    path = write_jsonl(tmp_path / 'expectations.jsonl', EXPECTATIONS)
+    cache_dir = str(tmp_path / 'cache')
+    sm.load_expectations(path, cache_dir=cache_dir)
+
+    sm.start()
+    monkeypatch.setattr(loader, '_parse', None)
+    assert sm.load_expectations(path, cache_dir=cache_dir) == 2
+
+    assert_expectations_are_registered()
+
+
+def test_modified_file_is_parsed_again(servicemock: Any, tmp_path):
+    path = write_jsonl(tmp_path / 'expectations.jsonl', EXPECTATIONS[1:])
+    cache_dir = str(tmp_path / 'cache')
+    sm.load_expectations(path, cache_dir=cache_dir)
+
+    sm.start()
+    write_jsonl(tmp_path / 'expectations.jsonl', EXPECTATIONS)
+    assert sm.load_expectations(path, cache_dir=cache_dir) == 2
+
+
+@pytest.mark.parametrize('corrupt', [
+    lambda data: data[:len(data) // 2],
+    lambda data: data[:len(data) // 2] + b'garbage',
+    lambda data: data.replace(b'JSONRequestBody', b'JSONRequestBodx'),
+])
+def test_corrupted_cache_is_rebuilt(servicemock: Any, tmp_path, corrupt):
+    path = write_jsonl(tmp_path / 'expectations.jsonl', EXPECTATIONS)
+    cache_dir = tmp_path / 'cache'
+    sm.load_expectations(path, cache_dir=str(cache_dir))
+    cache_file, = cache_dir.iterdir()
+    cache = cache_file.read_bytes()
+    cache_file.write_bytes(corrupt(cache))
+
+    sm.start()
+    assert sm.load_expectations(path, cache_dir=str(cache_dir)) == 2
+
+    assert_expectations_are_registered()
+    assert len(sm.servicemock.ExpectedRequests.get_requests()) == 2
+    assert cache_file.read_bytes() == cache
+
+
+def test_cache_version_changes_with_the_slots_of_pickled_classes():
+    module = types.ModuleType('contracts')
+
+    def cached_class(*slots):
+        return type('Expectation', (), {'__slots__': slots, '__module__': module.__name__})
+
+    module.Expectation = cached_class('method', 'url')  # type: ignore
+    version = loader._cache_version(module)
+    module.Expectation = cached_class('method', 'url', 'headers')  # type: ignore
+
+    assert loader._cache_version(module) != version
+
+
+def test_json_array_is_read_in_chunks(servicemock: Any, tmp_path, monkeypatch):
+    monkeypatch.setattr(loader, '_CHUNK_SIZE', 16)
+    expectations = [
+        {'base_url': 'http://my-service.com', 'request': {'method': 'GET', 'url': f'/v1/users/{i}'}, 'response': {'json': {'id': i}}}
+        for i in range(50)
+    ]
+    path = write_json(tmp_path / 'expectations.json', expectations)
+
+    assert sm.load_expectations(path, cache_dir=None) == 50
+    assert requests.get('http://my-service.com/v1/users/42').json() == {'id': 42}
+
+
+def test_invalid_expectation_is_reported_with_its_position(servicemock: Any, tmp_path):
+    path = write_jsonl(tmp_path / 'expectations.jsonl', [EXPECTATIONS[0], {'base_url': 'http://my-service.com'}])
+
+    with pytest.raises(ValueError) as e:
+        sm.load_expectations(path, cache_dir=str(tmp_path / 'cache'))
+
+    assert "Invalid expectation #2" in str(e.value)
+    assert list((tmp_path / 'cache').iterdir()) == []
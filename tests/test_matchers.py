@@ -0,0 +1,196 @@
+from typing import Any
+import pickle
+import re
+
+import requests
+import pytest  # type: ignore
+
+import servicemock as sm
+from servicemock.adapter import UnexpectedRequest
+from servicemock.matchers import JSONPath, PathTemplate, is_subset
+
+
+def test_path_template_matches_single_segment():
+    template = PathTemplate('http://my-service.com/v1/users/{id}/items')
+
+    assert template.search('http://my-service.com/v1/users/42/items')
+    assert template.search('http://my-service.com/v1/users/42/items?page=1')
+    assert not template.search('http://my-service.com/v1/users/42/7/items')
+    assert not template.search('http://my-service.com/v1/users//items')
+    assert not template.search('http://my-service.com/v1/users/42/items/1')
+
+
+def test_path_template_captures_placeholders():
+    assert PathTemplate('http://my-service.com/v1/users/{id}').search('http://my-service.com/v1/users/42').group('id') == '42'
+
+
+@pytest.mark.parametrize('path, document, values', [
+    ('$', {'a': 1}, [{'a': 1}]),
+    ('$.user.id', {'user': {'id': 1}}, [1]),
+    ("$['user']['first name']", {'user': {'first name': 'john'}}, ['john']),
+    ('$.items[1]', {'items': [1, 2]}, [2]),
+    ('$.items[2]', {'items': [1, 2]}, []),
+    ('$.items[*].sku', {'items': [{'sku': 'a'}, {'sku': 'b'}, {}]}, ['a', 'b']),
+    ('$.user.*', {'user': {'id': 1, 'name': 'john'}}, [1, 'john']),
+    ('$.user.id', {'user': 'john'}, []),
+])
+def test_json_path_values(path: str, document: Any, values: Any):
+    assert list(JSONPath(path).values(document)) == values
+
+
+@pytest.mark.parametrize('path', ['user.id', '$.items[-1]', '$..id', '$.items[?(@.id)]'])
+def test_unsupported_json_path_raises(path: str):
+    with pytest.raises(ValueError):
+        JSONPath(path)
+
+
+@pytest.mark.parametrize('expected, value, result', [
+    ({'a': 1}, {'a': 1, 'b': 2}, True),
+    ({'a': {'b': 1}}, {'a': {'b': 1, 'c': 2}}, True),
+    ({'a': [{'b': 1}]}, {'a': [{'b': 1, 'c': 2}]}, True),
+    ({'a': [1]}, {'a': [1, 2]}, False),
+    ({'a': 1}, {'a': 2}, False),
+    ({'a': 1}, {'b': 1}, False),
+    ({'a': 1}, None, False),
+])
+def test_is_subset(expected: Any, value: Any, result: bool):
+    assert is_subset(expected, value) == result
+
+
+def test_path_template_expectation_covers_all_ids(servicemock: Any):
+    with sm.Mocker() as m:
+        (sm.expect('http://my-service.com', m)
+            .to_receive(sm.Request('GET', '/v1/users/{id}'))
+            .and_responds(sm.HTTP200Ok(sm.JSON({'name': 'john'})))
+            .times(3))
+
+        for i in range(3):
+            assert requests.get(f'http://my-service.com/v1/users/{i}').json() == {'name': 'john'}
+
+        with pytest.raises(UnexpectedRequest):
+            requests.get('http://my-service.com/v1/users/1/items')
+
+    sm.verify()
+
+
+def test_query_params_are_matched(servicemock: Any):
+    with sm.Mocker() as m:
+        dsl = sm.expect('http://my-service.com', m)
+        dsl.to_receive(sm.Request('GET', '/v1/users', query={'page': re.compile(r'\d+'), 'sort': 'name'}))
+        dsl.to_receive(sm.Request('GET', '/v1/items', query={'limit': lambda value: int(value) <= 100}))
+
+        requests.get('http://my-service.com/v1/users?page=2&sort=name&extra=1')
+        requests.get('http://my-service.com/v1/items?limit=100')
+
+        with pytest.raises(UnexpectedRequest):
+            requests.get('http://my-service.com/v1/users?page=two&sort=name')
+        with pytest.raises(UnexpectedRequest):
+            requests.get('http://my-service.com/v1/users?page=2')
+        with pytest.raises(UnexpectedRequest):
+            requests.get('http://my-service.com/v1/items?limit=101')
+
+    sm.verify()
+
+
+def test_query_is_matched_case_sensitively(servicemock: Any):
+    with sm.Mocker() as m:
+        sm.expect('http://my-service.com', m).to_receive(sm.Request('GET', '/v1/users', query={'name': 'John'}))
+
+        with pytest.raises(UnexpectedRequest):
+            requests.get('http://my-service.com/v1/users?name=john')
+        requests.get('http://my-service.com/v1/users?name=John')
+
+
+@pytest.mark.parametrize('expected', [1, 1.5, True, None, ['1']])
+def test_non_string_query_value_raises(expected: Any):
+    with pytest.raises(TypeError) as e:
+        sm.Request('GET', '/v1/users', query={'page': expected})
+
+    assert "Query parameter 'page'" in str(e.value)
+
+
+def test_headers_are_matched(servicemock: Any):
+    with sm.Mocker() as m:
+        headers = {
+            'Authorization': re.compile(r'Bearer [a-z0-9]+'),
+            'X-Request-Id': sm.PRESENT,
+            'X-Debug': sm.ABSENT,
+            'Accept': ['application/json', 'text/plain'],
+            'X-Version': lambda value: int(value) >= 2,
+        }
+        sm.expect('http://my-service.com', m).to_receive(sm.Request('GET', '/v1/users', headers=headers)).at_least(1)
+        valid = {'authorization': 'Bearer abc1', 'x-request-id': '1', 'accept': 'text/plain, application/json;q=0.9, application/json',
+                 'x-version': '2'}
+
+        requests.get('http://my-service.com/v1/users', headers=valid)
+        for changed in ({'Authorization': 'Basic abc'}, {'X-Request-Id': None}, {'X-Debug': '1'}, {'Accept': 'application/json'},
+                        {'X-Version': '1'}):
+            with pytest.raises(UnexpectedRequest):
+                requests.get('http://my-service.com/v1/users', headers=dict(valid, **changed))
+
+    sm.verify()
+
+
+def test_json_subset_body_is_matched(servicemock: Any):
+    with sm.Mocker() as m:
+        (sm.expect('http://my-service.com', m)
+            .to_receive(sm.Request('POST', '/v1/users', body=sm.JSONSubsetRequestBody({'user': {'name': 'john'}}))))
+
+        with pytest.raises(UnexpectedRequest):
+            requests.post('http://my-service.com/v1/users', json={'user': {'name': 'jane'}})
+        requests.post('http://my-service.com/v1/users', json={'user': {'name': 'john', 'age': 30}, 'trace': 'abc'})
+
+    sm.verify()
+
+
+def test_json_path_body_is_matched(servicemock: Any):
+    with sm.Mocker() as m:
+        body = sm.JSONPathRequestBody({'$.user.id': re.compile(r'u-\d+'), '$.items[*].sku': 'abc', '$.total': lambda v: v > 10})
+        sm.expect('http://my-service.com', m).to_receive(sm.Request('POST', '/v1/orders', body=body))
+
+        with pytest.raises(UnexpectedRequest):
+            requests.post('http://my-service.com/v1/orders', json={'user': {'id': 'u-1'}, 'items': [{'sku': 'def'}], 'total': 20})
+        with pytest.raises(UnexpectedRequest):
+            requests.post('http://my-service.com/v1/orders', data='not json')
+        requests.post('http://my-service.com/v1/orders', json={'user': {'id': 'u-1'}, 'items': [{'sku': 'def'}, {'sku': 'abc'}], 'total': 20})
+
+    sm.verify()
+
+
+def test_structured_matchers_are_described():
+    request = sm.Request('GET', '/v1/users/{id}', query={'page': re.compile(r'\d+')}, body=sm.JSONPathRequestBody({'$.id': 1}),
+                         base_url='http://my-service.com')
+
+    assert str(request) == "GET http://my-service.com/v1/users/{id}, query: {'page': re:\\d+}, jsonpath: {'$.id': 1}"
+    assert str(sm.JSONSubsetRequestBody({'a': 1})) == "json containing: {'a': 1}"
+    assert str(sm.Request('GET', '/', headers={'x-token': 'a', 'x-debug': sm.ABSENT})) == "GET /, headers: {'x-token': 'a', 'x-debug': ABSENT}"
+
+
+def test_compiled_matchers_can_be_pickled():
+    request = sm.Request('GET', '/v1/users/{id}', query={'page': '1'}, body=sm.JSONPathRequestBody({'$.id': 1}),
+                         headers={'x-token': re.compile('t.*'), 'x-debug': sm.ABSENT})
+
+    restored = pickle.loads(pickle.dumps(request))
+
+    assert str(restored) == str(request)
+
+
+def test_bound_requests_share_compiled_matchers():
+    request = sm.Request('GET', '/v1/users', headers={'x-token': 'a'}, query={'page': '1'})
+    bound = request.bind('http://my-service.com')
+
+    assert bound._header_matcher is request._header_matcher
+    assert bound._query_matcher is request._query_matcher
+    assert bound.full_url == 'http://my-service.com/v1/users'
+
+
+def test_cookie_jar_is_built_once_per_response(servicemock: Any):
+    response = sm.HTTP200Ok(sm.Text('ok'), cookies=(sm.Cookie('session', 'deadbeef'),))
+    with sm.Mocker() as m:
+        for path in ('/v1/a', '/v1/b'):
+            sm.expect('http://my-service.com', m).to_receive(sm.Request('GET', path)).and_responds(response)
+
+        jars = [matcher._responses[0]._params.get('cookies') for matcher in m._adapter._matchers]
+        registered = [jar for jar in jars if jar is not None]
+        assert len(registered) == 2 and registered[0] is registered[1]
+        assert requests.get('http://my-service.com/v1/b').cookies.get_dict() == {'session': 'deadbeef'}
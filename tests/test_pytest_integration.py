@@ -0,0 +1,152 @@
+import json
+
+pytest_plugins = ['pytester']
+
+
+def test_servicemock_fixture_verifies_expected_requests(pytester):
+    pytester.makepyfile("""
+        def test(servicemock):
+            servicemock.expect('http://service.com').to_receive(servicemock.Request('GET', '/v1/users'))
+    """)
+
+    result = pytester.runpytest('-p', 'servicemock.pytest_plugin')
+
+    result.assert_outcomes(passed=1, errors=1)
+    result.stdout.fnmatch_lines(["*Expected request 'GET http://service.com/v1/users' was not made.*"])
+
+
+def test_servicemock_fixture_does_not_leak_mocking_between_tests(pytester):
+    pytester.makepyfile("""
+        import pytest
+        import requests
+
+        def test_first(servicemock):
+            servicemock.expect('http://service.com').to_receive(servicemock.Request('GET', '/v1/users'))
+            requests.get('http://service.com/v1/users')
+
+        class Sent(Exception):
+            pass
+
+        def send(adapter, request, **kwargs):
+            raise Sent(request.url)
+
+        def test_second(monkeypatch):
+            monkeypatch.setattr(requests.adapters.HTTPAdapter, 'send', send)
+            with pytest.raises(Sent):
+                requests.get('http://service.com/v1/users')
+    """)
+
+    result = pytester.runpytest('-p', 'servicemock.pytest_plugin')
+
+    result.assert_outcomes(passed=2)
+
+
+def test_session_expectation_sets_are_registered_for_every_test(pytester):
+    pytester.makeconftest("""
+        import pytest
+        import servicemock as sm
+
+        @pytest.fixture(scope='session')
+        def servicemock_expectations():
+            def auth():
+                sm.expect('http://auth.com').to_receive(sm.Request('POST', '/token'))
+            return [auth]
+    """)
+    pytester.makepyfile("""
+        import requests
+
+        def test_first(servicemock):
+            requests.post('http://auth.com/token')
+
+        def test_second(servicemock):
+            requests.post('http://auth.com/token')
+    """)
+
+    result = pytester.runpytest('-p', 'servicemock.pytest_plugin')
+
+    result.assert_outcomes(passed=2)
+
+
+def test_matching_stats_are_written_at_the_end_of_session(pytester):
+    pytester.makepyfile("""
+        import requests
+
+        def test(servicemock):
+            servicemock.expect('http://service.com').to_receive(servicemock.Request('GET', '/v1/users'))
+            requests.get('http://service.com/v1/users')
+    """)
+
+    result = pytester.runpytest('-p', 'servicemock.pytest_plugin', '--servicemock-stats=stats.json')
+
+    result.assert_outcomes(passed=1)
+    with open(pytester.path / 'stats.json') as f:
+        stats = json.load(f)
+    assert stats['expectations'][0]['expectation'] == 'GET http://service.com/v1/users'
+    assert stats['expectations'][0]['hits'] == 1
+
+
+def test_session_expectation_sets_can_be_compiled_once(pytester):
+    pytester.makeconftest("""
+        import pytest
+        import servicemock as sm
+
+        compiled = []
+
+        def register(expect):
+            compiled.append(1)
+            expect('http://auth.com').to_receive(sm.Request('POST', '/token')).at_least(0)
+
+        @pytest.fixture(scope='session')
+        def servicemock_expectations():
+            return [sm.ExpectationSet('auth', register)]
+    """)
+    pytester.makepyfile("""
+        import requests
+        from conftest import compiled
+
+        def test_first(servicemock):
+            requests.post('http://auth.com/token')
+
+        def test_second(servicemock):
+            requests.post('http://auth.com/token')
+            assert len(compiled) == 1
+    """)
+
+    result = pytester.runpytest('-p', 'servicemock.pytest_plugin')
+
+    result.assert_outcomes(passed=2)
+
+
+def test_contract_coverage_is_written_and_merged_with_worker_parts(pytester):
+    pytester.makepyfile("""
+        import json
+        import requests
+
+        def test_first(servicemock):
+            servicemock.expect('http://service.com').to_receive(servicemock.Request('GET', '/v1/users'))
+            servicemock.expect('http://service.com').to_receive(servicemock.Request('POST', '/v1/users')).at_least(0)
+            requests.get('http://service.com/v1/users')
+
+        def test_second(servicemock):
+            servicemock.expect('http://service.com').to_receive(servicemock.Request('GET', '/v1/users'))
+            requests.get('http://service.com/v1/users')
+
+            # Written like a pytest-xdist worker would at the end of its session
+            worker = {'services': {'http://service.com': {'endpoints': {'GET /v1/users': {'registrations': 3, 'hits': 5, 'unused': 0}}}}}
+            with open('coverage.json.gw0.part', 'w') as f:
+                json.dump(worker, f)
+    """)
+    pytester.path.joinpath('coverage.json.gw9.part').write_text('stale part of an earlier run')
+
+    result = pytester.runpytest('-p', 'servicemock.pytest_plugin', '--servicemock-coverage=coverage.json')
+
+    result.assert_outcomes(passed=2)
+    with open(pytester.path / 'coverage.json') as f:
+        endpoints = json.load(f)['services']['http://service.com']['endpoints']
+    assert endpoints == {
+        'GET /v1/users': {'registrations': 5, 'hits': 7, 'unused': 0},
+        'POST /v1/users': {'registrations': 1, 'hits': 0, 'unused': 1},
+    }
+    assert not list(pytester.path.glob('*.part'))
+    result.stdout.fnmatch_lines(['*servicemock contract coverage*', '2 endpoints of 1 services mocked, 1 never requested',
+                                 '*POST /v1/users*NEVER REQUESTED'])
@@ -1,4 +1,10 @@
+import copy
+import pickle
+
+import pytest  # type: ignore
+
 from servicemock import Request, JSONRequestBody
+from servicemock.servicemock import ReceivedBody, canonical_hash, accepts_gzip
 
 
 def test_converting_to_string_when_only_method_and_url():
@@ -13,3 +19,77 @@ def test_converting_to_string_with_headers():
 def test_converting_to_string_with_json_body():
     r = Request('GET', '/v1/users', body=JSONRequestBody({'name': 'john'}))
     assert str(r) == "GET /v1/users, json: {'name': 'john'}"
+
+
+class FakeRequest:
+
+    def __init__(self, body):
+        self._body = body
+        self.body_reads = 0
+
+    @property
+    def body(self):
+        self.body_reads += 1
+        return self._body
+
+
+def test_received_body_is_decoded_once_and_shared():
+    request = FakeRequest(b'{"name": "john"}')
+
+    assert ReceivedBody.of(request).json == {'name': 'john'}
+    assert ReceivedBody.of(request).json == {'name': 'john'}
+    assert request.body_reads == 1
+
+
+def test_received_body_json_is_none_when_body_is_not_json():
+    assert ReceivedBody.of(FakeRequest('first_name=smithy')).json is None
+    assert ReceivedBody.of(FakeRequest(None)).json is None
+
+
+def test_received_body_form():
+    assert ReceivedBody.of(FakeRequest('a=1&a=2&b=')).form == {'a': ['1', '2'], 'b': ['']}
+
+
+def test_canonical_hash_is_equal_for_equal_values():
+    assert canonical_hash({'a': [1, {'b': 2}], 'c': None}) == canonical_hash({'c': None, 'a': [1.0, {'b': 2}]})
+
+
+def test_json_request_body_matches_with_different_key_order():
+    body = JSONRequestBody({'name': 'john', 'age': 5})
+    assert body.match(FakeRequest('{"age": 5, "name": "john"}'))
+    assert not body.match(FakeRequest('{"age": 6, "name": "john"}'))
+
+
+def test_request_is_immutable():
+    r = Request('GET', '/v1/users')
+    with pytest.raises(AttributeError):
+        r.url = '/v1/accounts'  # type: ignore
+
+
+def test_bound_request_shares_body_and_headers():
+    body = JSONRequestBody({'name': 'john'})
+    headers = {'x-token': 'some'}
+    r = Request('POST', '/v1/users', body=body, headers=headers)
+
+    bound = r.bind('http://my-service.com')
+
+    assert bound.body is body
+    assert bound.headers is headers
+    assert bound.full_url == 'http://my-service.com/v1/users'
+    assert str(bound) == "POST http://my-service.com/v1/users, headers: {'x-token': 'some'}, json: {'name': 'john'}"
+
+
+def test_request_can_be_copied_and_pickled():
+    r = Request('POST', '/v1/users', body=JSONRequestBody({'name': 'john'}), base_url='http://my-service.com')
+
+    assert copy.deepcopy(r) is r
+    restored = pickle.loads(pickle.dumps(r))
+    assert str(restored) == str(r)
+    assert restored.body.match(FakeRequest('{"name": "john"}'))
+
+
+def test_accepts_gzip():
+    assert accepts_gzip('gzip, deflate')
+    assert accepts_gzip('br;q=1.0, *;q=0.5')
+    assert not accepts_gzip('gzip;q=0, deflate')
+    assert not accepts_gzip('identity')
@@ -0,0 +1,117 @@
+from typing import Any
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+import pytest  # type: ignore
+
+import servicemock as sm
+from servicemock.adapter import UnexpectedRequest
+
+
+def test_sequenced_responses_are_used_in_turn_and_last_one_repeats(servicemock: Any):
+    with sm.Mocker() as m:
+        (sm.expect('http://my-service.com', m)
+            .to_receive(sm.Request('GET', '/v1/jobs/1'))
+            .and_responds(sm.HTTP200Ok(sm.JSON({'status': 'queued'})))
+            .then(sm.HTTP200Ok(sm.JSON({'status': 'running'})), times=2)
+            .then(sm.Response('303 See Other', headers={'Location': '/v1/results/1'})))
+
+        statuses = [requests.get('http://my-service.com/v1/jobs/1', allow_redirects=False) for _ in range(5)]
+
+    assert [r.json()['status'] for r in statuses[:3]] == ['queued', 'running', 'running']
+    assert [r.status_code for r in statuses[3:]] == [303, 303]
+    assert statuses[3].headers['Location'] == '/v1/results/1'
+    assert 'Location' not in statuses[0].headers
+
+
+def test_long_sequences_are_cheap_to_register(servicemock: Any):
+    with sm.Mocker() as m:
+        (sm.expect('http://my-service.com', m)
+            .to_receive(sm.Request('GET', '/v1/jobs/1'))
+            .and_responds(sm.HTTP200Ok(sm.Text('running')))
+            .then(sm.HTTP200Ok(sm.Text('running')), times=998)
+            .then(sm.HTTP200Ok(sm.Text('done'))))
+
+        session = requests.Session()
+        bodies = [session.get('http://my-service.com/v1/jobs/1').text for _ in range(1_000)]
+
+    assert bodies.count('running') == 999
+    assert bodies[-1] == 'done'
+
+
+def test_then_appends_steps_to_the_registered_matcher(servicemock: Any):
+    with sm.Mocker() as m:
+        dsl = sm.expect('http://my-service.com', m).to_receive(sm.Request('GET', '/v1/jobs/1')).and_responds(sm.HTTP200Ok(sm.Text('0')))
+        matcher_count = len(m._adapter._matchers)
+        for i in range(1, 500):
+            dsl.then(sm.HTTP200Ok(sm.Text(str(i))))
+
+        assert len(m._adapter._matchers) == matcher_count
+        session = requests.Session()
+        bodies = [session.get('http://my-service.com/v1/jobs/1').text for _ in range(501)]
+
+    assert bodies == [str(i) for i in range(500)] + ['499']
+
+
+def test_sequence_is_exact_when_requests_are_made_from_many_threads(servicemock: Any):
+    with sm.Mocker() as m:
+        (sm.expect('http://my-service.com', m)
+            .to_receive(sm.Request('GET', '/v1/tokens'))
+            .and_responds(sm.HTTP200Ok(sm.Text('first')))
+            .then(sm.HTTP200Ok(sm.Text('middle')), times=98)
+            .then(sm.HTTP200Ok(sm.Text('last'))))
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            bodies = list(executor.map(lambda _: requests.get('http://my-service.com/v1/tokens').text, range(200)))
+
+    assert bodies.count('first') == 1
+    assert bodies.count('middle') == 98
+    assert bodies.count('last') == 101
+
+
+def test_requests_are_matched_in_scenario_states(servicemock: Any):
+    with sm.Mocker() as m:
+        dsl = sm.expect('http://my-service.com', m)
+        (dsl.to_receive(sm.Request('GET', '/v1/users/1'))
+            .and_responds(sm.Response('404 Not Found'))
+            .in_state('user', sm.STARTED))
+        (dsl.to_receive(sm.Request('PUT', '/v1/users/1'))
+            .and_responds(sm.Response('201 Created'))
+            .in_state('user', sm.STARTED)
+            .will_set_state('user', 'created'))
+        (dsl.to_receive(sm.Request('GET', '/v1/users/1'))
+            .and_responds(sm.HTTP200Ok(sm.JSON({'id': 1})))
+            .in_state('user', 'created'))
+
+        assert requests.get('http://my-service.com/v1/users/1').status_code == 404
+        assert requests.put('http://my-service.com/v1/users/1').status_code == 201
+        assert sm.scenario_state('user') == 'created'
+        assert requests.get('http://my-service.com/v1/users/1').json() == {'id': 1}
+
+        with pytest.raises(UnexpectedRequest):
+            requests.put('http://my-service.com/v1/users/1')
+
+    sm.verify()
+
+
+def test_expectation_in_state_not_reached_is_not_satisfied(servicemock: Any):
+    with sm.Mocker() as m:
+        (sm.expect('http://my-service.com', m)
+            .to_receive(sm.Request('GET', '/v1/users/1'))
+            .in_state('user', 'created'))
+
+        with pytest.raises(UnexpectedRequest):
+            requests.get('http://my-service.com/v1/users/1')
+
+    with pytest.raises(AssertionError):
+        sm.verify()
+
+
+def test_scenario_states_are_reset_by_start(servicemock: Any):
+    with sm.Mocker() as m:
+        sm.expect('http://my-service.com', m).to_receive(sm.Request('POST', '/v1/users')).will_set_state('user', 'created')
+        requests.post('http://my-service.com/v1/users')
+
+    assert sm.scenario_state('user') == 'created'
+    sm.start()
+    assert sm.scenario_state('user') == sm.STARTED
@@ -0,0 +1,164 @@
+from typing import Any
+from concurrent.futures import ThreadPoolExecutor
+import http.client
+import json
+import socket
+import time
+import urllib.request
+
+import requests
+import pytest  # type: ignore
+
+import servicemock as sm
+from servicemock import server as sm_server
+
+
+def test_expectations_are_served_to_clients_not_using_requests(servicemock: Any):
+    (sm.expect('http://my-service.com')
+        .to_receive(sm.Request('GET', '/v1/users'))
+        .and_responds(sm.HTTP200Ok(sm.JSON({'status': 'ok'}))))
+    server = sm.serve('http://my-service.com')
+
+    with urllib.request.urlopen(f'{server.url}/v1/users') as res:
+        assert res.status == 200
+        assert json.loads(res.read()) == {'status': 'ok'}
+
+    sm.verify()
+
+
+def test_requests_made_with_requests_pass_through_to_the_server(servicemock: Any):
+    (sm.expect('http://my-service.com')
+        .to_receive(sm.Request('POST', '/v1/users', body=sm.JSONRequestBody({'name': 'john'})))
+        .and_responds(sm.HTTP200Ok(sm.JSON({'id': 1}), cookies=(sm.Cookie('session', 'deadbeef', path='/'),))))
+    server = sm.serve('http://my-service.com')
+
+    res = requests.post(f'{server.url}/v1/users', json={'name': 'john'})
+
+    assert res.json() == {'id': 1}
+    assert res.cookies.get_dict() == {'session': 'deadbeef'}
+    sm.verify()
+
+
+def test_connection_is_kept_alive_between_requests(servicemock: Any):
+    sm.expect('http://my-service.com').to_receive(sm.Request('GET', '/v1/status-check'))
+    server = sm.serve('http://my-service.com')
+
+    connection = http.client.HTTPConnection(server.url[len('http://'):])
+    for _ in range(3):
+        connection.request('GET', '/v1/status-check')
+        res = connection.getresponse()
+        res.read()
+        assert res.status == 200
+    connection.close()
+
+
+def test_head_request_is_responded_without_body(servicemock: Any):
+    sm.expect('http://my-service.com').to_receive(sm.Request('HEAD', '/v1/users')).and_responds(sm.HTTP200Ok(sm.JSON({'users': []})))
+    sm.expect('http://my-service.com').to_receive(sm.Request('GET', '/v1/users')).and_responds(sm.HTTP200Ok(sm.JSON({'users': []})))
+    server = sm.serve('http://my-service.com')
+
+    connection = http.client.HTTPConnection(server.url[len('http://'):])
+    connection.request('HEAD', '/v1/users')
+    res = connection.getresponse()
+    assert res.read() == b''
+    assert res.headers['Content-Length'] == str(len(b'{"users": []}'))
+
+    # A body sent after the headers would be read as the next response
+    connection.request('GET', '/v1/users')
+    assert json.loads(connection.getresponse().read()) == {'users': []}
+    connection.close()
+
+
+@pytest.mark.parametrize('content_length', ['-1', 'ten', '1, 1', ''])
+def test_invalid_content_length_is_responded_with_bad_request(servicemock: Any, content_length: str):
+    sm.expect('http://my-service.com').to_receive(sm.Request('POST', '/v1/users'))
+    server = sm.serve('http://my-service.com')
+
+    with socket.create_connection((server.host, server.port), timeout=5) as connection:
+        connection.sendall(f'POST /v1/users HTTP/1.1\r\nHost: my-service.com\r\nContent-Length: {content_length}\r\n\r\n'.encode())
+        response = connection.makefile('rb').read()
+
+    assert response.startswith(b'HTTP/1.1 400 Bad Request\r\n')
+
+
+def test_static_responses_are_rendered_once(servicemock: Any, monkeypatch: Any):
+    (sm.expect('http://my-service.com')
+        .to_receive(sm.Request('GET', '/v1/status'))
+        .and_responds(sm.HTTP200Ok(sm.JSON({'status': 'ok'}), headers={'X-Version': '1'}))
+        .times(3))
+    server = sm.serve('http://my-service.com')
+    rendered = []
+    encoded_content = sm_server.encoded_content
+
+    def encode(response: requests.Response) -> bytes:
+        rendered.append(response)
+        return encoded_content(response)
+    monkeypatch.setattr(sm_server, 'encoded_content', encode)
+
+    responses = [requests.get(f'{server.url}/v1/status') for _ in range(3)]
+
+    assert [(r.json(), r.headers['X-Version']) for r in responses] == [({'status': 'ok'}, '1')] * 3
+    assert len(rendered) == 1
+    sm.verify()
+
+
+def test_sequences_and_generated_bodies_are_rendered_per_request(servicemock: Any):
+    (sm.expect('http://my-service.com')
+        .to_receive(sm.Request('GET', '/v1/jobs/{id}'))
+        .and_responds(sm.HTTP200Ok(sm.Generated(lambda r: {'id': r.path_params['id']})))
+        .then(sm.HTTP200Ok(sm.Text('done'))))
+    server = sm.serve('http://my-service.com')
+
+    assert requests.get(f'{server.url}/v1/jobs/1').json() == {'id': '1'}
+    assert requests.get(f'{server.url}/v1/jobs/2').text == 'done'
+    assert requests.get(f'{server.url}/v1/jobs/3').text == 'done'
+
+
+def test_unexpected_request_is_responded_with_server_error(servicemock: Any):
+    sm.expect('http://my-service.com').to_receive(sm.Request('GET', '/v1/status-check'))
+    server = sm.serve('http://my-service.com')
+
+    res = requests.get(f'{server.url}/v1/users')
+
+    assert res.status_code == 500
+    assert "Received unexpected request 'GET http://my-service.com/v1/users" in res.text
+
+
+def test_server_is_stopped_when_servicemock_is_started(servicemock: Any):
+    server = sm.serve('http://my-service.com')
+    sm.start()
+
+    with pytest.raises(OSError):
+        urllib.request.urlopen(f'{server.url}/v1/users')
+
+
+def test_gzipped_body_is_served_compressed(servicemock: Any):
+    (sm.expect('http://my-service.com')
+        .to_receive(sm.Request('GET', '/v1/catalog'))
+        .and_responds(sm.HTTP200Ok(sm.JSON({'items': [1, 2]}, gzip=True))))
+    server = sm.serve('http://my-service.com')
+
+    res = requests.get(f'{server.url}/v1/catalog')
+
+    assert res.headers['Content-Encoding'] == 'gzip'
+    assert res.json() == {'items': [1, 2]}
+
+
+def test_injected_delays_do_not_block_other_connections(servicemock: Any):
+    sm.expect('http://my-service.com', faults=sm.Faults(delay=0.2)).to_receive(sm.Request('GET', '/v1/users'))
+    server = sm.serve('http://my-service.com')
+
+    started = time.monotonic()
+    with ThreadPoolExecutor(5) as executor:
+        responses = list(executor.map(lambda _: requests.get(f'{server.url}/v1/users'), range(5)))
+
+    assert {r.status_code for r in responses} == {200}
+    assert time.monotonic() - started < 0.6
+
+
+def test_injected_connection_reset_closes_the_connection(servicemock: Any):
+    sm.expect('http://my-service.com', faults=sm.Faults(reset_rate=1)).to_receive(sm.Request('GET', '/v1/users'))
+    server = sm.serve('http://my-service.com')
+
+    with pytest.raises(OSError):
+        urllib.request.urlopen(f'{server.url}/v1/users')
@@ -7,12 +7,6 @@ import pytest  # type: ignore
 import servicemock as sm
 
 
-@pytest.fixture(scope="function")
-def servicemock():
-    sm.start()
-    return sm
-
-
 def test_service_mock_can_be_used_without_requests_mock_explicitly_initialized():
     sm.start()
 
@@ -189,3 +183,121 @@ def test_cookies_can_be_set_from_body_and_actual_response(servicemock: Any):
 
         res = requests.get('http://my-service.com/v1/status-check')
         assert {'value': '5', 'session': 'deadbeef'} == res.cookies.get_dict()
+
+
+def test_expectations_differing_only_by_body_are_matched_by_body(servicemock: Any):
+    with sm.Mocker() as m:
+        for name in ('john', 'mike', 'smithy'):
+            (sm.expect('http://my-service.com', m)
+                .to_receive(sm.Request('POST', '/v1/users', body=sm.JSONRequestBody({'name': name})))
+                .and_responds(sm.HTTP200Ok(sm.JSON({'greeting': f'hello {name}'}))))
+
+        res = requests.post('http://my-service.com/v1/users', json={'name': 'mike'})
+        assert res.json() == {'greeting': 'hello mike'}
+
+
+def test_body_changed_after_registering_does_not_change_expectation(servicemock: Any):
+    body = {'id': 0}
+    with sm.Mocker() as m:
+        dsl = sm.expect('http://my-service.com', m)
+        for i in range(3):
+            body['id'] = i
+            dsl.to_receive(sm.Request('POST', '/v1/users', body=sm.JSONRequestBody(body)))
+
+        for i in range(3):
+            requests.post('http://my-service.com/v1/users', json={'id': i})
+
+    sm.verify()
+
+
+def test_text_and_bytes_responses(servicemock: Any):
+    with sm.Mocker() as m:
+        sm.expect('http://my-service.com', m).to_receive(sm.Request('GET', '/v1/readme')).and_responds(sm.HTTP200Ok(sm.Text('hello')))
+        sm.expect('http://my-service.com', m).to_receive(sm.Request('GET', '/v1/logo')).and_responds(sm.HTTP200Ok(sm.Bytes(b'\x89PNG')))
+
+        assert requests.get('http://my-service.com/v1/readme').text == 'hello'
+        assert requests.get('http://my-service.com/v1/logo').content == b'\x89PNG'
+
+
+def test_gzipped_response_is_served_compressed_when_accepted(servicemock: Any):
+    with sm.Mocker() as m:
+        (sm.expect('http://my-service.com', m)
+            .to_receive(sm.Request('GET', '/v1/catalog'))
+            .and_responds(sm.HTTP200Ok(sm.JSON({'items': list(range(100))}, gzip=True))))
+
+        res = requests.get('http://my-service.com/v1/catalog')
+        assert res.headers['Content-Encoding'] == 'gzip'
+        assert res.json() == {'items': list(range(100))}
+
+        res = requests.get('http://my-service.com/v1/catalog', headers={'Accept-Encoding': 'identity'})
+        assert 'Content-Encoding' not in res.headers
+        assert res.json() == {'items': list(range(100))}
+
+
+def test_request_expected_to_be_made_n_times(servicemock: Any):
+    with sm.Mocker() as m:
+        sm.expect('http://my-service.com', m).to_receive(sm.Request('GET', '/v1/users')).times(2)
+
+        requests.get('http://my-service.com/v1/users')
+        with pytest.raises(AssertionError) as e:
+            sm.verify()
+        assert "Expected request 'GET http://my-service.com/v1/users (expected 2 times, made 1 times)' was not made." == str(e.value)
+
+        requests.get('http://my-service.com/v1/users')
+        sm.verify()
+
+        requests.get('http://my-service.com/v1/users')
+        with pytest.raises(AssertionError) as e:
+            sm.verify()
+        assert "Expected request 'GET http://my-service.com/v1/users (expected 2 times, made 3 times)' was made too many times." == str(e.value)
+
+
+def test_request_expected_to_be_made_at_least_and_at_most_n_times(servicemock: Any):
+    with sm.Mocker() as m:
+        (sm.expect('http://my-service.com', m)
+            .to_receive(sm.Request('GET', '/v1/users'))
+            .and_responds(sm.HTTP200Ok(sm.JSON({'users': []})))
+            .at_least(2)
+            .at_most(3))
+        sm.expect('http://my-service.com', m).to_receive(sm.Request('GET', '/v1/status-check')).at_least(0).at_most(1)
+
+        for _ in range(2):
+            assert requests.get('http://my-service.com/v1/users').json() == {'users': []}
+        sm.verify()
+
+        for _ in range(2):
+            requests.get('http://my-service.com/v1/users')
+        with pytest.raises(AssertionError) as e:
+            sm.verify()
+        assert "(expected 2 to 3 times, made 4 times)" in str(e.value)
+
+
+def test_requests_expected_in_order(servicemock: Any):
+    with sm.Mocker() as m:
+        dsl = sm.expect('http://my-service.com', m).in_order()
+        dsl.to_receive(sm.Request('POST', '/v1/users'))
+        dsl.to_receive(sm.Request('GET', '/v1/users/1'))
+
+        requests.get('http://my-service.com/v1/users/1')
+        requests.post('http://my-service.com/v1/users')
+
+        with pytest.raises(AssertionError) as e:
+            sm.verify()
+        assert str(e.value) == (
+            "Expected request 'GET http://my-service.com/v1/users/1' was made before 'POST http://my-service.com/v1/users', "
+            "which was expected first."
+        )
+
+
+def test_requests_made_in_order_pass_verification(servicemock: Any):
+    with sm.Mocker() as m:
+        sm.expect('http://my-service.com', m).to_receive(sm.Request('POST', '/v1/users')).in_order()
+        sm.expect('http://my-service.com', m).to_receive(sm.Request('GET', '/v1/status-check'))
+        sm.expect('http://my-service.com', m).to_receive(sm.Request('GET', '/v1/users/1')).in_order()
+
+        requests.get('http://my-service.com/v1/status-check')
+        requests.post('http://my-service.com/v1/users')
+        requests.get('http://my-service.com/v1/users/1')
+        requests.post('http://my-service.com/v1/users')
+
+        sm.verify()
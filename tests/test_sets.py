@@ -0,0 +1,79 @@
+from typing import Any, List
+
+import requests
+import pytest  # type: ignore
+
+import servicemock as sm
+from servicemock.adapter import UnexpectedRequest
+
+registrations: List[str] = []
+
+
+def register_auth(expect: Any):
+    registrations.append('auth')
+    (expect('http://auth.com')
+        .to_receive(sm.Request('POST', '/token'))
+        .and_responds(sm.HTTP200Ok(sm.JSON({'token': 'abc'})))
+        .at_least(0))
+    expect('http://auth.com').to_receive(sm.Request('GET', '/health'))
+
+
+auth = sm.ExpectationSet('auth', register_auth)
+
+
+def test_expectation_set_is_registered_once_and_counted_per_test(servicemock: Any):
+    for _ in range(3):
+        sm.start()
+        sm.attach(auth)
+
+        assert requests.post('http://auth.com/token').json() == {'token': 'abc'}
+        with pytest.raises(AssertionError) as e:
+            sm.verify()
+        assert "Expected request 'GET http://auth.com/health' was not made." in str(e.value)
+
+        requests.get('http://auth.com/health')
+        sm.verify()
+
+    assert registrations.count('auth') <= 1
+
+
+def test_test_expectations_win_over_attached_set(servicemock: Any):
+    sm.attach(auth)
+    sm.expect('http://auth.com').to_receive(sm.Request('POST', '/token')).and_responds(sm.HTTP200Ok(sm.JSON({'token': 'own'})))
+
+    assert requests.post('http://auth.com/token').json() == {'token': 'own'}
+    requests.get('http://auth.com/health')
+    sm.verify()
+
+
+def test_attaching_set_again_does_nothing(servicemock: Any):
+    sm.attach(auth)
+    sm.attach(auth)
+
+    requests.get('http://auth.com/health')
+    sm.verify()
+
+
+def test_expectation_set_is_attached_to_explicit_mocker(servicemock: Any):
+    with sm.Mocker() as m:
+        sm.attach(auth, m)
+        requests.get('http://auth.com/health')
+
+    sm.verify()
+
+
+def test_set_is_not_matched_after_start(servicemock: Any):
+    sm.attach(auth)
+    sm.start()
+    sm.expect('http://my-service.com').to_receive(sm.Request('GET', '/v1/users')).at_least(0)
+
+    with pytest.raises(UnexpectedRequest):
+        requests.get('http://auth.com/health')
+
+
+def test_shared_matchers_do_not_collect_request_history(servicemock: Any):
+    sm.attach(auth)
+    for _ in range(3):
+        requests.get('http://auth.com/health')
+
+    assert all(not matcher.request_history for matcher in auth.compile()._adapter._matchers)
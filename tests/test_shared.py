@@ -0,0 +1,68 @@
+from typing import Any
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import os
+
+import requests
+import pytest  # type: ignore
+
+import servicemock as sm
+
+
+def _get(url: str) -> Any:
+    return requests.get(url).json()
+
+
+def _get_status(url: str) -> int:
+    return requests.get(url).status_code
+
+
+def _pool() -> ProcessPoolExecutor:
+    return ProcessPoolExecutor(2, mp_context=multiprocessing.get_context('fork'))
+
+
+def test_requests_of_forked_workers_count_in_verify(servicemock: Any):
+    sm.expect('http://my-service.com').to_receive(sm.Request('GET', '/v1/users/1')).and_responds(
+        sm.HTTP200Ok(sm.JSON({'id': 1}))).times(4)
+    sm.share()
+
+    with _pool() as pool:
+        assert list(pool.map(_get, ['http://my-service.com/v1/users/1'] * 4)) == [{'id': 1}] * 4
+
+    sm.verify()
+
+
+def test_hits_of_workers_exceeding_limits_fail_verify(servicemock: Any):
+    sm.expect('http://my-service.com').to_receive(sm.Request('GET', '/v1/users/1')).at_most(1)
+    sm.share()
+
+    with _pool() as pool:
+        list(pool.map(_get_status, ['http://my-service.com/v1/users/1'] * 3))
+
+    with pytest.raises(AssertionError, match='too many times'):
+        sm.verify()
+
+
+def test_sequences_and_scenarios_advance_across_processes(servicemock: Any):
+    (sm.expect('http://my-service.com')
+        .to_receive(sm.Request('GET', '/v1/jobs/1'))
+        .and_responds(sm.HTTP200Ok(sm.JSON({'status': 'running'})))
+        .then(sm.HTTP200Ok(sm.JSON({'status': 'done'}))))
+    sm.expect('http://my-service.com').to_receive(sm.Request('PUT', '/v1/users/1')).will_set_state('user', 'created')
+    sm.share()
+
+    with _pool() as pool:
+        statuses = [pool.submit(_get, 'http://my-service.com/v1/jobs/1').result()['status'] for _ in range(3)]
+        pool.submit(requests.put, 'http://my-service.com/v1/users/1').result()
+
+    assert statuses == ['running', 'done', 'done']
+    assert sm.scenario_state('user') == 'created'
+
+
+def test_sharing_ends_with_the_test(servicemock: Any):
+    coordinator = sm.share()
+    assert sm.share() is coordinator
+    assert os.path.exists(coordinator.address)
+
+    sm.start()
+    assert not os.path.exists(coordinator.address)
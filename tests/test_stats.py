@@ -0,0 +1,128 @@
+from typing import Any, Iterator
+import json
+
+import requests
+import pytest  # type: ignore
+
+import servicemock as sm
+from servicemock.adapter import UnexpectedRequest
+from servicemock.profiling import profiler
+
+
+@pytest.fixture(scope="function")
+def servicemock(servicemock: Any) -> Iterator[Any]:
+    profiler.reset()
+    sm.enable_stats()
+    yield servicemock
+    sm.enable_stats(False)
+    profiler.reset()
+
+
+def expectation(stats: Any, description: str) -> Any:
+    return next(e for e in stats['expectations'] if e['expectation'] == description)
+
+
+def test_stats_count_match_attempts_and_hits_per_expectation(servicemock: Any):
+    with sm.Mocker() as m:
+        sm.expect('http://my-service.com', m).to_receive(sm.Request('POST', '/v1/users', body=sm.JSONRequestBody({'a': 1})))
+        sm.expect('http://my-service.com', m).to_receive(sm.Request('POST', '/v1/users', body=sm.JSONRequestBody({'a': 2})))
+
+        requests.post('http://my-service.com/v1/users', json={'a': 1})
+        requests.post('http://my-service.com/v1/users', json={'a': 1})
+
+    stats = sm.stats()
+    first = expectation(stats, "POST http://my-service.com/v1/users, json: {'a': 1}")
+    second = expectation(stats, "POST http://my-service.com/v1/users, json: {'a': 2}")
+    assert (first['attempts'], first['hits']) == (2, 2)
+    assert (second['attempts'], second['hits']) == (2, 0)
+    assert first['match_ns'] >= first['body_ns'] > 0
+    assert stats['requests']['count'] == 2
+    assert stats['requests']['unmatched'] == 0
+
+
+def test_stats_list_expectations_never_hit(servicemock: Any):
+    with sm.Mocker() as m:
+        sm.expect('http://my-service.com', m).to_receive(sm.Request('GET', '/v1/users'))
+
+    stats = sm.stats()
+    never_hit = expectation(stats, 'GET http://my-service.com/v1/users')
+    assert never_hit['registrations'] == 1
+    assert never_hit['attempts'] == 0
+    assert stats['registrations']['count'] == 1
+
+
+def test_responses_are_registered_once_per_expectation(servicemock: Any):
+    with sm.Mocker() as m:
+        for path in ('/v1/users', '/v1/items'):
+            (sm.expect('http://my-service.com', m)
+                .to_receive(sm.Request('GET', path))
+                .and_responds(sm.HTTP200Ok(sm.Text('first')))
+                .then(sm.HTTP200Ok(sm.Text('second'))))
+
+        for _ in range(3):
+            requests.get('http://my-service.com/v1/users')
+
+        assert len(m._adapter._matchers) == 2
+        assert len(m._adapter._index) == 2
+
+    stats = sm.stats()
+    users = expectation(stats, 'GET http://my-service.com/v1/users')
+    assert (users['registrations'], users['attempts'], users['hits']) == (1, 3, 3)
+    assert stats['registrations']['count'] == 2
+
+
+def test_stats_count_unmatched_requests(servicemock: Any):
+    with sm.Mocker() as m:
+        sm.expect('http://my-service.com', m).to_receive(sm.Request('GET', '/v1/users'))
+
+        with pytest.raises(UnexpectedRequest):
+            requests.get('http://my-service.com/v1/items')
+
+    assert sm.stats()['requests']['unmatched'] == 1
+
+
+def test_stats_are_aggregated_across_tests(servicemock: Any):
+    for _ in range(2):
+        sm.start()
+        with sm.Mocker() as m:
+            sm.expect('http://my-service.com', m).to_receive(sm.Request('GET', '/v1/users'))
+            requests.get('http://my-service.com/v1/users')
+
+    stats = sm.stats()
+    assert len(stats['expectations']) == 1
+    assert stats['expectations'][0]['hits'] == 2
+
+
+def test_stats_are_not_collected_unless_enabled():
+    profiler.reset()
+    sm.start()
+    with sm.Mocker() as m:
+        sm.expect('http://my-service.com', m).to_receive(sm.Request('GET', '/v1/users'))
+        requests.get('http://my-service.com/v1/users')
+
+    assert sm.stats() == {
+        'requests': {'count': 0, 'unmatched': 0, 'total_ns': 0},
+        'registrations': {'count': 0, 'total_ns': 0},
+        'expectations': [],
+    }
+
+
+def test_stats_are_dumped_as_json_and_folded_stacks(servicemock: Any, tmp_path: Any):
+    with sm.Mocker() as m:
+        sm.expect('http://my-service.com', m).to_receive(sm.Request('GET', '/v1/users'))
+        requests.get('http://my-service.com/v1/users')
+
+    sm.dump_stats(str(tmp_path / 'stats.json'))
+    sm.dump_stats(str(tmp_path / 'stats.folded'), 'folded')
+
+    with open(tmp_path / 'stats.json') as f:
+        assert json.load(f)['expectations'][0]['hits'] == 1
+    with open(tmp_path / 'stats.folded') as f:
+        lines = f.read().splitlines()
+    assert 'servicemock;send;match;GET_http://my-service.com/v1/users;body' in [line.rsplit(' ', 1)[0] for line in lines]
+    assert all(line.rsplit(' ', 1)[1].isdigit() for line in lines)
+
+
+def test_unknown_stats_format_raises(servicemock: Any, tmp_path: Any):
+    with pytest.raises(ValueError):
+        sm.dump_stats(str(tmp_path / 'stats.txt'), 'txt')
@@ -0,0 +1,102 @@
+from typing import Any, Iterator, List
+import tracemalloc
+
+import requests
+import pytest  # type: ignore
+
+import servicemock as sm
+from servicemock.streams import parse_range
+
+
+@pytest.fixture
+def big_file(tmp_path):
+    path = tmp_path / 'big.bin'
+    with open(path, 'wb') as f:
+        for i in range(64):
+            f.write(bytes([i]) * 64 * 1024)
+    return str(path)
+
+
+def test_generated_body_is_streamed(servicemock: Any):
+    def chunks() -> Iterator[bytes]:
+        for i in range(5):
+            yield f'line {i}\n'.encode()
+
+    sm.expect('http://my-service.com').to_receive(sm.Request('GET', '/v1/events')).and_responds(sm.HTTP200Ok(sm.Stream(chunks)))
+
+    for _ in range(2):
+        res = requests.get('http://my-service.com/v1/events', stream=True)
+        assert res.headers['Transfer-Encoding'] == 'chunked'
+        assert list(res.iter_lines()) == [f'line {i}'.encode() for i in range(5)]
+
+
+def test_file_is_streamed_in_constant_memory(servicemock: Any, big_file: str):
+    sm.expect('http://my-service.com').to_receive(sm.Request('GET', '/v1/big')).and_responds(sm.HTTP200Ok(sm.File(big_file)))
+
+    tracemalloc.start()
+    res = requests.get('http://my-service.com/v1/big', stream=True)
+    size = sum(len(chunk) for chunk in res.iter_content(chunk_size=64 * 1024))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    assert size == 64 * 64 * 1024
+    assert res.headers['Content-Length'] == str(size)
+    assert peak < 1024 * 1024
+
+
+def test_file_range_is_responded_with_partial_content(servicemock: Any, big_file: str):
+    sm.expect('http://my-service.com').to_receive(sm.Request('GET', '/v1/big')).and_responds(sm.HTTP200Ok(sm.File(big_file)))
+
+    res = requests.get('http://my-service.com/v1/big', headers={'Range': 'bytes=65535-65537'})
+
+    assert res.status_code == 206
+    assert res.headers['Content-Range'] == f'bytes 65535-65537/{64 * 64 * 1024}'
+    assert res.content == b'\x00\x01\x01'
+
+
+def test_unsatisfiable_range(servicemock: Any, big_file: str):
+    sm.expect('http://my-service.com').to_receive(sm.Request('GET', '/v1/big')).and_responds(sm.HTTP200Ok(sm.File(big_file)))
+
+    res = requests.get('http://my-service.com/v1/big', headers={'Range': f'bytes={64 * 64 * 1024}-'})
+
+    assert res.status_code == 416
+    assert res.content == b''
+
+
+@pytest.mark.parametrize('value', ['bytes=a-b', 'bytes=0-9,20-29', 'bytes=20-10'])
+def test_invalid_range_is_responded_with_whole_file(servicemock: Any, big_file: str, value: str):
+    sm.expect('http://my-service.com').to_receive(sm.Request('GET', '/v1/big')).and_responds(sm.HTTP200Ok(sm.File(big_file)))
+
+    res = requests.get('http://my-service.com/v1/big', headers={'Range': value})
+
+    assert res.status_code == 200
+    assert 'Content-Range' not in res.headers
+    assert len(res.content) == 64 * 64 * 1024
+
+
+def test_streamed_body_can_be_throttled(servicemock: Any, big_file: str):
+    sleeps: List[float] = []
+    faults = sm.Faults(bandwidth=1024 * 1024, chunk_size=1024 * 1024, sleep=sleeps.append)
+    sm.expect('http://my-service.com').to_receive(sm.Request('GET', '/v1/big')).and_responds(sm.HTTP200Ok(sm.File(big_file), faults=faults))
+
+    assert len(requests.get('http://my-service.com/v1/big').content) == 64 * 64 * 1024
+    assert sum(sleeps) == pytest.approx(4.0)
+    assert max(sleeps) <= 1.0
+
+
+@pytest.mark.parametrize('value, expected', [
+    (None, None),
+    ('bytes=0-9', (0, 10)),
+    ('bytes=10-', (10, 100)),
+    ('bytes=-10', (90, 100)),
+    ('bytes=90-200', (90, 100)),
+    ('bytes=100-', (100, 100)),
+    ('bytes=0-9,20-29', None),
+    ('items=0-9', None),
+    ('bytes=a-b', None),
+    ('bytes=20-10', None),
+    ('bytes=-', None),
+    ('bytes=-0', (100, 100)),
+])
+def test_parse_range(value, expected):
+    assert parse_range(value, 100) == expected